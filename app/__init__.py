@@ -1,18 +1,19 @@
 import os
-import time
 import logging
 import platform
-import threading
 from datetime import datetime
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
 from flask import Flask
 
-from app.config import LOGS_DIR, PING_TARGETS
+from app.config import LOGS_DIR
+from app.fast_json import FastJSONProvider
 import app.config as app_config
 from app.tsdb import tsdb
 from app import acme_manager
-from app.network import tcp_ping
+from app.leader import election
+from app import sampler
+from app.targets_manager import registry
 
 def configure_logging():
     LOGS_DIR.mkdir(parents=True, exist_ok=True)
@@ -40,51 +41,61 @@ def configure_logging():
         stream_handler.setFormatter(formatter)
         root_logger.addHandler(stream_handler)
 
-configure_logging()
 logger = logging.getLogger(__name__)
 
 start_time = datetime.now()
 
-def create_app() -> Flask:
+def create_app(start_services: bool = True) -> Flask:
+    """Build the Flask app and, unless ``start_services`` is false, this worker's background services.
+
+    Nothing runs at package import time, so tools and tests can import
+    ``app.*`` modules without joining the leader election.
+    """
+    configure_logging()
     app = Flask(__name__, template_folder="templates")
+    app.json = FastJSONProvider(app)
     
     from app.routes import register_blueprints
     register_blueprints(app)
+
+    from app import compression
+    compression.init_app(app)
+
+    if start_services:
+        start_background_services()
     
     return app
 
-app = create_app()
-
-# Start ACME Auto-renewal daemon thread
-try:
-    acme_manager.start_daemon()
-except Exception as e:
-    logger.warning("Failed to start ACME auto-renew daemon: %s", e)
-
-# Start background ping sampler loop thread
-def _ping_sampler_loop():
-    while True:
-        try:
-            sample_lat = None
-            for key, host in PING_TARGETS.items():
-                res = tcp_ping(host)
-                if res is not None:
-                    sample_lat = res
-                    break
-            now_ts = time.time()
-            tsdb.insert("global", now_ts, sample_lat)
-        except Exception as e:
-            logger.warning("Ping sampler daemon iteration error: %s", e)
-        time.sleep(15)
-
-_ping_thread = threading.Thread(target=_ping_sampler_loop, daemon=True)
-_ping_thread.start()
-
-logger.info(
-    "console-web package initialized (pid=%s, platform=%s %s, python=%s, version=%s)",
-    os.getpid(),
-    platform.system(),
-    platform.release(),
-    platform.python_version(),
-    app_config.__version__,
-)
+def _start_leader_services():
+    """Runs in exactly one process per host: the elected TSDB writer, sampler and ACME daemon."""
+    tsdb.promote()
+
+    # Start ACME Auto-renewal daemon thread
+    try:
+        acme_manager.start_daemon()
+    except Exception as e:
+        logger.warning("Failed to start ACME auto-renew daemon: %s", e)
+
+    # Start the probe scheduler (built-in telemetry sweep + targets.json policies)
+    sampler.start()
+
+def start_background_services():
+    """Every worker follows the shared TSDB segments; the election winner takes over writing and sampling."""
+    global _services_started
+    if _services_started:
+        return
+    _services_started = True
+    tsdb.start_follower()
+    registry.start_watcher()
+    election.start(_start_leader_services)
+
+    logger.info(
+        "console-web package initialized (pid=%s, platform=%s %s, python=%s, version=%s)",
+        os.getpid(),
+        platform.system(),
+        platform.release(),
+        platform.python_version(),
+        app_config.__version__,
+    )
+
+_services_started = False
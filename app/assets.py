@@ -0,0 +1,101 @@
+"""
+Content-hashed, precompressed static assets for the dashboard.
+
+The dashboard's stylesheet and script live in ``app/static`` and are built
+once per worker, on first use: each file is hashed, named
+``<stem>.<hash><ext>`` and compressed ahead of time with gzip (and brotli when
+the optional ``brotli`` package is installed), all held in memory.
+``/assets/<name>`` (``app.routes.assets``) serves the smallest variant the
+client's ``Accept-Encoding`` allows, marked ``immutable`` for a year: a changed
+file gets a new name, so browsers never revalidate an asset and a repeat visit
+only fetches the small HTML shell.
+
+Templates link assets with ``asset_url("dashboard.css")``.
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+ASSETS = {
+    "dashboard.css": "css/dashboard.css",
+    "dashboard.js": "js/dashboard.js",
+}
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_manifest: Dict[str, dict] = {}
+_by_name: Dict[str, dict] = {}
+_lock = threading.Lock()
+
+
+def _build_asset(name: str, source: Path) -> dict:
+    body = source.read_bytes()
+    digest = hashlib.blake2b(body, digest_size=6).hexdigest()
+    stem, dot, ext = name.rpartition(".")
+    variants = {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=11)
+    return {
+        "name": f"{stem}.{digest}{dot}{ext}",
+        "etag": digest,
+        "mimetype": mimetypes.guess_type(name)[0] or "application/octet-stream",
+        "variants": variants,
+    }
+
+
+def build():
+    """Hash and precompress every asset (called once, lazily, per worker)."""
+    manifest = {}
+    for name, rel in ASSETS.items():
+        try:
+            manifest[name] = _build_asset(name, STATIC_DIR / rel)
+        except OSError as e:
+            logger.warning("Failed to build asset %s: %s", name, e)
+    with _lock:
+        _manifest.clear()
+        _manifest.update(manifest)
+        _by_name.clear()
+        _by_name.update({a["name"]: a for a in manifest.values()})
+    for asset in manifest.values():
+        logger.info(
+            "Built %s (%s)", asset["name"],
+            ", ".join(f"{enc} {len(data)}B" for enc, data in asset["variants"].items()),
+        )
+
+
+def _ensure_built():
+    if not _manifest:
+        build()
+
+
+def asset_url(name: str) -> str:
+    """URL of the current build of ``name``; changes whenever its content does."""
+    _ensure_built()
+    asset = _manifest.get(name)
+    if asset is None:
+        return f"/static/{ASSETS.get(name, name)}"
+    return f"/assets/{asset['name']}"
+
+
+def version() -> tuple:
+    """Content hashes of every asset, for caches of pages that link them."""
+    _ensure_built()
+    return tuple(sorted(a["etag"] for a in _manifest.values()))
+
+
+def lookup(name: str) -> Optional[dict]:
+    """Built asset by its hashed name: ``name``, ``etag``, ``mimetype`` and encoded ``variants``."""
+    _ensure_built()
+    return _by_name.get(name)
@@ -0,0 +1,180 @@
+"""
+In-process publish/subscribe bus for probe results.
+
+Producers publish to a topic once and every consumer reads the same stream:
+
+* ``TOPIC_PROBES`` carries result batches from the probers (the sampler's
+  global sweep, ``TargetProber`` ticks, probe shards). Each message's ``data``
+  is a list of ``(series_id, timestamp, value, meta, burst)`` records; the
+  leader's TSDB writer consumes it.
+* ``TOPIC_SAMPLES`` is published by the TSDB after a record has been applied,
+  keyed by series id, in the leader and in follower workers alike, so
+  streaming endpoints see new samples without polling.
+
+A subscriber is either a ``handler`` called inline by ``publish``, on the
+publisher's thread (only for cheap, non-blocking work: publishers include
+the probe loop), or a bounded queue read with ``Subscription.get`` from the
+consumer's own thread, like the TSDB writer. Queue subscribers pick what
+happens when they fall behind: ``drop_oldest`` evicts the oldest message,
+``drop_newest`` rejects the new one and ``coalesce`` keeps only the latest
+message per key. A slow reader therefore never blocks publishers or other
+subscribers, and publishing costs one append per subscriber however the
+consumer reads.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TOPIC_PROBES = "probes"
+TOPIC_SAMPLES = "samples"
+
+POLICIES = ("drop_oldest", "drop_newest", "coalesce")
+DEFAULT_QUEUE_SIZE = 256
+
+
+class Subscription:
+    def __init__(self, bus: "MessageBus", topics, keys=None, maxsize: int = DEFAULT_QUEUE_SIZE,
+                 policy: str = "drop_oldest", handler: Optional[Callable[[dict], Any]] = None):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {', '.join(POLICIES)}")
+        self.bus = bus
+        self.topics = frozenset([topics] if isinstance(topics, str) else topics)
+        self.keys = None if keys is None else frozenset(keys)
+        self.maxsize = max(1, int(maxsize))
+        self.policy = policy
+        self.handler = handler
+        self.delivered = 0
+        self.dropped = 0
+        self.closed = False
+        self._queue = OrderedDict() if policy == "coalesce" else deque()
+        self._cond = threading.Condition(threading.Lock())
+
+    def wants(self, topic: str, key) -> bool:
+        return topic in self.topics and (self.keys is None or key in self.keys)
+
+    def _offer(self, message: dict):
+        if self.handler is not None:
+            self.delivered += 1
+            try:
+                self.handler(message)
+            except Exception as e:
+                logger.warning("Bus handler for %s failed: %s", ",".join(sorted(self.topics)), e)
+            return
+        with self._cond:
+            if self.closed:
+                return
+            queue = self._queue
+            if self.policy == "coalesce":
+                slot = (message["topic"], message["key"])
+                if slot in queue:
+                    del queue[slot]
+                    self.dropped += 1
+                elif len(queue) >= self.maxsize:
+                    queue.popitem(last=False)
+                    self.dropped += 1
+                queue[slot] = message
+            elif len(queue) >= self.maxsize:
+                self.dropped += 1
+                if self.policy == "drop_newest":
+                    return
+                queue.popleft()
+                queue.append(message)
+            else:
+                queue.append(message)
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Next message, or ``None`` once ``timeout`` seconds pass (or the subscription is closed)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self._queue:
+                if self.closed:
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            self.delivered += 1
+            if self.policy == "coalesce":
+                return self._queue.popitem(last=False)[1]
+            return self._queue.popleft()
+
+    def drain(self) -> List[dict]:
+        """Every queued message without waiting."""
+        with self._cond:
+            if self.policy == "coalesce":
+                messages = list(self._queue.values())
+            else:
+                messages = list(self._queue)
+            self._queue.clear()
+            self.delivered += len(messages)
+            return messages
+
+    def close(self):
+        self.bus.unsubscribe(self)
+        with self._cond:
+            self.closed = True
+            self._queue.clear()
+            self._cond.notify_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "topics": sorted(self.topics),
+            "policy": "inline" if self.handler is not None else self.policy,
+            "queued": len(self._queue),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+class MessageBus:
+    def __init__(self):
+        self._subscribers = ()
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+        self.published = 0
+
+    def subscribe(self, topics, keys: Optional[Iterable] = None, maxsize: int = DEFAULT_QUEUE_SIZE,
+                  policy: str = "drop_oldest", handler: Optional[Callable[[dict], Any]] = None) -> Subscription:
+        """Subscribe to one topic or several; ``keys`` restricts delivery to those message keys."""
+        sub = Subscription(self, topics, keys, maxsize, policy, handler)
+        with self._lock:
+            self._subscribers = self._subscribers + (sub,)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not sub)
+
+    def has_subscribers(self, topic: str) -> bool:
+        return any(topic in s.topics for s in self._subscribers)
+
+    def publish(self, topic: str, data: Any, key: Any = None) -> int:
+        """Deliver ``data`` to every matching subscriber; returns how many it reached."""
+        subscribers = [s for s in self._subscribers if s.wants(topic, key)]
+        if not subscribers:
+            return 0
+        message = {"topic": topic, "key": key, "seq": next(self._seq), "data": data}
+        self.published += 1
+        for sub in subscribers:
+            sub._offer(message)
+        return len(subscribers)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"published": self.published, "subscribers": [s.info() for s in self._subscribers]}
+
+
+bus = MessageBus()
+
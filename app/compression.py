@@ -0,0 +1,169 @@
+"""
+On-the-fly response compression.
+
+``init_app`` installs an ``after_request`` hook that compresses text
+responses (JSON, HTML, CSV, event streams...) with the best coding the
+client's ``Accept-Encoding`` allows: zstd or brotli when the optional
+``zstandard`` / ``brotli`` packages are installed, gzip otherwise.
+
+* Buffered bodies under ``COMPRESS_MIN_SIZE`` are sent as-is, and a body that
+  would not shrink keeps its identity coding. Strong ETags are weakened, since
+  the compressed bytes differ from the ones the tag was computed on, which
+  still lets ``If-None-Match`` revalidation answer 304.
+* Streamed responses are compressed chunk by chunk. ``text/event-stream``
+  bodies (``/api/pings/stream``, ``/api/realtime``, ``/run/<cmd>``) are flushed
+  after every event, so each one reaches the browser immediately while the
+  compression context still spans the whole stream: repeated keys and the
+  heartbeat comments cost a few bytes after the first event.
+
+``python -m bench.compression`` benchmarks size and CPU time per coding for an
+``/api/pings``-shaped payload and an event stream.
+"""
+
+import logging
+import zlib
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from flask import Flask, Response, request
+
+from app.config import COMPRESS_LEVEL, COMPRESS_MIN_SIZE
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Preferred first when the client accepts several
+ENCODINGS = ("zstd", "br", "gzip")
+# Brotli's default (11) is far too slow for per-request use; 5 is about gzip -6 speed
+BROTLI_QUALITY = 5
+COMPRESSIBLE = {
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "text/css",
+    "text/csv",
+    "text/event-stream",
+    "text/html",
+    "text/javascript",
+    "text/markdown",
+    "text/plain",
+}
+
+# (compress, sync flush, finish) for one stream
+Encoder = Tuple[Callable[[bytes], bytes], Callable[[], bytes], Callable[[], bytes]]
+
+
+def _gzip(level: int) -> Encoder:
+    obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return obj.compress, lambda: obj.flush(zlib.Z_SYNC_FLUSH), obj.flush
+
+
+def _brotli(level: int) -> Encoder:
+    obj = brotli.Compressor(quality=level)
+    return obj.process, obj.flush, obj.finish
+
+
+def _zstd(level: int) -> Encoder:
+    obj = zstandard.ZstdCompressor(level=level).compressobj()
+    return obj.compress, lambda: obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK), obj.flush
+
+
+ENCODERS: Dict[str, Callable[[int], Encoder]] = {"gzip": _gzip}
+if brotli is not None:
+    ENCODERS["br"] = _brotli
+if zstandard is not None:
+    ENCODERS["zstd"] = _zstd
+LEVELS = {"gzip": COMPRESS_LEVEL, "br": BROTLI_QUALITY, "zstd": COMPRESS_LEVEL}
+
+
+def negotiate(accept_encoding: Optional[str], available) -> str:
+    """Best of ``available`` for an ``Accept-Encoding`` header (``identity`` when none fits)."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = q
+    for encoding in ENCODINGS:
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+
+def compress(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    compress_chunk, _, finish = ENCODERS[encoding](LEVELS[encoding] if level is None else level)
+    return compress_chunk(data) + finish()
+
+
+def compress_stream(chunks: Iterable, encoding: str, flush_each: bool = False,
+                    level: Optional[int] = None) -> Iterator[bytes]:
+    """Compress ``chunks`` as one stream; ``flush_each`` emits every chunk's bytes right away."""
+    compress_chunk, flush, finish = ENCODERS[encoding](LEVELS[encoding] if level is None else level)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            out = compress_chunk(chunk)
+            if flush_each:
+                out += flush()
+            if out:
+                yield out
+        yield finish()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+def compress_response(response: Response) -> Response:
+    # 206 bodies are byte ranges of the identity coding, and passthrough bodies (files) must not be consumed
+    if (response.mimetype not in COMPRESSIBLE or response.status_code < 200
+            or response.status_code in (204, 206, 304) or response.direct_passthrough
+            or "Content-Encoding" in response.headers):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate(request.headers.get("Accept-Encoding"), ENCODERS)
+    if encoding == "identity" or request.method == "HEAD":
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding,
+                                            flush_each=response.mimetype == "text/event-stream")
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return response
+        try:
+            body = compress(data, encoding)
+        except Exception as e:
+            logger.warning("Failed to %s-compress %s: %s", encoding, request.path, e)
+            return response
+        if len(body) >= len(data):
+            return response
+        response.set_data(body)
+
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app: Flask):
+    app.after_request(compress_response)
+
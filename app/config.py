@@ -18,6 +18,18 @@ LOGS_DIR.mkdir(parents=True, exist_ok=True)
 MONITOR_TARGETS_FILE = DATA_DIR / "targets.json"
 UPTIME_FILE = DATA_DIR / "uptime_history.json"
 TSDB_DATA_FILE = DATA_DIR / "tsdb_history.json"
+TSDB_SEGMENT_DIR = DATA_DIR / "tsdb"
+LEADER_LOCK_FILE = DATA_DIR / "sampler.lock"
+
+# TSDB retention: raw ring capacity (24h at the 15s sampler period) plus
+# downsampling tiers as name -> (bucket seconds, retained buckets)
+TSDB_RAW_POINTS = 5760
+TSDB_ROLLUP_TIERS = {
+    "1m": (60, 3 * 24 * 60),
+    "5m": (300, 30 * 24 * 12),
+    "1h": (3600, 365 * 24),
+    "1d": (86400, 5 * 365),
+}
 
 # Version & Repository
 __version__ = "3.9.9"
@@ -32,6 +44,26 @@ PING_TARGETS = {
     "ping_ct": "zj-ct-v4.ip.zstaticcdn.com:80",
 }
 
+# Probe engine: max in-flight probes and per-probe deadline (seconds)
+PROBE_MAX_CONCURRENCY = 256
+PROBE_TIMEOUT = 2.5
+# Burst probing: probes per target per tick and the pacing between them (seconds)
+PROBE_BURST_COUNT = 5
+PROBE_BURST_INTERVAL = 0.2
+# Global probe budget (probes per second) shared by all scheduled targets
+PROBE_BUDGET_PER_SEC = 20
+# Probe worker processes for targets.json jobs (0 = probe inside the leader process)
+PROBE_SHARDS = int(os.environ.get("PROBE_SHARDS", "0"))
+
+# Server-sent events: heartbeat comment interval (seconds) and open streams per worker process.
+# Keep SSE_MAX_CLIENTS below gunicorn's --threads so plain requests always find a thread.
+SSE_HEARTBEAT = 15
+SSE_MAX_CLIENTS = 120
+
+# Response compression: smallest body worth compressing (bytes) and zlib/zstd level
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_LEVEL = 6
+
 # Supported shell commands
 COMMANDS = {
     "ping": lambda target, extra: ["ping", *extra, target] if extra else ["ping", "-c", "4", target],
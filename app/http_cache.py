@@ -0,0 +1,121 @@
+"""
+Conditional GET support and a short-lived response cache for read endpoints.
+
+``response_cache.cached(version, ttl, vary)`` wraps a Flask view. Its GET
+responses are stored serialized, keyed by endpoint + path + query string (+
+``vary()``, e.g. the client IP), together with ``version()``: a cheap value
+derived from the data the view reads (the target registry's version, a file's
+stat, the newest TSDB sample). A request whose version still matches a live
+entry reuses the stored body without running the view, so writes invalidate
+entries simply by changing the version; ``ttl`` bounds how long an entry may
+serve data the version does not capture (clocks, remote lookups).
+
+Every cached response carries a strong ``ETag`` (a hash of the body) and
+``Cache-Control: private, no-cache``, so browsers revalidate each poll and a
+matching ``If-None-Match`` gets an empty 304 instead of the body.
+``conditional`` gives the same treatment to a response built per request.
+"""
+
+import functools
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from flask import current_app, request
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRIES = 512
+CACHE_CONTROL = "private, no-cache"
+
+
+def file_stamp(path: Path):
+    """Cheap change marker for a file: ``(mtime_ns, size)``, or ``None`` when missing."""
+    try:
+        st = Path(path).stat()
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+def body_etag(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=12).hexdigest()
+
+
+def conditional(resp, etag: Optional[str] = None):
+    """Tag ``resp`` with a strong ETag (of its body unless given); a matching ``If-None-Match`` gets a 304."""
+    resp.set_etag(etag or body_etag(resp.get_data()))
+    resp.headers["Cache-Control"] = CACHE_CONTROL
+    return resp.make_conditional(request)
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key: tuple, version: Any) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["version"] != version or entry["expires"] <= time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def _store(self, key: tuple, entry: dict):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, endpoint: Optional[str] = None):
+        """Drop cached responses of ``endpoint`` (or all of them)."""
+        with self._lock:
+            for key in [k for k in self._entries if endpoint is None or k[0] == endpoint]:
+                del self._entries[key]
+
+    def cached(self, version: Callable[[], Any], ttl: Optional[float] = None, vary: Optional[Callable[[], Any]] = None):
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return view(*args, **kwargs)
+                try:
+                    data_version = version()
+                    key = (request.endpoint, request.path, request.query_string, vary() if vary else None)
+                except Exception as e:
+                    logger.warning("Response cache version check failed for %s: %s", request.endpoint, e)
+                    return view(*args, **kwargs)
+
+                entry = self._lookup(key, data_version)
+                if entry is None:
+                    resp = current_app.make_response(view(*args, **kwargs))
+                    if resp.status_code != 200 or resp.is_streamed:
+                        return resp
+                    body = resp.get_data()
+                    entry = {
+                        "version": data_version,
+                        "expires": time.monotonic() + ttl if ttl else float("inf"),
+                        "body": body,
+                        "etag": body_etag(body),
+                        "mimetype": resp.mimetype,
+                    }
+                    self._store(key, entry)
+
+                resp = current_app.response_class(entry["body"], mimetype=entry["mimetype"])
+                return conditional(resp, entry["etag"])
+            return wrapper
+        return decorator
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,262 @@
+"""
+In-process ICMP echo pinger.
+
+Prefers unprivileged ``SOCK_DGRAM``/``IPPROTO_ICMP`` "ping sockets" (allowed by
+``net.ipv4.ping_group_range``), falls back to ``SOCK_RAW`` when the process may
+open one, and only shells out to ``ping`` when neither is available. A batch
+call sends every echo request for every address over one socket per address
+family and collects replies with a ``selectors`` (epoll) loop, matching them by
+identifier and sequence number, so pinging N hosts costs one round trip rather
+than N process spawns.
+"""
+
+import ipaddress
+import itertools
+import logging
+import os
+import selectors
+import socket
+import struct
+import subprocess
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 2.0
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMP6_ECHO_REQUEST = 128
+ICMP6_ECHO_REPLY = 129
+IP_RECVTTL = getattr(socket, "IP_RECVTTL", 12)
+IPV6_RECVHOPLIMIT = getattr(socket, "IPV6_RECVHOPLIMIT", 51)
+IPV6_HOPLIMIT = getattr(socket, "IPV6_HOPLIMIT", 52)
+
+_ICMP_HEADER = struct.Struct("!BBHHH")
+_PAYLOAD = b"console-web-ping"
+
+
+def checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def echo_request(family: int, ident: int, seq: int) -> bytes:
+    kind = ICMP6_ECHO_REQUEST if family == socket.AF_INET6 else ICMP_ECHO_REQUEST
+    packet = _ICMP_HEADER.pack(kind, 0, 0, ident, seq) + _PAYLOAD
+    if family == socket.AF_INET6:
+        # The kernel fills in the ICMPv6 checksum (it covers the pseudo-header)
+        return packet
+    return _ICMP_HEADER.pack(kind, 0, checksum(packet), ident, seq) + _PAYLOAD
+
+
+def _empty_result(address: str, method: Optional[str]) -> dict:
+    return {
+        "address": address, "method": method, "sent": 0, "received": 0, "loss": None,
+        "rtt_ms": None, "min_ms": None, "max_ms": None, "ttl": None,
+    }
+
+
+def _finish(result: dict, rtts: List[float]) -> dict:
+    if result["sent"]:
+        result["received"] = len(rtts)
+        result["loss"] = round(100.0 * (result["sent"] - len(rtts)) / result["sent"], 1)
+    if rtts:
+        result["rtt_ms"] = sum(rtts) / len(rtts)
+        result["min_ms"] = min(rtts)
+        result["max_ms"] = max(rtts)
+    return result
+
+
+class _EchoSocket:
+    """One ICMP socket of a given family plus how to read identifier/TTL from it."""
+
+    def __init__(self, family: int):
+        self.family = family
+        proto = socket.IPPROTO_ICMPV6 if family == socket.AF_INET6 else socket.IPPROTO_ICMP
+        try:
+            self.sock = socket.socket(family, socket.SOCK_DGRAM, proto)
+            self.raw = False
+        except OSError:
+            self.sock = socket.socket(family, socket.SOCK_RAW, proto)
+            self.raw = True
+        self.sock.setblocking(False)
+        try:
+            if family == socket.AF_INET6:
+                self.sock.setsockopt(socket.IPPROTO_IPV6, IPV6_RECVHOPLIMIT, 1)
+            elif not self.raw:
+                self.sock.setsockopt(socket.IPPROTO_IP, IP_RECVTTL, 1)
+        except OSError:
+            pass
+        # Ping sockets rewrite the identifier to the bound port; raw sockets keep ours
+        self.ident = (os.getpid() ^ id(self)) & 0xFFFF
+        if not self.raw:
+            self.sock.bind(("::", 0) if family == socket.AF_INET6 else ("0.0.0.0", 0))
+            self.ident = self.sock.getsockname()[1]
+
+    @property
+    def method(self) -> str:
+        return "raw" if self.raw else "dgram"
+
+    def send(self, address: str, seq: int):
+        self.sock.sendto(echo_request(self.family, self.ident, seq), (address, 0))
+
+    def receive(self):
+        """Yield ``(seq, ttl)`` for each pending echo reply addressed to us."""
+        while True:
+            try:
+                data, ancillary, _, _ = self.sock.recvmsg(2048, socket.CMSG_SPACE(4))
+            except (BlockingIOError, InterruptedError):
+                return
+            ttl = None
+            for level, kind, value in ancillary:
+                if len(value) >= 4 and (level, kind) in (
+                    (socket.IPPROTO_IP, socket.IP_TTL), (socket.IPPROTO_IPV6, IPV6_HOPLIMIT)
+                ):
+                    ttl = struct.unpack("i", value[:4])[0]
+            offset = 0
+            if self.raw and self.family == socket.AF_INET:
+                offset = (data[0] & 0x0F) * 4
+                ttl = data[8]
+            if len(data) < offset + _ICMP_HEADER.size:
+                continue
+            kind, _, _, ident, seq = _ICMP_HEADER.unpack_from(data, offset)
+            reply = ICMP6_ECHO_REPLY if self.family == socket.AF_INET6 else ICMP_ECHO_REPLY
+            if kind == reply and ident == self.ident:
+                yield seq, ttl
+
+    def close(self):
+        self.sock.close()
+
+
+class IcmpPinger:
+    def __init__(self):
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+        self._unavailable = set()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_lock)
+
+    def _reset_lock(self):
+        self._lock = threading.Lock()
+
+    def _next_seq(self) -> int:
+        with self._lock:
+            return next(self._seq) & 0xFFFF
+
+    def _open(self, family: int) -> Optional[_EchoSocket]:
+        if family in self._unavailable:
+            return None
+        try:
+            return _EchoSocket(family)
+        except OSError as e:
+            logger.warning("ICMP sockets unavailable for family %s (%s), using the ping command", family, e)
+            self._unavailable.add(family)
+            return None
+
+    def ping_many(self, addresses: Iterable[str], count: int = 1, timeout: float = DEFAULT_TIMEOUT) -> Dict[str, dict]:
+        """Echo every address ``count`` times concurrently; results keyed by address.
+
+        Each result carries ``sent``/``received``/``loss`` (percent), average,
+        min and max RTT in milliseconds, the reply TTL (hop limit for IPv6) and
+        the ``method`` used. Hostnames are not resolved here.
+        """
+        results: Dict[str, dict] = {}
+        rtts: Dict[str, List[float]] = {}
+        groups: Dict[int, List[str]] = {}
+        for address in dict.fromkeys(addresses):
+            try:
+                family = socket.AF_INET6 if ipaddress.ip_address(address).version == 6 else socket.AF_INET
+            except ValueError:
+                results[address] = _empty_result(address, None)
+                continue
+            groups.setdefault(family, []).append(address)
+
+        selector = selectors.DefaultSelector()
+        pending = {}
+        fallback: List[str] = []
+        try:
+            for family, group in groups.items():
+                echo = self._open(family)
+                if echo is None:
+                    fallback.extend(group)
+                    continue
+                selector.register(echo.sock, selectors.EVENT_READ, echo)
+                for address in group:
+                    results[address] = _empty_result(address, echo.method)
+                    rtts[address] = []
+                    for _ in range(count):
+                        seq = self._next_seq()
+                        try:
+                            echo.send(address, seq)
+                        except OSError as e:
+                            logger.debug("ICMP send to %s failed: %s", address, e)
+                        else:
+                            pending[(echo.ident, seq)] = (address, time.perf_counter_ns())
+                        results[address]["sent"] += 1
+
+            deadline = time.monotonic() + timeout
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                for key, _ in selector.select(remaining):
+                    echo = key.data
+                    for seq, ttl in echo.receive():
+                        hit = pending.pop((echo.ident, seq), None)
+                        if hit is None:
+                            continue
+                        address, sent_ns = hit
+                        rtts[address].append((time.perf_counter_ns() - sent_ns) / 1e6)
+                        if ttl is not None:
+                            results[address]["ttl"] = ttl
+        finally:
+            for key in list(selector.get_map().values()):
+                key.data.close()
+            selector.close()
+
+        for address in fallback:
+            results[address] = _subprocess_ping(address, count, timeout)
+        for address, samples in rtts.items():
+            _finish(results[address], samples)
+        return results
+
+    def ping(self, address: str, count: int = 1, timeout: float = DEFAULT_TIMEOUT) -> dict:
+        return self.ping_many([address], count, timeout)[address]
+
+
+def _subprocess_ping(address: str, count: int = 1, timeout: float = DEFAULT_TIMEOUT) -> dict:
+    """Last resort: run the system ``ping`` and scrape its output."""
+    result = _empty_result(address, "command")
+    samples = []
+    try:
+        proc = subprocess.run(
+            ["ping", "-c", str(count), "-W", str(max(1, int(round(timeout)))), address],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            timeout=count * timeout + 2,
+        )
+        for line in proc.stdout.splitlines():
+            if "time=" not in line:
+                continue
+            try:
+                samples.append(float(line.split("time=")[1].split(" ")[0]))
+                if "ttl=" in line:
+                    result["ttl"] = int(line.split("ttl=")[1].split(" ")[0])
+            except (IndexError, ValueError):
+                pass
+    except Exception:
+        pass
+    result["sent"] = count
+    return _finish(result, samples)
+
+
+icmp_pinger = IcmpPinger()
+
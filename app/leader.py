@@ -0,0 +1,95 @@
+"""
+Per-host leader election between worker processes.
+
+Gunicorn imports the app once per worker, so without coordination every worker
+would run its own ping sampler and ACME daemon. Workers race for an exclusive
+``fcntl.flock`` on a lock file; the holder becomes the leader and runs the
+singleton background jobs, the others keep retrying so a replacement takes over
+within a few seconds if the leader dies (the kernel drops the lock with the
+process). Platforms without ``fcntl`` always elect themselves.
+"""
+
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+from app.config import LEADER_LOCK_FILE
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElection:
+    def __init__(self, lock_path: Path, retry_interval: float = 5.0):
+        self.lock_path = Path(lock_path)
+        self.retry_interval = retry_interval
+        self._fh = None
+        self._started = False
+        self._elected = threading.Event()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._forget)
+
+    def _forget(self):
+        """In a forked child: drop the inherited lock fd (closing it does not release the parent's lock)."""
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+        self._elected = threading.Event()
+
+    @property
+    def is_leader(self) -> bool:
+        return self._elected.is_set()
+
+    def try_acquire(self) -> bool:
+        if self.is_leader:
+            return True
+        if fcntl is None:
+            self._elected.set()
+            return True
+        fh = None
+        try:
+            self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+            fh = open(self.lock_path, "a+")
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            if fh is not None:
+                fh.close()
+            return False
+        fh.seek(0)
+        fh.truncate()
+        fh.write(str(os.getpid()))
+        fh.flush()
+        self._fh = fh
+        self._elected.set()
+        return True
+
+    def start(self, on_elected: Callable[[], None]):
+        """Campaign in a background thread and call ``on_elected`` once this process wins."""
+        if self._started:
+            return
+        self._started = True
+
+        def _campaign():
+            while not self.try_acquire():
+                time.sleep(self.retry_interval)
+            logger.info("Elected sampler leader (pid=%s, lock=%s)", os.getpid(), self.lock_path)
+            try:
+                on_elected()
+            except Exception as e:
+                logger.exception("Leader start-up hook failed: %s", e)
+
+        threading.Thread(target=_campaign, daemon=True, name="Leader-Election").start()
+
+
+election = LeaderElection(LEADER_LOCK_FILE)
+
+
+def is_leader() -> bool:
+    return election.is_leader
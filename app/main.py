@@ -1,13 +1,18 @@
 import os
 import logging
 from pathlib import Path
-from app import app, logger, acme_manager
+from app import create_app, logger, acme_manager
+
+app = create_app()
 
 if __name__ == "__main__":
     acme_manager._auto_init()
     cert_file = acme_manager.FULLCHAIN_FILE if acme_manager.FULLCHAIN_FILE.exists() else acme_manager.CERT_FILE
     key_file = acme_manager.KEY_FILE
 
+    # Threaded workers: an idle SSE stream parks one thread, not a whole worker
+    threads = os.environ.get("GUNICORN_THREADS", "128")
+
     gunicorn_bin = "/usr/local/bin/gunicorn"
     if not Path(gunicorn_bin).exists():
         gunicorn_bin = "gunicorn"
@@ -20,6 +25,8 @@ if __name__ == "__main__":
                 "--certfile", str(cert_file),
                 "--keyfile", str(key_file),
                 "--workers", "2",
+                "--worker-class", "gthread",
+                "--threads", threads,
                 "--timeout", "120",
                 "app.main:app"
             ])
@@ -32,6 +39,8 @@ if __name__ == "__main__":
             os.execvp(gunicorn_bin, [
                 "gunicorn", "-b", "0.0.0.0:8080",
                 "--workers", "2",
+                "--worker-class", "gthread",
+                "--threads", threads,
                 "--timeout", "120",
                 "app.main:app"
             ])
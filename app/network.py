@@ -1,12 +1,13 @@
 import json
 import logging
 import socket
-import subprocess
 import time
 import threading
 import urllib.request
 import ipaddress
-from datetime import datetime
+
+from app.icmp import icmp_pinger
+from app.resolver import resolver
 
 logger = logging.getLogger(__name__)
 
@@ -17,40 +18,63 @@ _isp_cache = {"full": None, "short": None, "timestamp": 0}
 ISP_FULL_NAME = None
 ISP_SHORT_NAME = None
 
-def tcp_ping(host: str):
-    """Attempt TCP socket handshake and measure latency in milliseconds."""
+def split_host_port(target: str, default_port: int = 80):
+    """Split ``host:port`` (or ``[v6]:port``) into ``(host, port)``."""
+    if target.startswith("["):
+        host, _, rest = target[1:].partition("]")
+        return host, int(rest[1:]) if rest.startswith(":") else default_port
+    if target.count(":") == 1:
+        host, port = target.rsplit(":", 1)
+        return host, int(port)
+    return target, default_port
+
+def elapsed_ms(start_ns: int, end_ns: int = None) -> float:
+    return ((end_ns or time.perf_counter_ns()) - start_ns) / 1e6
+
+def new_probe_result(target: str, kind: str = "tcp") -> dict:
+    """Skeleton of the common probe result record (durations in milliseconds).
+
+    ``latency`` is the headline value recorded for the probe type; phases a
+    prober does not go through stay ``None``.
+    """
+    return {
+        "target": target, "type": kind, "address": None, "latency": None,
+        "dns_ms": None, "connect_ms": None, "tls_ms": None, "ttfb_ms": None, "total_ms": None,
+        "status": None, "error": None,
+    }
+
+def tcp_probe(target: str, timeout: float = 2.5) -> dict:
+    """TCP handshake probe with DNS (cached) and connect phases timed separately."""
+    result = new_probe_result(target)
+    started = time.perf_counter_ns()
     try:
-        if ":" in host:
-            host, port = host.rsplit(":", 1)
-            port = int(port)
-        else:
-            port = 80
-        start = datetime.now()
-        with socket.create_connection((host, port), timeout=2.5):
-            end = datetime.now()
-        return (end - start).total_seconds() * 1000
-    except Exception:
-        return None
+        host, port = split_host_port(target)
+        addresses = resolver.resolve(host)
+        result["dns_ms"] = elapsed_ms(started)
+        if not addresses:
+            raise OSError(f"cannot resolve {host}")
+        family, ip = addresses[0]
+        result["address"] = ip
+        with socket.socket(family, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            connect_start = time.perf_counter_ns()
+            sock.connect((ip, port))
+            result["connect_ms"] = result["latency"] = elapsed_ms(connect_start)
+    except Exception as e:
+        result["error"] = str(e) or type(e).__name__
+    result["total_ms"] = elapsed_ms(started)
+    return result
+
+def tcp_ping(host: str):
+    """Attempt TCP socket handshake and measure latency in milliseconds (DNS time excluded)."""
+    return tcp_probe(host)["connect_ms"]
 
 def icmp_ping(ip: str):
-    """Execute ICMP ping command and return latency in milliseconds."""
+    """ICMP echo latency in milliseconds (in-process, see ``app.icmp``)."""
     try:
-        proc = subprocess.run(
-            ["ping", "-c", "1", "-W", "2", ip],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-        )
-        if proc.returncode == 0:
-            for line in proc.stdout.splitlines():
-                if "time=" in line:
-                    try:
-                        return float(line.split("time=")[1].split(" ")[0])
-                    except Exception:
-                        pass
+        return icmp_pinger.ping(ip)["rtt_ms"]
     except Exception:
-        pass
-    return None
+        return None
 
 def is_private_ip(ip_str: str) -> bool:
     if not ip_str or ip_str in ("N/A", "None", "未检测到"):
@@ -0,0 +1,144 @@
+"""
+asyncio probe engine.
+
+All probes run as coroutines on one event loop in a dedicated daemon thread:
+non-blocking ``loop.sock_connect`` with a per-probe deadline and a semaphore
+bounding how many probes are in flight. Names go through the shared resolver
+cache; only a miss is handed to the executor, so the hot path does no DNS I/O. Callers outside the loop either submit
+a coroutine and get a ``concurrent.futures.Future`` back (the scheduler, which
+never blocks), or use the synchronous batch facade (Flask routes).
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Coroutine, Dict, Optional
+
+from app.config import PROBE_MAX_CONCURRENCY, PROBE_TIMEOUT
+from app.network import elapsed_ms, new_probe_result, split_host_port
+from app.resolver import resolver
+
+logger = logging.getLogger(__name__)
+
+
+class ProbeEngine:
+    def __init__(self, max_concurrency: int = PROBE_MAX_CONCURRENCY, timeout: float = PROBE_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        if hasattr(os, "register_at_fork"):
+            # A forked probe shard must start its own loop thread, not inherit a dead one
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._loop = None
+        self._sem = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The engine loop, started on first use."""
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def _run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                threading.Thread(target=_run, daemon=True, name="Probe-Engine").start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    def submit(self, coro: Coroutine) -> Future:
+        """Schedule ``coro`` on the engine loop from any thread."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the engine loop
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+        return self._sem
+
+    async def run_blocking(self, fn: Callable, *args) -> Any:
+        """Run a blocking helper in the loop's default executor."""
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    async def resolve(self, host: str, result: dict, started: int) -> tuple:
+        """``(family, ip)`` for ``host`` through the resolver cache, recording ``dns_ms``."""
+        addresses = resolver.cached(host)
+        if addresses is None:
+            addresses = await asyncio.get_running_loop().run_in_executor(None, resolver.resolve, host)
+        result["dns_ms"] = elapsed_ms(started)
+        if not addresses:
+            raise OSError(f"cannot resolve {host}")
+        result["address"] = addresses[0][1]
+        return addresses[0]
+
+    async def connect(self, host: str, port: int, result: dict, started: int, sock_type: int = socket.SOCK_STREAM) -> socket.socket:
+        """Connected non-blocking socket to ``host:port``, recording ``connect_ms``; the caller closes it."""
+        family, ip = await self.resolve(host, result, started)
+        sock = socket.socket(family, sock_type)
+        sock.setblocking(False)
+        try:
+            connect_start = time.perf_counter_ns()
+            await asyncio.get_running_loop().sock_connect(sock, (ip, port))
+            result["connect_ms"] = elapsed_ms(connect_start)
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
+    async def measure(self, result: dict, work: Callable[[dict, int], Awaitable], timeout: Optional[float] = None) -> dict:
+        """Run ``work(result, started_ns)`` under the concurrency limit and one deadline.
+
+        Failures are recorded in ``result["error"]`` rather than raised.
+        """
+        async with self._semaphore():
+            started = time.perf_counter_ns()
+            try:
+                await asyncio.wait_for(work(result, started), timeout or self.timeout)
+            except asyncio.TimeoutError:
+                result["error"] = "timeout"
+            except (OSError, ValueError, EOFError) as e:
+                result["error"] = str(e) or type(e).__name__
+            result["total_ms"] = elapsed_ms(started)
+        return result
+
+    async def tcp_probe(self, target: str, timeout: Optional[float] = None) -> dict:
+        """Structured TCP connect probe (see ``network.new_probe_result``)."""
+        async def work(result, started):
+            host, port = split_host_port(target)
+            (await self.connect(host, port, result, started)).close()
+            result["latency"] = result["connect_ms"]
+
+        return await self.measure(new_probe_result(target), work, timeout)
+
+    async def tcp_ping(self, target: str, timeout: Optional[float] = None) -> Optional[float]:
+        """TCP handshake latency in milliseconds, or ``None`` on failure/deadline."""
+        return (await self.tcp_probe(target, timeout))["connect_ms"]
+
+    async def tcp_ping_many(self, targets: Dict[str, str], timeout: Optional[float] = None) -> Dict[str, Optional[float]]:
+        keys = list(targets)
+        results = await asyncio.gather(*(self.tcp_ping(targets[k], timeout) for k in keys))
+        return dict(zip(keys, results))
+
+    def ping_many(self, targets: Dict[str, str], timeout: Optional[float] = None) -> Dict[str, Optional[float]]:
+        """Blocking facade: probe every ``{key: "host:port"}`` concurrently."""
+        if not targets:
+            return {}
+        per_probe = timeout or self.timeout
+        waves = 1 + len(targets) // self.max_concurrency
+        return self.submit(self.tcp_ping_many(targets, timeout)).result(timeout=per_probe * waves + 5)
+
+
+probe_engine = ProbeEngine()
@@ -0,0 +1,213 @@
+"""
+Sharded probing across worker processes.
+
+With ``config.PROBE_SHARDS`` (env ``PROBE_SHARDS``) > 0 the leader starts that
+many probe processes and partitions the ``targets.json`` jobs between them by
+consistent hashing on the target id, so adding or removing a target (or a
+shard) only moves the targets that hash near it. Each shard runs its own probe
+engine, scheduler and ``TargetProber`` with an equal slice of the global probe
+budget, and streams results back over a pipe as batches of compact burst
+records (``tsdb.encode_burst`` prefixed with the target id), which the leader
+publishes to the bus as one ``TOPIC_PROBES`` batch, so it stays the only TSDB
+writer. A shard that dies is restarted with its assignment.
+
+Shards are started through a ``forkserver`` (``spawn`` where that is not
+available), never forked from the leader itself: the leader is already
+threaded, and a forked child would inherit its held locks, bus subscriptions
+and writable TSDB. Each shard also detaches the TSDB it imports.
+
+``python -m bench.probe_shards`` benchmarks probes/sec for increasing shard
+counts against a local TCP listener.
+"""
+
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import struct
+import threading
+import time
+from functools import partial
+from multiprocessing.connection import wait
+from typing import Any, Callable, Dict, List, Optional
+
+from app.bus import bus, TOPIC_PROBES
+from app.config import PROBE_BUDGET_PER_SEC
+from app.scheduler import ProbeScheduler
+from app.tsdb import burst_tuple, decode_record, encode_burst, tsdb
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 0.5
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+VIRTUAL_NODES = 100
+_LENGTH = struct.Struct("<H")
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent hash ring mapping keys to ``range(nodes)`` via virtual nodes."""
+
+    def __init__(self, nodes: int, vnodes: int = VIRTUAL_NODES):
+        points = sorted((_hash(f"shard-{n}#{v}"), n) for n in range(nodes) for v in range(vnodes))
+        self._keys = [p[0] for p in points]
+        self._nodes = [p[1] for p in points]
+
+    def node_for(self, key: str) -> int:
+        return self._nodes[bisect.bisect(self._keys, _hash(key)) % len(self._keys)]
+
+
+def pack_result(target_id: str, payload: bytes) -> bytes:
+    raw_id = target_id.encode("utf-8")
+    return _LENGTH.pack(len(raw_id)) + raw_id + _LENGTH.pack(len(payload)) + payload
+
+
+def unpack_results(data: bytes):
+    """Yield ``(target_id, timestamp, value, meta, burst)`` from a batch of packed results."""
+    offset = 0
+    while offset < len(data):
+        (id_len,) = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        target_id = data[offset:offset + id_len].decode("utf-8")
+        offset += id_len
+        (payload_len,) = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        record = decode_record(data[offset:offset + payload_len])
+        offset += payload_len
+        if record is not None:
+            yield (target_id, *record)
+
+
+def _shard_main(conn, budget_per_sec: float, reserved: float, flush_interval: float):
+    """Probe-shard process: schedule the assigned targets and ship results back in batches."""
+    from app.sampler import TargetProber
+
+    tsdb.detach()
+    batch: List[bytes] = []
+    lock = threading.Lock()
+
+    def sink(target_id: str, timestamp: float, burst: Dict[str, Any]):
+        record = pack_result(target_id, encode_burst(timestamp, burst["avg"], burst_tuple(burst), None))
+        with lock:
+            batch.append(record)
+
+    scheduler = ProbeScheduler()
+    prober = TargetProber(scheduler, sink, budget_per_sec, reserved)
+    scheduler.start()
+    try:
+        while True:
+            if conn.poll(flush_interval):
+                targets = conn.recv()
+                if targets is None:
+                    break
+                prober.sync(targets)
+            with lock:
+                out = b"".join(batch)
+                batch.clear()
+            if out:
+                conn.send_bytes(out)
+    except (EOFError, OSError):
+        pass  # the leader went away
+
+
+class ShardPool:
+    def __init__(self, shards: int, sink: Optional[Callable[[list], None]] = None,
+                 budget_per_sec: float = PROBE_BUDGET_PER_SEC, reserved: float = 0.0,
+                 flush_interval: float = FLUSH_INTERVAL):
+        self.shards = shards
+        self.sink = sink or partial(bus.publish, TOPIC_PROBES)
+        self.budget_per_sec = budget_per_sec
+        self.reserved = reserved
+        self.flush_interval = flush_interval
+        self.ring = HashRing(shards)
+        self._ctx = multiprocessing.get_context(START_METHOD)
+        self._workers: List[Optional[tuple]] = [None] * shards
+        self._assignment: List[List[Dict[str, Any]]] = [[] for _ in range(shards)]
+        self._lock = threading.Lock()
+        self._running = False
+
+    def _spawn(self, index: int):
+        parent, child = self._ctx.Pipe()
+        proc = self._ctx.Process(
+            target=_shard_main,
+            args=(child, self.budget_per_sec / self.shards, self.reserved / self.shards, self.flush_interval),
+            name=f"probe-shard-{index}",
+            daemon=True,
+        )
+        proc.start()
+        child.close()
+        self._workers[index] = (proc, parent)
+        parent.send(self._assignment[index])
+
+    def start(self):
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            for i in range(self.shards):
+                self._spawn(i)
+        threading.Thread(target=self._receive, daemon=True, name="Probe-Shards").start()
+        logger.info("Started %d probe shard process(es)", self.shards)
+
+    def partition(self, targets) -> List[List[Dict[str, Any]]]:
+        parts: List[List[Dict[str, Any]]] = [[] for _ in range(self.shards)]
+        for t in targets:
+            if t.get("id") is not None:
+                parts[self.ring.node_for(str(t["id"]))].append(t)
+        return parts
+
+    def assign(self, targets) -> int:
+        """Send each shard its slice of ``targets`` (only shards whose slice changed)."""
+        parts = self.partition(targets)
+        with self._lock:
+            for i, part in enumerate(parts):
+                if part == self._assignment[i]:
+                    continue
+                self._assignment[i] = part
+                if self._workers[i] is not None:
+                    try:
+                        self._workers[i][1].send(part)
+                    except OSError as e:
+                        logger.warning("Failed to send assignment to probe shard %d: %s", i, e)
+        return sum(len(p) for p in parts)
+
+    def _receive(self):
+        while self._running:
+            with self._lock:
+                conns = {w[1]: i for i, w in enumerate(self._workers) if w is not None}
+            for conn in wait(list(conns), timeout=1.0):
+                index = conns[conn]
+                try:
+                    data = conn.recv_bytes()
+                except (EOFError, OSError):
+                    if not self._running:
+                        return
+                    logger.warning("Probe shard %d exited, restarting it", index)
+                    with self._lock:
+                        conn.close()
+                        self._spawn(index)
+                    continue
+                try:
+                    self.sink(list(unpack_results(data)))
+                except Exception as e:
+                    logger.warning("Failed to record results from probe shard %d: %s", index, e)
+
+    def stop(self):
+        with self._lock:
+            self._running = False
+            for worker in self._workers:
+                if worker is None:
+                    continue
+                proc, conn = worker
+                try:
+                    conn.send(None)
+                except OSError:
+                    pass
+                proc.join(timeout=2)
+                if proc.is_alive():
+                    proc.terminate()
+            self._workers = [None] * self.shards
+
@@ -0,0 +1,263 @@
+"""
+Prober registry: measure each monitoring target with the protocol its ``type`` names.
+
+Every prober is a coroutine on the shared probe engine loop, so adding a probe
+type costs no extra threads. They share the engine's resolver cache and
+concurrency limit, one SSL context and a keep-alive HTTP connection pool, and
+all return the record from ``network.new_probe_result`` with ``latency`` set to
+the value that matters for that type:
+
+========  ==========================================  ===================
+type      what is measured                            ``latency``
+========  ==========================================  ===================
+``tcp``   TCP three-way handshake                     ``connect_ms``
+``dns``   UDP DNS query/response to the target        query RTT
+``http``  request to first response byte (keep-alive)  ``ttfb_ms``
+``tls``   TLS handshake after TCP connect             ``tls_ms``
+``icmp``  ICMP echo (``app.icmp``)                    echo RTT
+========  ==========================================  ===================
+
+Unknown types fall back to ``tcp``. ``run_burst`` fires several paced probes
+of one target within a tick and summarises them for the TSDB.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import socket
+import ssl
+import time
+import urllib.parse
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.config import PROBE_BURST_COUNT, PROBE_BURST_INTERVAL
+from app.icmp import icmp_pinger
+from app.network import elapsed_ms, new_probe_result, split_host_port
+from app.probe_engine import probe_engine
+from app.resolver import TYPE_A, TYPE_NS, build_query, parse_response
+from app.tsdb import summarize_burst
+
+logger = logging.getLogger(__name__)
+
+HTTP_POOL_SIZE = 2
+HTTP_IDLE_TIMEOUT = 30.0
+HTTP_MAX_BODY = 1 << 20
+USER_AGENT = "console-web-probe"
+
+PROBERS: Dict[str, Callable[[Dict[str, Any], dict, int], Awaitable]] = {}
+
+_ssl_context: Optional[ssl.SSLContext] = None
+_http_pool: Dict[Tuple[str, str, int], List[tuple]] = {}
+if hasattr(os, "register_at_fork"):
+    # Pooled connections belong to the parent's event loop
+    os.register_at_fork(after_in_child=_http_pool.clear)
+
+
+def prober(name: str):
+    """Register ``fn(target, result, started_ns)`` as the prober for ``type == name``."""
+    def decorator(fn):
+        PROBERS[name] = fn
+        return fn
+    return decorator
+
+
+def ssl_context() -> ssl.SSLContext:
+    global _ssl_context
+    if _ssl_context is None:
+        _ssl_context = ssl.create_default_context()
+    return _ssl_context
+
+
+async def run_probe(target: Dict[str, Any], timeout: Optional[float] = None) -> dict:
+    """Probe one ``targets.json`` entry with the prober for its ``type``."""
+    kind = str(target.get("type") or "tcp").lower()
+    if kind not in PROBERS:
+        kind = "tcp"
+    result = new_probe_result(str(target.get("target", "")), kind)
+
+    async def work(result, started):
+        await PROBERS[kind](target, result, started)
+
+    return await probe_engine.measure(result, work, timeout)
+
+
+async def run_burst(target: Dict[str, Any], count: int = PROBE_BURST_COUNT, interval: float = PROBE_BURST_INTERVAL,
+                    timeout: Optional[float] = None) -> Dict[str, Any]:
+    """``count`` probes started ``interval`` seconds apart (each with its own deadline).
+
+    Returns ``summarize_burst`` figures plus the individual probe ``results``.
+    A probe that set ``error`` counts as lost even when it measured a latency
+    (an HTTP 5xx still has a time to first byte).
+    """
+    async def paced(i):
+        await asyncio.sleep(i * interval)
+        return await run_probe(target, timeout)
+
+    results = await asyncio.gather(*(paced(i) for i in range(max(1, int(count)))))
+    summary = summarize_burst([None if r.get("error") else r["latency"] for r in results])
+    summary["results"] = results
+    return summary
+
+
+@prober("tcp")
+async def probe_tcp(target, result, started):
+    host, port = split_host_port(str(target["target"]))
+    (await probe_engine.connect(host, port, result, started)).close()
+    result["latency"] = result["connect_ms"]
+
+
+@prober("dns")
+async def probe_dns(target, result, started):
+    """One UDP query to the target server; any well-formed reply counts, ``status`` is its rcode."""
+    host, port = split_host_port(str(target["target"]), default_port=53)
+    name = str(target.get("query") or ".")
+    qtype = TYPE_NS if name == "." else TYPE_A
+    sock = await probe_engine.connect(host, port, result, started, sock_type=socket.SOCK_DGRAM)
+    loop = asyncio.get_running_loop()
+    try:
+        qid = random.getrandbits(16)
+        sent = time.perf_counter_ns()
+        await loop.sock_sendall(sock, build_query(qid, name, qtype))
+        while True:
+            data = await loop.sock_recv(sock, 4096)
+            try:
+                rcode, _, _ = parse_response(data, qid, qtype)
+            except (ValueError, IndexError):
+                continue
+            break
+        result["latency"] = elapsed_ms(sent)
+        result["status"] = rcode
+    finally:
+        sock.close()
+
+
+def _http_url(target: str) -> urllib.parse.SplitResult:
+    if "://" not in target:
+        target = f"http://{target}"
+    return urllib.parse.urlsplit(target)
+
+
+async def _http_open(scheme, host, port, result, started):
+    sock = await probe_engine.connect(host, port, result, started)
+    tls_start = time.perf_counter_ns()
+    try:
+        reader, writer = await asyncio.open_connection(
+            sock=sock,
+            ssl=ssl_context() if scheme == "https" else None,
+            server_hostname=host if scheme == "https" else None,
+        )
+    except BaseException:
+        sock.close()
+        raise
+    if scheme == "https":
+        result["tls_ms"] = elapsed_ms(tls_start)
+    return reader, writer
+
+
+async def _read_body(reader: asyncio.StreamReader, headers: Dict[str, str]) -> bool:
+    """Consume the response body; returns whether the connection can be reused."""
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        total = 0
+        while True:
+            size = int((await reader.readline()).split(b";")[0].strip() or b"0", 16)
+            if size == 0:
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return True
+            total += size
+            if total > HTTP_MAX_BODY:
+                return False
+            await reader.readexactly(size + 2)
+    if "content-length" in headers:
+        length = int(headers["content-length"])
+        if length > HTTP_MAX_BODY:
+            return False
+        await reader.readexactly(length)
+        return True
+    return False
+
+
+@prober("http")
+async def probe_http(target, result, started):
+    """Time from writing a GET to the status line, reusing pooled keep-alive connections."""
+    url = _http_url(str(target["target"]))
+    scheme = url.scheme.lower()
+    host = url.hostname or ""
+    port = url.port or (443 if scheme == "https" else 80)
+    key = (scheme, host, port)
+    path = (url.path or "/") + (f"?{url.query}" if url.query else "")
+    request = (
+        f"GET {path} HTTP/1.1\r\nHost: {url.netloc}\r\nUser-Agent: {USER_AGENT}\r\n"
+        "Accept: */*\r\nConnection: keep-alive\r\n\r\n"
+    ).encode()
+
+    for attempt in range(2):
+        idle = _http_pool.get(key) or []
+        conn = None
+        while idle:
+            reader, writer, last_used = idle.pop()
+            if time.monotonic() - last_used < HTTP_IDLE_TIMEOUT and not reader.at_eof():
+                conn = (reader, writer)
+                break
+            writer.close()
+        reused = conn is not None
+        if conn is None:
+            conn = await _http_open(scheme, host, port, result, started)
+        reader, writer = conn
+        result["address"] = (writer.get_extra_info("peername") or (None,))[0]
+        reusable = False
+        try:
+            sent = time.perf_counter_ns()
+            writer.write(request)
+            await writer.drain()
+            status_line = await reader.readline()
+            if not status_line:
+                raise EOFError("connection closed before response")
+            result["ttfb_ms"] = result["latency"] = elapsed_ms(sent)
+            parts = status_line.split()
+            result["status"] = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else None
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            reusable = await _read_body(reader, headers) and headers.get("connection", "").lower() != "close"
+            if result["status"] is not None and result["status"] >= 500:
+                result["error"] = f"HTTP {result['status']}"
+            return
+        except (OSError, EOFError) as e:
+            # A pooled connection the server already closed: retry once on a fresh one
+            if reused and attempt == 0:
+                logger.debug("Stale keep-alive connection to %s:%s: %s", host, port, e)
+                continue
+            raise
+        finally:
+            if reusable and len(_http_pool.setdefault(key, [])) < HTTP_POOL_SIZE:
+                _http_pool[key].append((reader, writer, time.monotonic()))
+            else:
+                writer.close()
+
+
+@prober("tls")
+async def probe_tls(target, result, started):
+    url = _http_url(str(target["target"]))
+    host = url.hostname or ""
+    port = url.port or 443
+    _, writer = await _http_open("https", host, port, result, started)
+    result["latency"] = result["tls_ms"]
+    writer.close()
+
+
+@prober("icmp")
+async def probe_icmp(target, result, started):
+    host, _ = split_host_port(str(target["target"]))
+    _, ip = await probe_engine.resolve(host, result, started)
+    echo = await probe_engine.run_blocking(icmp_pinger.ping, ip, 1, probe_engine.timeout)
+    result["latency"] = echo["rtt_ms"]
+    result["status"] = echo["ttl"]
+    if echo["rtt_ms"] is None:
+        result["error"] = "no echo reply"
+
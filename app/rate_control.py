@@ -0,0 +1,117 @@
+"""
+Adaptive probe rate control.
+
+``AdaptiveRate`` picks each target's next probe interval from its recent
+health: after ``BACKOFF_AFTER`` consecutive ticks with no reply the interval
+doubles per further miss (up to ``MAX_BACKOFF_FACTOR`` times the configured
+``freq``), and a tick whose average crosses ``threshold_warn``/``threshold_crit``
+divides it by ``WARN_BOOST``/``CRIT_BOOST`` for ``BOOST_HOLD`` seconds. Boosts
+are capped so the estimated probe rate of all targets stays within the global
+budget, and ``TokenBucket`` enforces that budget at dispatch time.
+"""
+
+import math
+import threading
+import time
+from typing import Any, Dict, Optional
+
+BACKOFF_AFTER = 3
+MAX_BACKOFF_FACTOR = 16
+WARN_BOOST = 2
+CRIT_BOOST = 4
+BOOST_HOLD = 300.0
+MIN_INTERVAL = 5.0
+
+
+class TokenBucket:
+    """Probe budget: ``rate`` tokens per second, holding at most ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._stamp = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def take(self, n: float, force: bool = False) -> bool:
+        """Spend ``n`` tokens if available; ``force`` always spends (going into debt)."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= n or force:
+                self._tokens -= n
+                return True
+            return False
+
+
+def _threshold(target: Dict[str, Any], key: str) -> float:
+    try:
+        return float(target.get(key))
+    except (TypeError, ValueError):
+        return math.inf
+
+
+class AdaptiveRate:
+    def __init__(self, budget_per_sec: float, clock=time.monotonic):
+        self.budget = budget_per_sec
+        self._clock = clock
+        self._state: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def forget(self, keep):
+        """Drop state for targets no longer scheduled."""
+        with self._lock:
+            for key in [k for k in self._state if k not in keep]:
+                del self._state[key]
+
+    def load(self, exclude: Optional[str] = None) -> float:
+        """Estimated probes per second of every tracked target except ``exclude``."""
+        return sum(s["probes"] / s["interval"] for k, s in self._state.items() if k != exclude)
+
+    def interval(self, key: str) -> Optional[float]:
+        with self._lock:
+            state = self._state.get(key)
+            return state["interval"] if state else None
+
+    def observe(self, key: str, target: Dict[str, Any], base: float, probes: int,
+                received: int, avg: Optional[float], reserved: float = 0.0) -> float:
+        """Fold one tick's outcome in and return the interval to use from now on.
+
+        ``reserved`` is probe rate taken by jobs outside the controller (the
+        dashboard sweep), which boosts must leave room for.
+        """
+        now = self._clock()
+        with self._lock:
+            state = self._state.setdefault(key, {"failures": 0, "boost_until": 0.0, "boost": 1, "interval": base})
+            state["probes"] = probes
+            if not received:
+                state["failures"] += 1
+                state["boost_until"] = 0.0
+                extra = state["failures"] - BACKOFF_AFTER
+                factor = min(MAX_BACKOFF_FACTOR, 2 ** (extra + 1)) if extra >= 0 else 1
+                interval = base * factor
+            else:
+                state["failures"] = 0
+                boost = 1
+                if avg is not None and avg >= _threshold(target, "threshold_crit"):
+                    boost = CRIT_BOOST
+                elif avg is not None and avg >= _threshold(target, "threshold_warn"):
+                    boost = WARN_BOOST
+                if boost > 1:
+                    state["boost"] = max(boost, state["boost"]) if now < state["boost_until"] else boost
+                    state["boost_until"] = now + BOOST_HOLD
+                elif now >= state["boost_until"]:
+                    state["boost"] = 1
+                interval = base / state["boost"]
+                if state["boost"] > 1:
+                    interval = max(interval, MIN_INTERVAL if base > MIN_INTERVAL else base)
+                    headroom = self.budget - reserved - self.load(exclude=key)
+                    floor = probes / headroom if headroom > 0 else base
+                    interval = min(base, max(interval, floor))
+            state["interval"] = interval
+            return interval
@@ -0,0 +1,199 @@
+"""
+TTL-respecting DNS cache for probe targets.
+
+``getaddrinfo`` does not expose record TTLs, so lookups send a minimal A/AAAA
+query straight to the first ``/etc/resolv.conf`` nameserver and keep the answer
+for the smallest TTL in it (clamped to ``[MIN_TTL, MAX_TTL]``). Anything the
+wire path cannot answer - ``/etc/hosts`` names, search domains, truncated or
+failed replies - falls back to ``getaddrinfo`` cached for ``DEFAULT_TTL``.
+Failures are cached for ``NEGATIVE_TTL`` so a dead name is not re-queried on
+every probe. IP literals never touch the cache.
+"""
+
+import ipaddress
+import logging
+import os
+import random
+import socket
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MIN_TTL = 5
+MAX_TTL = 3600
+DEFAULT_TTL = 60
+NEGATIVE_TTL = 15
+QUERY_TIMEOUT = 1.0
+RESOLV_CONF = "/etc/resolv.conf"
+
+TYPE_A = 1
+TYPE_NS = 2
+TYPE_AAAA = 28
+_HEADER = struct.Struct("!HHHHHH")
+_RR = struct.Struct("!HHIH")
+
+Address = Tuple[int, str]
+
+
+def _nameserver() -> Optional[str]:
+    try:
+        with open(RESOLV_CONF) as fh:
+            for line in fh:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] == "nameserver":
+                    return parts[1]
+    except OSError:
+        pass
+    return None
+
+
+def build_query(qid: int, name: str, qtype: int) -> bytes:
+    labels = b"".join(
+        bytes([len(label)]) + label for label in name.rstrip(".").encode("idna").split(b".") if label
+    )
+    return _HEADER.pack(qid, 0x0100, 1, 0, 0, 0) + labels + b"\0" + struct.pack("!HH", qtype, 1)
+
+
+def _skip_name(data: bytes, offset: int) -> int:
+    while True:
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            return offset + 2
+        offset += 1
+        if length == 0:
+            return offset
+        offset += length
+
+
+def parse_response(data: bytes, qid: int, qtype: int) -> Tuple[int, List[str], Optional[int]]:
+    """Decode a reply into ``(rcode, addresses, min_ttl)``.
+
+    Raises ``ValueError`` for a mismatched id or truncated reply.
+    """
+    rid, flags, qdcount, ancount, _, _ = _HEADER.unpack_from(data)
+    if rid != qid or flags & 0x0200:
+        raise ValueError("unusable DNS reply")
+    offset = _HEADER.size
+    for _ in range(qdcount):
+        offset = _skip_name(data, offset) + 4
+    addresses, ttl = [], None
+    for _ in range(ancount):
+        offset = _skip_name(data, offset)
+        rtype, _, rttl, rdlength = _RR.unpack_from(data, offset)
+        offset += _RR.size
+        rdata = data[offset:offset + rdlength]
+        offset += rdlength
+        if rtype == qtype == TYPE_A and rdlength == 4:
+            addresses.append(socket.inet_ntop(socket.AF_INET, rdata))
+        elif rtype == qtype == TYPE_AAAA and rdlength == 16:
+            addresses.append(socket.inet_ntop(socket.AF_INET6, rdata))
+        else:
+            continue
+        ttl = rttl if ttl is None else min(ttl, rttl)
+    return flags & 0x000F, addresses, ttl
+
+
+def query(name: str, qtype: int, server: str, timeout: float = QUERY_TIMEOUT) -> Tuple[int, List[str], Optional[int]]:
+    qid = random.getrandbits(16)
+    family = socket.AF_INET6 if ":" in server else socket.AF_INET
+    with socket.socket(family, socket.SOCK_DGRAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect((server, 53))
+        sock.send(build_query(qid, name, qtype))
+        deadline = time.monotonic() + timeout
+        while True:
+            data = sock.recv(4096)
+            try:
+                return parse_response(data, qid, qtype)
+            except (ValueError, struct.error, IndexError):
+                # Stray or spoofed datagram: keep waiting for ours until the deadline
+                if time.monotonic() >= deadline:
+                    raise socket.timeout("no usable DNS reply")
+                sock.settimeout(max(0.01, deadline - time.monotonic()))
+
+
+class Resolver:
+    def __init__(self):
+        self._cache: Dict[str, Tuple[float, List[Address]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_lock)
+        self.misses = 0
+
+    @staticmethod
+    def literal(host: str) -> Optional[List[Address]]:
+        try:
+            ip = ipaddress.ip_address(host)
+        except ValueError:
+            return None
+        return [(socket.AF_INET6 if ip.version == 6 else socket.AF_INET, str(ip))]
+
+    def cached(self, host: str) -> Optional[List[Address]]:
+        """Addresses for ``host`` if known and fresh, without doing any I/O.
+
+        Returns ``[]`` for a cached failure and ``None`` on a miss.
+        """
+        literal = self.literal(host)
+        if literal is not None:
+            return literal
+        key = host.lower()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+        return None
+
+    def _lookup(self, host: str) -> Tuple[List[Address], int]:
+        server = _nameserver()
+        if server and "." in host.rstrip("."):
+            for qtype, family in ((TYPE_A, socket.AF_INET), (TYPE_AAAA, socket.AF_INET6)):
+                try:
+                    rcode, addresses, ttl = query(host, qtype, server)
+                except (OSError, ValueError, UnicodeError) as e:
+                    logger.debug("DNS query for %s via %s failed: %s", host, server, e)
+                    break
+                if rcode != 0:
+                    break
+                if addresses:
+                    return [(family, a) for a in addresses], min(MAX_TTL, max(MIN_TTL, ttl or DEFAULT_TTL))
+
+        infos = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        addresses = []
+        for family, _, _, _, sockaddr in infos:
+            if (family, sockaddr[0]) not in addresses:
+                addresses.append((family, sockaddr[0]))
+        return addresses, DEFAULT_TTL
+
+    def resolve(self, host: str) -> List[Address]:
+        """Blocking lookup through the cache; returns ``[]`` if the name does not resolve."""
+        addresses = self.cached(host)
+        if addresses is not None:
+            return addresses
+        with self._lock:
+            self.misses += 1
+        try:
+            addresses, ttl = self._lookup(host)
+        except (OSError, UnicodeError) as e:
+            logger.debug("Resolving %s failed: %s", host, e)
+            addresses, ttl = [], NEGATIVE_TTL
+        if not addresses:
+            ttl = NEGATIVE_TTL
+        with self._lock:
+            self._cache[host.lower()] = (time.monotonic() + ttl, addresses)
+        return addresses
+
+    def _reset_lock(self):
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+resolver = Resolver()
+
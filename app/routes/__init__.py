@@ -5,6 +5,7 @@ from app.routes.targets import targets_bp
 from app.routes.diagnostics import diagnostics_bp
 from app.routes.acme import acme_bp
 from app.routes.events import events_bp
+from app.routes.assets import assets_bp
 
 def register_blueprints(app: Flask):
     app.register_blueprint(views_bp)
@@ -13,3 +14,4 @@ def register_blueprints(app: Flask):
     app.register_blueprint(diagnostics_bp)
     app.register_blueprint(acme_bp)
     app.register_blueprint(events_bp)
+    app.register_blueprint(assets_bp)
@@ -1,6 +1,8 @@
 import logging
 from flask import Blueprint, jsonify, Response, request
+from datetime import date
 from app import acme_manager
+from app.http_cache import response_cache, file_stamp
 
 logger = logging.getLogger(__name__)
 
@@ -27,8 +29,13 @@ def acme_challenge_file(filename):
         logger.exception("Error serving ACME challenge file: %s", e)
     return "Challenge file not found", 404
 
+def _cert_version():
+    files = (acme_manager.CERT_FILE, acme_manager.KEY_FILE, acme_manager.META_FILE)
+    return tuple(file_stamp(f) for f in files), date.today()
+
 @acme_bp.route("/acme/status")
 @acme_bp.route("/api/acme/status")
+@response_cache.cached(_cert_version, ttl=300)
 def acme_status_route():
     return jsonify(acme_manager.get_cert_status())
 
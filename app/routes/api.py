@@ -4,7 +4,6 @@ import sys
 import json
 import zipfile
 import platform
-import socket
 import time
 import signal
 import shutil
@@ -13,16 +12,23 @@ import threading
 import subprocess
 import shlex
 import urllib.request
-from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from datetime import date, datetime
+from functools import partial
+from typing import Optional
 from flask import Blueprint, jsonify, Response, request, stream_with_context
 
 import psutil
 
-from app.config import PING_TARGETS, COMMANDS, BASE_DIR
-from app.tsdb import tsdb
+from app.config import PING_TARGETS, COMMANDS, BASE_DIR, UPTIME_FILE
+from app.http_cache import response_cache, file_stamp, conditional
+from app.tsdb import tsdb, parse_duration, RANGE_AGGREGATES
+from app.bus import TOPIC_SAMPLES
+from app.sse import hub, encode_event, parse_event_id
+from app import sampler
+from app.probe_engine import probe_engine
 from app.network import (
-    tcp_ping, icmp_ping, get_public_ip, is_private_ip, query_isp,
+    tcp_probe, icmp_ping, get_public_ip, is_private_ip, query_isp,
     ensure_isp_info, get_auto_node_id, ISP_FULL_NAME, ISP_SHORT_NAME, humanize, humanize_bytes
 )
 from app.system_stats import get_system_stats_data, get_uptime_history_data
@@ -33,12 +39,38 @@ _last_net = None
 _last_time = datetime.now()
 CLIENT_ISP_CACHE = {}
 
-@api_bp.route("/api/status/summary")
-def api_status_summary():
+def request_client_ip():
     client_ip = request.headers.get("X-Forwarded-For", request.remote_addr)
     if client_ip and "," in client_ip:
         client_ip = client_ip.split(",")[0].strip()
-    
+    return client_ip
+
+SUMMARY_TTL = 60
+_summary_cache = {"version": None, "expires": 0.0, "summary": None}
+_summary_lock = threading.Lock()
+
+def shared_status_summary():
+    """``status_summary()`` without visitor fields, rebuilt when a new sample lands or after ``SUMMARY_TTL``."""
+    version = tsdb.last_timestamp("global")
+    with _summary_lock:
+        if _summary_cache["version"] == version and _summary_cache["expires"] > time.monotonic():
+            return _summary_cache["summary"]
+    summary = status_summary()
+    with _summary_lock:
+        _summary_cache.update(version=version, expires=time.monotonic() + SUMMARY_TTL, summary=summary)
+    return summary
+
+@api_bp.route("/api/status/summary")
+def api_status_summary():
+    # Only the visitor fields differ per client, so they are merged into the shared
+    # summary here instead of caching a whole response per IP
+    summary = shared_status_summary()
+    ip_info = {**summary["ipInfo"], "visitorIp": request_client_ip() or "127.0.0.1",
+               "visitorIpSource": "request client header"}
+    return conditional(jsonify({**summary, "ipInfo": ip_info}))
+
+def status_summary(client_ip=None):
+    """Dashboard health summary; ``client_ip=None`` leaves out the visitor fields (shared realtime event)."""
     egress_ip = get_public_ip()
     listen_ip = "72.18.80.151"
     
@@ -87,8 +119,10 @@ def api_status_summary():
         else f"{reason}"
     )
 
-    now_dt = datetime.now()
-    return jsonify({
+    # Stamped with the newest sample, so the summary only changes when the data does
+    sampled_at = history_samples[-1]["timestamp"] if history_samples else time.time()
+    now_dt = datetime.fromtimestamp(sampled_at)
+    summary = {
         "nodeId": get_auto_node_id(egress_ip),
         "overallStatus": overall_status,
         "statusReason": reason,
@@ -101,82 +135,292 @@ def api_status_summary():
         "totalChecks": total_checks,
         "lastSuccessfulSync": now_dt.strftime("%H:%M:%S"),
         "lastUpdateReadable": f"Last update {now_dt.strftime('%H:%M:%S')}",
-        "lastUpdateTimestamp": time.time(),
+        "lastUpdateTimestamp": sampled_at,
         "realtimeConnected": True,
         "ipInfo": {
             "serverListen": f"{listen_ip}:8180",
             "serverListenSource": "bind 0.0.0.0:8080",
             "serverEgress": egress_ip if not is_private_ip(egress_ip) else "37.114.48.47",
             "serverEgressSource": "ipify API",
-            "visitorIp": client_ip or "127.0.0.1",
+            "visitorIp": client_ip,
             "visitorIpSource": "request client header",
             "localInterface": "37.114.48.47 / 24",
             "localInterfaceSource": "eth0 interface",
             "ipv6Egress": "2a0e:6a80:3:483::100"
         }
-    })
+    }
+    if client_ip is None:
+        del summary["ipInfo"]["visitorIp"], summary["ipInfo"]["visitorIpSource"]
+    return summary
+
+MAX_ROLLUP_POINTS = 1500
+
+def rollup_history(step: int, range_seconds=None):
+    """Downsampled ``global`` history with each bucket's per-target averages joined in as ``targets_detail``."""
+    limit = min(MAX_ROLLUP_POINTS, max(1, range_seconds // step)) if range_seconds else 60
+    history = tsdb.query_rollup("global", step, limit)
+    per_target = {
+        key: {p["timestamp"]: p["avg"] for p in tsdb.query_rollup(key, step, limit)}
+        for key in PING_TARGETS
+    }
+    for point in history:
+        point["targets_detail"] = {key: buckets.get(point["timestamp"]) for key, buckets in per_target.items()}
+    return history
+
+CLIENT_PING_TTL = 60
+CLIENT_PING_CACHE_MAX = 1024
+CLIENT_PING_CACHE: "OrderedDict[str, dict]" = OrderedDict()
+_client_ping_lock = threading.Lock()
+
+def client_ping(ip: str, wait: bool = False):
+    """Cached ICMP latency to the visitor; refreshes in the background once older than ``CLIENT_PING_TTL``.
+
+    The cache holds at most ``CLIENT_PING_CACHE_MAX`` visitors, evicting the
+    least recently seen first.
+    """
+    now = time.monotonic()
+    with _client_ping_lock:
+        entry = CLIENT_PING_CACHE.get(ip)
+        if entry is not None:
+            CLIENT_PING_CACHE.move_to_end(ip)
+        if entry is None or (now - entry["at"] > CLIENT_PING_TTL and entry["future"] is None):
+            entry = {"at": entry["at"] if entry else 0.0, "value": entry["value"] if entry else None, "future": None}
+            CLIENT_PING_CACHE[ip] = entry
+            while len(CLIENT_PING_CACHE) > CLIENT_PING_CACHE_MAX:
+                CLIENT_PING_CACHE.popitem(last=False)
+
+            def _store(fut, entry=entry):
+                entry["value"] = None if fut.cancelled() or fut.exception() else fut.result()
+                entry["at"] = time.monotonic()
+                entry["future"] = None
+
+            entry["future"] = probe_engine.submit(probe_engine.run_blocking(icmp_ping, ip))
+            entry["future"].add_done_callback(_store)
+    future = entry["future"]
+    if wait and future is not None:
+        try:
+            return future.result(timeout=10)
+        except Exception:
+            return None
+    return entry["value"]
 
 @api_bp.route("/pings")
 @api_bp.route("/api/pings")
 def pings():
-    client_ip = request.headers.get("X-Forwarded-For", request.remote_addr)
-    if client_ip and "," in client_ip:
-        client_ip = client_ip.split(",")[0].strip()
+    client_ip = request_client_ip()
 
-    target_filter = request.args.get("target_id", "all").strip().lower()
+    live = request.args.get("live", "").lower() in ("1", "true", "yes")
+    try:
+        results = sampler.probe_live() if live else sampler.latest_results()
+    except Exception as e:
+        return jsonify(error=f"Live probe failed: {e}"), 503
+    sampled_at = results.pop("timestamp", None)
+    results["client_ping"] = client_ping(client_ip, wait=live) if client_ip and client_ip != "127.0.0.1" else None
 
-    with ThreadPoolExecutor(max_workers=len(PING_TARGETS) + 1) as executor:
-        futures = {
-            executor.submit(tcp_ping, host): key
-            for key, host in PING_TARGETS.items()
+    stats = tsdb.get_stats("global")
+    history = chart_history(*chart_view(request.args.get("granularity", ""), request.args.get("range", "")),
+                            targets_detail=dict(results))
+
+    results["source"] = "live" if live else "snapshot"
+    results["sampled_at"] = sampled_at
+    fresh = history_since(history, parse_float(request.args.get("since")))
+    if fresh is not None:
+        # Incremental poll: only the points at or after ``since`` (the client's newest, which
+        # may be a still-open rollup bucket); per-target values ride in targets_detail alone
+        for point in fresh:
+            point.pop("meta", None)
+        results["delta"] = True
+        results["stats"] = {**stats, "history": fresh, "window": len(history)}
+    else:
+        results["delta"] = False
+        results["stats"] = {
+            **stats,
+            "history": history
         }
-        if client_ip and client_ip != "127.0.0.1":
-            futures[executor.submit(icmp_ping, client_ip)] = "client_ping"
-        results = {key: future.result() for future, key in futures.items()}
 
-    if "client_ping" not in results:
-        results["client_ping"] = None
+    return jsonify(results)
 
-    if target_filter != "all" and target_filter in results:
-        main_lat = results.get(target_filter)
+def chart_view(granularity: str, range_arg: str):
+    """Normalise chart query args to ``(step, range_seconds)``; ``(0, 0)`` is the raw last-60 view."""
+    step = parse_duration(granularity)
+    if not step or not tsdb.tier_for(step):
+        return 0, 0
+    return step, parse_duration(range_arg) or 0
+
+def chart_history(step: int, range_seconds: int, targets_detail):
+    """``global`` history for a chart view, each point carrying per-target values as ``targets_detail``."""
+    if step:
+        history = rollup_history(step, range_seconds)
     else:
-        main_lat = next((v for k, v in results.items() if k != "client_ping" and isinstance(v, (int, float))), None)
-
-    now_ts = time.time()
-    targets_detail = {k: v for k, v in results.items() if k != "stats"}
-
-    # Record into TimeSeriesDB engine
-    tsdb.insert("global", now_ts, main_lat, {"target": target_filter, "details": targets_detail})
-    for k, v in targets_detail.items():
-        if isinstance(v, (int, float)):
-            tsdb.insert(k, now_ts, v)
-
-    stats = tsdb.get_stats("global")
-    history = tsdb.query("global", limit=60)
-
+        history = tsdb.query("global", limit=60)
     for point in history:
         if "details" not in point and "meta" in point:
             point["targets_detail"] = point["meta"].get("details", {})
         elif "targets_detail" not in point:
             point["targets_detail"] = targets_detail
+    return history
+
+def parse_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def history_since(history, since: Optional[float]):
+    """Points of ``history`` with ``timestamp >= since``, or ``None`` (send everything) when
+    ``since`` is missing or older than the window."""
+    if since is None or not history or since < history[0]["timestamp"]:
+        return None
+    return [p for p in history if p["timestamp"] >= since]
+
+PINGS_STREAM_WINDOW = 60
 
-    results["stats"] = {
-        **stats,
-        "history": history
+def _event_id(timestamp: float) -> int:
+    return int(timestamp * 1000)
+
+def _pings_snapshot():
+    history = tsdb.query("global", limit=PINGS_STREAM_WINDOW)
+    stats = tsdb.get_stats("global")
+    event_id = _event_id(history[-1]["timestamp"]) if history else 0
+    return event_id, {"delta": False, "stats": {**stats, "history": history}}
+
+def _pings_delta(since_id: int):
+    history = tsdb.query("global", limit=PINGS_STREAM_WINDOW)
+    if not history or since_id < _event_id(history[0]["timestamp"]):
+        return None
+    stats = tsdb.get_stats("global")
+    fresh = [p for p in history if _event_id(p["timestamp"]) > since_id]
+    return _event_id(history[-1]["timestamp"]), {
+        "delta": True, "stats": {**stats, "history": fresh, "window": PINGS_STREAM_WINDOW}
     }
 
-    return jsonify(results)
+pings_channel = hub.channel("pings", _pings_snapshot, TOPIC_SAMPLES, keys=("global",), delta=_pings_delta)
 
 @api_bp.route("/api/pings/stream")
 def api_pings_stream():
-    def generate():
-        while True:
-            history = tsdb.query("global", limit=60)
-            stats = tsdb.get_stats("global")
-            payload = json.dumps({"stats": {**stats, "history": history}})
-            yield f"data: {payload}\n\n"
-            time.sleep(10)
-    return Response(stream_with_context(generate()), mimetype="text/event-stream")
+    if not hub.acquire():
+        return jsonify(error="Too many live streams on this worker, retry later"), 503, {"Retry-After": "30"}
+    last_id = parse_event_id(request.headers.get("Last-Event-ID") or request.args.get("last_event_id"))
+    resp = Response(pings_channel.stream(last_id), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    resp.call_on_close(hub.release)
+    return resp
+
+REALTIME_SUMMARY_INTERVAL = 10
+REALTIME_STATS_INTERVAL = 5
+# Chart views the dashboard offers (granularity select x range buttons); only these get live channels
+VIEW_GRANULARITIES = ("1m", "5m", "15m", "1h")
+VIEW_RANGES = ("1h", "6h", "24h", "7d", "30d")
+_view_lock = threading.Lock()
+
+def _view_event(step: int, range_seconds: int, since_id: Optional[int] = None):
+    """``pings`` event for one chart view: the ``/api/pings`` payload, or its delta after ``since_id``."""
+    results = sampler.latest_results()
+    sampled_at = results.pop("timestamp", None)
+    history = chart_history(step, range_seconds, dict(results))
+    stats = tsdb.get_stats("global")
+    payload = {**results, "source": "snapshot", "sampled_at": sampled_at, "delta": False}
+    if since_id is None:
+        payload["stats"] = {**stats, "history": history}
+    else:
+        if not history or since_id < _event_id(history[0]["timestamp"]):
+            return None
+        # Points (or rollup buckets) that end after the client's last sample, meta dropped as in /api/pings
+        fresh = [p for p in history if _event_id(p["timestamp"] + step) > since_id]
+        for point in fresh:
+            point.pop("meta", None)
+        payload["delta"] = True
+        payload["stats"] = {**stats, "history": fresh, "window": len(history)}
+    return _event_id(sampled_at or 0), payload
+
+def view_channel(step: int, range_seconds: int):
+    """Shared ``pings`` channel of a chart view, created on first use.
+
+    Channels live as long as the worker, so callers must only pass views built
+    from ``VIEW_GRANULARITIES`` x ``VIEW_RANGES``.
+    """
+    name = f"pings:{step}:{range_seconds}"
+    with _view_lock:
+        channel = hub.channels.get(name)
+        if channel is None:
+            channel = hub.channel(
+                name, partial(_view_event, step, range_seconds), TOPIC_SAMPLES, keys=("global",),
+                delta=partial(_view_event, step, range_seconds), event="pings",
+            )
+        return channel
+
+summary_channel = hub.channel("summary", lambda: (_event_id(time.time()), status_summary()),
+                              event="summary", ids=False)
+stats_channel = hub.channel("stats", lambda: (_event_id(time.time()), get_system_stats_data()),
+                            event="stats", ids=False)
+# Summary resolves the egress IP over the network, so refresh it off the sampler thread
+hub.ticker(summary_channel, REALTIME_SUMMARY_INTERVAL)
+hub.ticker(stats_channel, REALTIME_STATS_INTERVAL)
+
+@api_bp.route("/api/realtime")
+def api_realtime():
+    """One SSE connection multiplexing ``summary``, ``pings`` (for the requested chart view) and ``stats`` events.
+
+    ``pings`` events carry ids, so a reconnect resumes the chart with deltas; the
+    other two are re-sent whole. A ``client`` event first carries this visitor's IP.
+    """
+    granularity = request.args.get("granularity", "")
+    range_arg = request.args.get("range", "")
+    if (granularity and granularity not in VIEW_GRANULARITIES) or (range_arg and range_arg not in VIEW_RANGES):
+        return jsonify(error=f"granularity must be one of {', '.join(VIEW_GRANULARITIES)} "
+                             f"and range one of {', '.join(VIEW_RANGES)}"), 400
+    view = view_channel(*chart_view(granularity, range_arg))
+    if not hub.acquire():
+        return jsonify(error="Too many live streams on this worker, retry later"), 503, {"Retry-After": "30"}
+    last_id = parse_event_id(request.headers.get("Last-Event-ID") or request.args.get("last_event_id"))
+    client = encode_event(None, {"visitorIp": request_client_ip() or "127.0.0.1",
+                                 "visitorIpSource": "request client header"}, "client")
+    stream = hub.stream([summary_channel, view, stats_channel], {view.name: last_id}, preamble=[client])
+    resp = Response(stream, mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    resp.call_on_close(hub.release)
+    return resp
+
+def parse_time_arg(value, default: float) -> float:
+    """Accept epoch seconds or a look-back duration such as ``6h`` (meaning now - 6h)."""
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        seconds = parse_duration(value)
+        if seconds is None:
+            raise
+        return time.time() - seconds
+
+@api_bp.route("/api/series")
+def api_series():
+    series_id = request.args.get("id", "global").strip() or "global"
+    agg = request.args.get("agg", "avg").strip().lower()
+    now = time.time()
+    try:
+        end = parse_time_arg(request.args.get("to", "").strip(), now)
+        start = parse_time_arg(request.args.get("from", "").strip(), end - 3600)
+    except ValueError:
+        return jsonify(error="from/to must be epoch seconds or a duration like 6h"), 400
+    raw_step = request.args.get("step", "").strip()
+    step = parse_duration(raw_step) if raw_step else None
+    if raw_step and (step is None or step <= 0):
+        return jsonify(error="step must be a positive duration like 60, 5m or 1h"), 400
+    if agg not in RANGE_AGGREGATES:
+        return jsonify(error=f"agg must be one of {', '.join(RANGE_AGGREGATES)}"), 400
+    if start > end:
+        return jsonify(error="from must not be after to"), 400
+
+    result = tsdb.query_range(series_id, start, end, step=step, agg=agg)
+    return jsonify({
+        "id": series_id,
+        "from": start,
+        "to": end,
+        "step": step,
+        "agg": agg,
+        **result
+    })
 
 @api_bp.route("/stats")
 @api_bp.route("/api/stats")
@@ -184,6 +428,7 @@ def stats():
     return jsonify(get_system_stats_data())
 
 @api_bp.route("/api/uptime/history")
+@response_cache.cached(lambda: (file_stamp(UPTIME_FILE), date.today()))
 def api_uptime_history():
     return jsonify(get_uptime_history_data())
 
@@ -226,13 +471,13 @@ def ping_info():
     if not host:
         return Response("invalid url", status=400)
     port = parsed.port or 80
-    try:
-        ip = socket.gethostbyname(host)
-    except Exception:
-        ip = None
-    latency = tcp_ping(f"{host}:{port}")
+    probe = tcp_probe(f"{host}:{port}")
+    ip = probe["address"]
     isp = query_isp(ip) if ip else None
-    return jsonify(ip=ip, isp=isp, ping=latency, host=host)
+    return jsonify(
+        ip=ip, isp=isp, ping=probe["connect_ms"], host=host,
+        dns_ms=probe["dns_ms"], total_ms=probe["total_ms"], error=probe["error"],
+    )
 
 @api_bp.route("/ipcheck")
 def ipcheck_route():
@@ -245,6 +490,7 @@ def ipcheck_route():
         return jsonify(error=str(e)), 500
 
 @api_bp.route("/host")
+@response_cache.cached(lambda: None, ttl=3600)
 def host():
     try: uname = platform.uname()
     except Exception: uname = None
@@ -0,0 +1,22 @@
+from flask import Blueprint, abort, current_app, request
+
+from app.assets import CACHE_CONTROL, asset_url, lookup
+from app.compression import negotiate
+
+assets_bp = Blueprint("assets", __name__)
+assets_bp.add_app_template_global(asset_url)
+
+
+@assets_bp.route("/assets/<name>")
+def serve_asset(name):
+    asset = lookup(name)
+    if asset is None:
+        abort(404)
+    encoding = negotiate(request.headers.get("Accept-Encoding"), asset["variants"])
+    resp = current_app.response_class(asset["variants"][encoding], mimetype=asset["mimetype"])
+    if encoding != "identity":
+        resp.headers["Content-Encoding"] = encoding
+    resp.headers["Vary"] = "Accept-Encoding"
+    resp.headers["Cache-Control"] = CACHE_CONTROL
+    resp.set_etag(f"{asset['etag']}-{encoding}")
+    return resp.make_conditional(request)
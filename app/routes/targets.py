@@ -1,25 +1,135 @@
-import time
-from flask import Blueprint, jsonify, request
-from app.targets_manager import load_targets, save_targets
+import csv
+import io
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from app import fast_json
+from app.http_cache import response_cache
+from app.targets_manager import registry, new_target_id, normalize_target, upsert_targets, TARGET_FIELDS
 
 targets_bp = Blueprint("targets", __name__)
 
+MAX_BULK_TARGETS = 10000
+EXPORT_MIMETYPES = {"json": "application/json", "ndjson": "application/x-ndjson", "csv": "text/csv"}
+
 @targets_bp.route("/api/targets", methods=["GET", "POST", "DELETE"])
+@response_cache.cached(lambda: registry.version)
 def api_targets():
     if request.method == "GET":
-        return jsonify(load_targets())
+        return jsonify(registry.all())
     elif request.method == "POST":
         data = request.json or {}
-        targets = load_targets()
-        if "id" in data and any(t["id"] == data["id"] for t in targets):
-            targets = [data if t["id"] == data["id"] else t for t in targets]
-        else:
-            data["id"] = f"t{int(time.time())}"
-            targets.append(data)
-        save_targets(targets)
+
+        def upsert(targets):
+            if "id" in data and any(t["id"] == data["id"] for t in targets):
+                return [data if t["id"] == data["id"] else t for t in targets]
+            data["id"] = new_target_id({t.get("id") for t in targets})
+            return targets + [data]
+
+        try:
+            targets = registry.update(upsert)
+        except Exception as e:
+            return jsonify(error=f"Failed to save targets: {e}"), 500
         return jsonify(success=True, targets=targets)
     elif request.method == "DELETE":
         tid = request.args.get("id", "")
-        targets = [t for t in load_targets() if t["id"] != tid]
-        save_targets(targets)
+        try:
+            targets = registry.update(lambda targets: [t for t in targets if t["id"] != tid])
+        except Exception as e:
+            return jsonify(error=f"Failed to save targets: {e}"), 500
         return jsonify(success=True, targets=targets)
+
+def bulk_format() -> str:
+    fmt = request.args.get("format", "").lower()
+    if fmt:
+        return fmt
+    ctype = (request.content_type or "").lower()
+    if "csv" in ctype:
+        return "csv"
+    if "ndjson" in ctype or "jsonl" in ctype or "json-seq" in ctype:
+        return "ndjson"
+    return "json"
+
+def parse_bulk(text: str, fmt: str):
+    """Yield ``(row, raw_target)`` pairs; ``row`` is 1-based (a line number for NDJSON/CSV)."""
+    if fmt == "json":
+        data = fast_json.loads(text)
+        if isinstance(data, dict):
+            data = data.get("targets")
+        if not isinstance(data, list):
+            raise ValueError("expected a JSON array or {\"targets\": [...]}")
+        yield from enumerate(data, 1)
+    elif fmt == "ndjson":
+        for row, line in enumerate(text.splitlines(), 1):
+            if line.strip():
+                yield row, fast_json.loads(line)
+    elif fmt == "csv":
+        reader = csv.DictReader(io.StringIO(text))
+        for raw in reader:
+            yield reader.line_num, {k.strip(): v for k, v in raw.items() if k}
+    else:
+        raise ValueError(f"unsupported format: {fmt}")
+
+@targets_bp.route("/api/targets/bulk", methods=["POST"])
+def api_targets_bulk():
+    """Validate and upsert a whole batch in one locked write; nothing is saved if any row is invalid."""
+    fmt = bulk_format()
+    replace = request.args.get("mode", "upsert").lower() == "replace"
+    incoming, errors = [], []
+    try:
+        for row, raw in parse_bulk(request.get_data(as_text=True), fmt):
+            try:
+                incoming.append(normalize_target(raw))
+            except ValueError as e:
+                errors.append({"row": row, "error": str(e)})
+            if len(incoming) + len(errors) > MAX_BULK_TARGETS:
+                return jsonify(error=f"Too many targets (max {MAX_BULK_TARGETS})"), 413
+    except (ValueError, csv.Error) as e:
+        return jsonify(error=f"Invalid {fmt} payload: {e}"), 400
+    if errors:
+        return jsonify(error="Validation failed", errors=errors[:100], invalid=len(errors)), 400
+    if not incoming and not replace:
+        return jsonify(error="No targets supplied"), 400
+
+    counts = {}
+
+    def apply(targets):
+        merged, counts["created"], counts["updated"] = upsert_targets(targets, incoming, replace)
+        return merged
+
+    try:
+        targets = registry.update(apply)
+    except Exception as e:
+        return jsonify(error=f"Failed to save targets: {e}"), 500
+    return jsonify(success=True, total=len(targets), **counts)
+
+@targets_bp.route("/api/targets/export")
+def api_targets_export():
+    fmt = request.args.get("format", "json").lower()
+    if fmt not in EXPORT_MIMETYPES:
+        return jsonify(error=f"Unsupported format: {fmt}"), 400
+    targets = registry.all()
+
+    def generate():
+        if fmt == "json":
+            yield b"["
+            for i, t in enumerate(targets):
+                yield (b"," if i else b"") + b"\n" + fast_json.dumpb(t)
+            yield b"\n]\n"
+        elif fmt == "ndjson":
+            for t in targets:
+                yield fast_json.dumpb(t) + b"\n"
+        else:
+            buf = io.StringIO()
+            writer = csv.DictWriter(buf, fieldnames=TARGET_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            for t in targets:
+                writer.writerow(t)
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+            yield buf.getvalue()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=EXPORT_MIMETYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename=targets.{fmt}"},
+    )
@@ -1,11 +1,14 @@
 import socket
 from flask import Blueprint, render_template
 import app.config as app_config
+from app import assets
+from app.http_cache import response_cache
 from app.network import ensure_isp_info, ISP_FULL_NAME, ISP_SHORT_NAME
 
 views_bp = Blueprint("views", __name__)
 
 @views_bp.route("/")
+@response_cache.cached(lambda: (app_config.__version__, assets.version()), ttl=600)
 def index():
     ensure_isp_info()
     hostname = ISP_FULL_NAME or socket.gethostname()
@@ -0,0 +1,250 @@
+"""
+Background telemetry sampling, run only by the elected leader process.
+
+The scheduler carries two kinds of jobs:
+
+* ``global`` - the dashboard sweep over ``config.PING_TARGETS`` every
+  ``GLOBAL_SAMPLE_INTERVAL`` seconds, recorded per target key and as the
+  aggregate ``global`` series.
+* ``target:<id>`` - one job per enabled ``targets.json`` policy at its own
+  ``freq``, measured by the prober for its ``type`` (``app.probers``) and
+  recorded into a TSDB series named after the target id.
+
+Every tick is a burst (``PROBE_BURST_COUNT`` paced probes, or the target's own
+``burst`` count) issued concurrently across targets, recorded as one burst
+point carrying min/avg/max, loss and intra-burst jitter.
+
+Target jobs are re-timed after every tick by ``rate_control.AdaptiveRate``
+(back off from dead targets, look closer at ones over their thresholds), and
+each tick must fit the global ``PROBE_BUDGET_PER_SEC`` token bucket or it is
+skipped.
+
+Jobs are added, removed or re-timed in place whenever the target registry's
+``version`` moves (checked on every scheduler wake-up). Jobs only submit coroutines to the
+shared probe engine and return the future, so a slow or dead target never holds
+up the scheduler thread. With ``PROBE_SHARDS`` > 0 the target jobs run in that
+many probe processes instead (``app.probe_shards``) and only the dashboard sweep
+stays in-process.
+
+Results are published to the bus (``bus.TOPIC_PROBES``) as one batch per tick
+rather than written directly. ``start`` gives the TSDB writer a queued
+subscription drained by its own thread, so segment appends and compaction never
+run on the probe loop (where they would stall other probes' timers), and the
+TSDB republishes applied samples for streaming readers.
+
+Readers never probe: ``latest_results`` serves the last ``global`` sweep from the
+TSDB (which every worker tails), and ``probe_live`` is the rate-limited,
+coalesced on-demand path behind ``/api/pings?live=1``.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from functools import partial
+from typing import Any, Callable, Dict
+
+from app.config import PING_TARGETS, PROBE_BURST_COUNT, PROBE_BUDGET_PER_SEC, PROBE_SHARDS
+from app.bus import bus, TOPIC_PROBES
+from app.probe_engine import probe_engine
+from app.probers import run_burst
+from app.rate_control import AdaptiveRate, TokenBucket
+from app.scheduler import ProbeScheduler
+from app.targets_manager import registry
+from app.tsdb import burst_tuple, tsdb
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_SAMPLE_INTERVAL = 15
+DEFAULT_TARGET_FREQ = 30
+TARGET_JOB_PREFIX = "target:"
+LIVE_MIN_INTERVAL = 5.0
+# Result batches the TSDB writer may fall behind by before the oldest are dropped
+WRITER_QUEUE_SIZE = 4096
+
+# Probe rate of the dashboard sweep, which is exempt from adaptation but not from the budget
+GLOBAL_PROBE_RATE = len(PING_TARGETS) * PROBE_BURST_COUNT / GLOBAL_SAMPLE_INTERVAL
+
+scheduler = ProbeScheduler()
+shard_pool = None
+_targets_version = None
+_live_lock = threading.Lock()
+_live_future = None
+_live_cache = None
+
+
+def _target_freq(target: Dict[str, Any]) -> float:
+    try:
+        freq = float(target.get("freq") or DEFAULT_TARGET_FREQ)
+    except (TypeError, ValueError):
+        freq = DEFAULT_TARGET_FREQ
+    return max(1.0, freq)
+
+
+def _burst_count(target: Dict[str, Any]) -> int:
+    try:
+        return max(1, min(50, int(target.get("burst") or PROBE_BURST_COUNT)))
+    except (TypeError, ValueError):
+        return PROBE_BURST_COUNT
+
+
+async def _sample_global():
+    now_ts = time.time()
+    keys = list(PING_TARGETS)
+    target_prober.budget.take(len(keys) * PROBE_BURST_COUNT, force=True)
+    bursts = dict(zip(keys, await asyncio.gather(
+        *(run_burst({"type": "tcp", "target": PING_TARGETS[k]}) for k in keys)
+    )))
+    details = {key: b["avg"] for key, b in bursts.items()}
+    lead = next((b for b in bursts.values() if b["received"]), bursts[keys[0]] if keys else None)
+    if lead is None:
+        return
+    records = [("global", now_ts, lead["avg"], {"target": "all", "details": details}, burst_tuple(lead))]
+    records.extend((key, now_ts, b["avg"], None, burst_tuple(b)) for key, b in bursts.items())
+    bus.publish(TOPIC_PROBES, records)
+
+
+class TargetProber:
+    """Burst-probes ``targets.json`` entries as jobs on ``scheduler``, reporting each tick to ``sink``.
+
+    ``sink(target_id, timestamp, burst_summary)`` records the outcome: published
+    to the bus here, or batched back to the leader from a probe shard
+    process (``app.probe_shards``). ``reserved`` is probe rate spent outside
+    this prober that adaptive boosts must leave room for.
+    """
+
+    def __init__(self, scheduler: ProbeScheduler, sink: Callable[[str, float, Dict[str, Any]], None],
+                 budget_per_sec: float, reserved: float = 0.0):
+        self.scheduler = scheduler
+        self.sink = sink
+        self.budget = TokenBucket(budget_per_sec, capacity=budget_per_sec * 5)
+        self.rate_control = AdaptiveRate(budget_per_sec)
+        self.reserved = reserved
+
+    async def _tick(self, target: Dict[str, Any]):
+        job_id = f"{TARGET_JOB_PREFIX}{target['id']}"
+        probes = _burst_count(target)
+        if not self.budget.take(probes):
+            logger.debug("Probe budget exhausted, skipping tick for %s", job_id)
+            return
+        now_ts = time.time()
+        burst = await run_burst(target, probes)
+        self.sink(str(target["id"]), now_ts, burst)
+        interval = self.rate_control.observe(
+            job_id, target, _target_freq(target), probes, burst["received"], burst["avg"], reserved=self.reserved
+        )
+        self.scheduler.set_interval(job_id, interval)
+
+    def probe(self, target: Dict[str, Any]):
+        return probe_engine.submit(self._tick(target))
+
+    def sync(self, targets) -> int:
+        """Make the scheduled target jobs match ``targets``; returns how many are scheduled."""
+        jobs = {}
+        for t in targets:
+            if not t.get("enabled", True) or not t.get("id") or not t.get("target"):
+                continue
+            jobs[f"{TARGET_JOB_PREFIX}{t['id']}"] = (_target_freq(t), partial(self.probe, dict(t)))
+        self.scheduler.sync(jobs, prefix=TARGET_JOB_PREFIX)
+        self.rate_control.forget(jobs)
+        return len(jobs)
+
+
+def record_burst(target_id: str, timestamp: float, burst: Dict[str, Any]):
+    bus.publish(TOPIC_PROBES, [(target_id, timestamp, burst["avg"], None, burst_tuple(burst))])
+
+
+def store_results(message: Dict[str, Any]):
+    """Write one ``TOPIC_PROBES`` batch into the TSDB."""
+    for series_id, timestamp, value, meta, burst in message["data"]:
+        tsdb.insert(series_id, timestamp, value, meta, burst)
+
+
+def _writer_loop(sub):
+    """TSDB writer thread: apply queued result batches off the probe loop."""
+    dropped = 0
+    while True:
+        message = sub.get()
+        if message is None:
+            return
+        for msg in [message, *sub.drain()]:
+            try:
+                store_results(msg)
+            except Exception as e:
+                logger.warning("Failed to store probe results: %s", e)
+        if sub.dropped != dropped:
+            logger.warning("TSDB writer fell behind, dropped %d result batch(es)", sub.dropped - dropped)
+            dropped = sub.dropped
+
+
+target_prober = TargetProber(scheduler, record_burst, PROBE_BUDGET_PER_SEC, reserved=GLOBAL_PROBE_RATE)
+
+
+def sample_global():
+    return probe_engine.submit(_sample_global())
+
+
+def probe_target(target: Dict[str, Any]):
+    return target_prober.probe(target)
+
+
+def latest_results() -> Dict[str, Any]:
+    """Per-target latencies of the newest ``global`` sample plus its ``timestamp``."""
+    last = tsdb.query("global", limit=1)
+    details = (last[0]["meta"].get("details") or {}) if last else {}
+    results = {key: details.get(key) for key in PING_TARGETS}
+    results["timestamp"] = last[0]["timestamp"] if last else None
+    return results
+
+
+def probe_live(timeout: float = 10.0) -> Dict[str, Any]:
+    """Probe ``PING_TARGETS`` now, for explicit ``?live=1`` requests.
+
+    Concurrent callers share one in-flight sweep and a finished sweep is reused
+    for ``LIVE_MIN_INTERVAL`` seconds, so live requests cannot multiply probe load.
+    Results are not recorded; the TSDB only holds scheduled samples.
+    """
+    global _live_future
+
+    def _store(fut):
+        global _live_future, _live_cache
+        with _live_lock:
+            _live_future = None
+            if not fut.cancelled() and fut.exception() is None:
+                _live_cache = (time.monotonic(), {**fut.result(), "timestamp": time.time()})
+
+    with _live_lock:
+        if _live_cache and time.monotonic() - _live_cache[0] < LIVE_MIN_INTERVAL:
+            return dict(_live_cache[1])
+        if _live_future is None:
+            _live_future = probe_engine.submit(probe_engine.tcp_ping_many(PING_TARGETS))
+            _live_future.add_done_callback(_store)
+        fut = _live_future
+    return {**fut.result(timeout=timeout), "timestamp": time.time()}
+
+
+def reload_targets(force: bool = False):
+    """Re-sync target jobs when the target registry changed since the last sync."""
+    global _targets_version
+    if registry.version == _targets_version and not force:
+        return
+    _targets_version = registry.version
+    if shard_pool is not None:
+        count = shard_pool.assign(registry.all())
+        logger.info("Probe shards assigned %d target(s) across %d process(es)", count, shard_pool.shards)
+    else:
+        logger.info("Probe scheduler synced %d target job(s)", target_prober.sync(registry.all()))
+
+
+def start():
+    global shard_pool
+    writer = bus.subscribe(TOPIC_PROBES, maxsize=WRITER_QUEUE_SIZE)
+    threading.Thread(target=_writer_loop, args=(writer,), daemon=True, name="TSDB-Writer").start()
+    if PROBE_SHARDS > 0:
+        from app.probe_shards import ShardPool
+
+        shard_pool = ShardPool(PROBE_SHARDS, budget_per_sec=PROBE_BUDGET_PER_SEC, reserved=GLOBAL_PROBE_RATE)
+        shard_pool.start()
+    scheduler.add("global", GLOBAL_SAMPLE_INTERVAL, sample_global, phase=0.0)
+    reload_targets(force=True)
+    scheduler.start(poll=reload_targets)
@@ -0,0 +1,170 @@
+"""
+Min-heap scheduler for periodic probe jobs.
+
+Each job has a fixed interval and a next-due deadline on ``time.monotonic()``.
+Deadlines advance by whole intervals from the previous deadline (never from
+"now"), so execution time does not make the period drift; a job that falls
+behind skips the missed ticks instead of firing in a burst. Jobs sharing an
+interval are phase-spread across it, and the job set can be replaced at runtime
+(``sync``) without disturbing the deadlines of unchanged jobs.
+
+Jobs are called inline on the scheduler thread and must not block: a job that
+starts asynchronous work returns a ``concurrent.futures.Future`` and the job is
+considered in flight until that future completes.
+"""
+
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ProbeScheduler:
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._heap: list = []
+        self._jobs: Dict[str, dict] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def hash_phase(job_id: str) -> float:
+        """Stable pseudo-random phase in [0, 1) for a job id."""
+        return zlib.crc32(job_id.encode("utf-8")) / 2 ** 32
+
+    def _push(self, job_id: str, job: dict):
+        heapq.heappush(self._heap, (job["due"], next(self._seq), job_id, job["gen"]))
+
+    def add(self, job_id: str, interval: float, fn: Callable[[], None], phase: Optional[float] = None):
+        """Schedule ``fn`` every ``interval`` seconds, first firing after ``phase * interval``."""
+        interval = max(0.1, float(interval))
+        if phase is None:
+            phase = self.hash_phase(job_id)
+        with self._cond:
+            old = self._jobs.get(job_id)
+            job = {
+                "interval": interval,
+                "base": interval,
+                "fn": fn,
+                "due": self._clock() + phase * interval,
+                "gen": (old["gen"] + 1) if old else 0,
+                "running": old["running"] if old else False,
+            }
+            self._jobs[job_id] = job
+            self._push(job_id, job)
+            self._cond.notify()
+
+    def remove(self, job_id: str):
+        with self._cond:
+            # Stale heap entries are discarded lazily when they surface
+            self._jobs.pop(job_id, None)
+
+    def sync(self, jobs: Dict[str, Tuple[float, Callable[[], None]]], prefix: str = ""):
+        """Make the jobs whose id starts with ``prefix`` match ``jobs`` exactly.
+
+        Unchanged intervals keep their deadlines and any ``set_interval``
+        adjustment (only the callable is swapped); new or re-timed jobs are
+        spread evenly across their interval.
+        """
+        with self._cond:
+            for job_id in [j for j in self._jobs if j.startswith(prefix) and j not in jobs]:
+                del self._jobs[job_id]
+            fresh: Dict[float, list] = {}
+            for job_id, (interval, fn) in jobs.items():
+                current = self._jobs.get(job_id)
+                if current is not None and math.isclose(current["base"], max(0.1, float(interval))):
+                    current["fn"] = fn
+                else:
+                    fresh.setdefault(float(interval), []).append((job_id, fn))
+
+        for interval, group in fresh.items():
+            group.sort()
+            offset = self.hash_phase(f"{interval}:{len(group)}")
+            for i, (job_id, fn) in enumerate(group):
+                self.add(job_id, interval, fn, phase=((i + offset) / len(group)) % 1.0)
+
+    def set_interval(self, job_id: str, interval: float):
+        """Change a job's effective period without touching its configured one.
+
+        A shorter period pulls the next deadline in; a longer one takes effect
+        after the tick already scheduled.
+        """
+        interval = max(0.1, float(interval))
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or math.isclose(job["interval"], interval):
+                return
+            job["interval"] = interval
+            due = min(job["due"], self._clock() + interval)
+            if due != job["due"]:
+                job["due"] = due
+                job["gen"] += 1
+                self._push(job_id, job)
+                self._cond.notify()
+
+    def job_ids(self):
+        with self._cond:
+            return list(self._jobs)
+
+    def _dispatch(self, job_id: str, job: dict):
+        def _done(fut: Future):
+            job["running"] = False
+            if not fut.cancelled() and fut.exception() is not None:
+                logger.warning("Scheduled job %s failed: %s", job_id, fut.exception())
+
+        job["running"] = True
+        try:
+            result = job["fn"]()
+        except Exception as e:
+            logger.warning("Scheduled job %s failed: %s", job_id, e)
+            result = None
+        if isinstance(result, Future):
+            result.add_done_callback(_done)
+        else:
+            job["running"] = False
+
+    def run_due(self) -> float:
+        """Fire every due job; returns seconds until the next deadline."""
+        with self._cond:
+            now = self._clock()
+            while self._heap and self._heap[0][0] <= now:
+                due, _, job_id, gen = heapq.heappop(self._heap)
+                job = self._jobs.get(job_id)
+                if job is None or job["gen"] != gen:
+                    continue
+                if job["running"]:
+                    logger.debug("Skipping tick for %s: previous run still in flight", job_id)
+                else:
+                    self._dispatch(job_id, job)
+                interval = job["interval"]
+                missed = max(0, math.floor((now - due) / interval))
+                job["due"] = due + (missed + 1) * interval
+                self._push(job_id, job)
+            return (self._heap[0][0] - now) if self._heap else math.inf
+
+    def run_forever(self, poll: Optional[Callable[[], None]] = None, poll_interval: float = 1.0):
+        while True:
+            wait = self.run_due()
+            if poll is not None:
+                try:
+                    poll()
+                except Exception as e:
+                    logger.warning("Scheduler poll hook failed: %s", e)
+            with self._cond:
+                self._cond.wait(max(0.0, min(wait, poll_interval)))
+
+    def start(self, poll: Optional[Callable[[], None]] = None, poll_interval: float = 1.0):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self.run_forever, args=(poll, poll_interval), daemon=True, name="Probe-Scheduler"
+        )
+        self._thread.start()
@@ -0,0 +1,128 @@
+"""
+Append-only segment log used by the TSDB for crash-safe persistence.
+
+Every record is framed as ``<u32 payload length><u32 crc32(payload)><payload>``.
+Appends are a single sequential ``write`` of one frame, so a crash can at worst
+leave one torn frame at the tail; ``replay`` stops at the first frame whose
+length or checksum does not match and, when ``repair`` is set, truncates the
+file back to the last good offset before new records are appended.
+
+Compaction rewrites the live records into a temp file which is fsync'ed and
+atomically swapped in with ``os.replace``. Readers in other processes follow a
+segment with ``read_new``, which resumes from the last consumed offset and
+reports a swapped inode so the caller can replay from scratch.
+"""
+
+import logging
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FRAME_HEADER = struct.Struct("<II")
+MAX_PAYLOAD_BYTES = 1 << 20
+
+
+def frame(payload: bytes) -> bytes:
+    return FRAME_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def parse_frames(data: bytes) -> Tuple[List[bytes], int]:
+    """Decode consecutive intact frames; returns the payloads and bytes consumed."""
+    payloads = []
+    offset = 0
+    end = len(data)
+    while offset + FRAME_HEADER.size <= end:
+        length, crc = FRAME_HEADER.unpack_from(data, offset)
+        start = offset + FRAME_HEADER.size
+        if length > MAX_PAYLOAD_BYTES or start + length > end:
+            break
+        payload = data[start:start + length]
+        if zlib.crc32(payload) != crc:
+            break
+        payloads.append(payload)
+        offset = start + length
+    return payloads, offset
+
+
+class SegmentLog:
+    """A single append-only record file."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.records = 0
+        self.offset = 0
+        self.inode: Optional[int] = None
+
+    def append(self, payload: bytes):
+        with open(self.path, "ab") as fh:
+            fh.write(frame(payload))
+        self.records += 1
+
+    def replay(self, repair: bool = True) -> List[bytes]:
+        """Return all intact payloads, truncating any torn tail left by a crash if ``repair``."""
+        try:
+            with open(self.path, "rb") as fh:
+                self.inode = os.fstat(fh.fileno()).st_ino
+                data = fh.read()
+        except FileNotFoundError:
+            self.records = self.offset = 0
+            self.inode = None
+            return []
+
+        payloads, offset = parse_frames(data)
+        if offset != len(data) and repair:
+            logger.warning("Segment %s has a torn tail (%d bytes dropped), truncating", self.path.name, len(data) - offset)
+            with open(self.path, "r+b") as fh:
+                fh.truncate(offset)
+
+        self.records = len(payloads)
+        self.offset = offset
+        return payloads
+
+    def read_new(self, repair: bool = False) -> Optional[List[bytes]]:
+        """Payloads appended since the last ``replay``/``read_new``.
+
+        Returns ``None`` when the file was swapped by compaction or truncated
+        underneath us, in which case the caller must replay it from scratch.
+        An incomplete trailing frame is left for the next call unless ``repair``
+        is set, which truncates it (only safe once the writer is known dead).
+        """
+        try:
+            with open(self.path, "rb") as fh:
+                st = os.fstat(fh.fileno())
+                if self.inode is None:
+                    self.inode = st.st_ino
+                elif st.st_ino != self.inode or st.st_size < self.offset:
+                    return None
+                if st.st_size == self.offset:
+                    return []
+                fh.seek(self.offset)
+                data = fh.read(st.st_size - self.offset)
+        except FileNotFoundError:
+            return []
+
+        payloads, consumed = parse_frames(data)
+        self.offset += consumed
+        self.records += len(payloads)
+        if repair and consumed != len(data):
+            logger.warning("Segment %s has a torn tail (%d bytes dropped), truncating", self.path.name, len(data) - consumed)
+            with open(self.path, "r+b") as fh:
+                fh.truncate(self.offset)
+        return payloads
+
+    def rewrite(self, payloads: Iterable[bytes]):
+        """Atomically replace the segment with ``payloads`` (compaction)."""
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        count = 0
+        with open(tmp_path, "wb") as fh:
+            for payload in payloads:
+                fh.write(frame(payload))
+                count += 1
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, self.path)
+        self.records = count
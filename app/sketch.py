@@ -0,0 +1,113 @@
+"""
+Mergeable relative-error quantile sketch for latency values (DDSketch-style).
+
+Values are mapped to logarithmic bins ``ceil(log_gamma(v))`` with
+``gamma = (1 + alpha) / (1 - alpha)``. Each bin is represented by
+``2 * gamma**k / (gamma + 1)``, so any quantile estimate is within a relative
+error of ``alpha`` of the exact order statistic it stands for:
+
+    |estimate - exact| <= alpha * exact
+
+Bins only hold counts, so ``add``/``remove`` are O(1) (plus a bisect when a bin
+appears or empties) and quantile queries walk at most ``O(log(max/min) / alpha)``
+bins, independent of how many values were inserted. Removal is what lets the
+TSDB expire samples that fall out of a sliding window.
+"""
+
+import math
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+
+# Latencies at or below this (ms) are counted in a dedicated zero bin.
+MIN_INDEXABLE_VALUE = 1e-3
+
+
+class LatencySketch:
+    __slots__ = ("alpha", "gamma", "_log_gamma", "_bins", "_keys", "zero_count", "count")
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        self.alpha = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self._bins: Dict[int, int] = {}
+        self._keys: List[int] = []
+        self.zero_count = 0
+        self.count = 0
+
+    def _key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value: float, n: int = 1):
+        self.count += n
+        if value <= MIN_INDEXABLE_VALUE:
+            self.zero_count += n
+            return
+        key = self._key(value)
+        if key in self._bins:
+            self._bins[key] += n
+        else:
+            self._bins[key] = n
+            insort(self._keys, key)
+
+    def remove(self, value: float, n: int = 1):
+        if value <= MIN_INDEXABLE_VALUE:
+            n = min(n, self.zero_count)
+            self.zero_count -= n
+            self.count -= n
+            return
+        key = self._key(value)
+        have = self._bins.get(key)
+        if not have:
+            return
+        n = min(n, have)
+        self.count -= n
+        if have == n:
+            del self._bins[key]
+            del self._keys[bisect_left(self._keys, key)]
+        else:
+            self._bins[key] = have - n
+
+    def merge(self, other: "LatencySketch"):
+        if other.gamma != self.gamma:
+            raise ValueError("cannot merge sketches with different relative accuracy")
+        self.zero_count += other.zero_count
+        self.count += other.count
+        for key, n in other._bins.items():
+            if key in self._bins:
+                self._bins[key] += n
+            else:
+                self._bins[key] = n
+                insort(self._keys, key)
+
+    def quantiles(self, qs: Iterable[float]) -> List[Optional[float]]:
+        """Estimate several quantiles in one pass over the bins.
+
+        Uses the same nearest-rank convention as ``sorted(values)[int(n * q)]``.
+        """
+        qs = list(qs)
+        if self.count <= 0:
+            return [None] * len(qs)
+        ranks = sorted((min(self.count - 1, int(self.count * q)), i) for i, q in enumerate(qs))
+        out: List[Optional[float]] = [None] * len(qs)
+        pos = 0
+        cumulative = self.zero_count
+        while pos < len(ranks) and ranks[pos][0] < cumulative:
+            out[ranks[pos][1]] = 0.0
+            pos += 1
+        for key in self._keys:
+            if pos >= len(ranks):
+                break
+            cumulative += self._bins[key]
+            while pos < len(ranks) and ranks[pos][0] < cumulative:
+                out[ranks[pos][1]] = self._value(key)
+                pos += 1
+        return out
+
+    def quantile(self, q: float) -> Optional[float]:
+        return self.quantiles([q])[0]
+
@@ -0,0 +1,272 @@
+"""
+Server-sent events broadcast hub.
+
+A ``Channel`` holds the recent events of one stream, already serialized to
+their ``text/event-stream`` frames, and wakes every connected client when a
+new one lands, so an update costs one JSON encode however many screens are
+watching. Channels with a delta builder publish only what changed since the
+previous event and fall back to a full snapshot for new or far-behind clients.
+Channels are refreshed from the bus (``app.bus``) as soon as the TSDB applies a
+matching sample, in every worker, or on a timer for state that is not sampled
+(``BroadcastHub.ticker``). Bus messages land in a coalescing queue read by a
+hub thread per topic, so publishers (the TSDB writer, follower sync) never
+build events themselves and a burst of samples costs one rebuild per channel.
+
+One connection can carry several channels (``BroadcastHub.stream``), each as
+its own named event type. Clients block on the hub's condition variable
+between events and get a comment line every ``SSE_HEARTBEAT`` seconds, which
+keeps proxies from closing idle streams and lets the server notice clients
+that went away. Event ids derive from sample timestamps, so they agree across
+workers and a reconnect carrying ``Last-Event-ID`` resumes with the missed
+deltas (or a snapshot) only. Channels created with ``ids=False`` send no ids
+and are simply re-sent as a snapshot after a reconnect, which lets one channel
+of a multiplexed stream own ``Last-Event-ID``.
+
+Streams are meant for a threaded server (gunicorn ``gthread``, or Flask's
+threaded dev server): an idle stream holds one thread parked on a condition
+rather than a whole worker. ``SSE_MAX_CLIENTS`` caps streams per worker process
+so they cannot take every thread.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app import fast_json
+from app.bus import bus
+from app.config import SSE_HEARTBEAT, SSE_MAX_CLIENTS
+
+logger = logging.getLogger(__name__)
+
+RETRY_MS = 5000
+# Distinct series keys a topic's refresh queue holds before coalescing drops the oldest
+REFRESH_QUEUE_SIZE = 1024
+HEARTBEAT_FRAME = b": keepalive\n\n"
+
+
+def encode_event(event_id: Optional[int], data: Any, event: Optional[str] = None) -> bytes:
+    lines = [] if event_id is None else [f"id: {event_id}"]
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {fast_json.dumps(data)}")
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+def parse_event_id(value) -> Optional[int]:
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+class Channel:
+    """Broadcast stream of one piece of state.
+
+    ``snapshot()`` returns ``(event_id, data)`` for the full current state.
+    With ``delta(since_id)`` (returning ``(event_id, data)``, or ``None`` when
+    ``since_id`` is too old) each refresh is published as a delta against the
+    previous event, and the last ``backlog`` deltas are kept so a client that
+    is a few events behind replays the same shared frames. Clients starting
+    cold or further behind get a snapshot (cached per event id) or their own
+    catch-up delta.
+    """
+
+    def __init__(self, hub: "BroadcastHub", name: str, snapshot: Callable[[], Tuple[int, Any]],
+                 delta: Optional[Callable[[int], Optional[Tuple[int, Any]]]] = None, event: Optional[str] = None,
+                 backlog: int = 32, ids: bool = True):
+        self.hub = hub
+        self.name = name
+        self.event = event
+        self.ids = ids
+        self._snapshot = snapshot
+        self._delta = delta
+        # (previous event id, event id, frame, is_snapshot), oldest first
+        self._events = deque(maxlen=backlog)
+        self._snapshot_frame: Optional[Tuple[int, bytes]] = None
+        self._cond = hub._cond
+        self.clients = 0
+
+    @property
+    def last_id(self) -> Optional[int]:
+        return self._events[-1][1] if self._events else None
+
+    def _build(self, since: Optional[int]) -> Optional[Tuple[int, bytes, bool]]:
+        try:
+            built = self._delta(since) if self._delta is not None and since is not None else None
+            is_snapshot = built is None
+            if built is None:
+                built = self._snapshot()
+        except Exception as e:
+            logger.warning("Failed to build %s event: %s", self.name, e)
+            return None
+        event_id, data = built
+        return event_id, encode_event(event_id if self.ids else None, data, self.event), is_snapshot
+
+    def refresh(self):
+        """Publish whatever changed since the last event and wake clients."""
+        if not self.clients:
+            # Nobody listening in this worker: rebuild lazily on the next connect
+            with self._cond:
+                self._events.clear()
+                self._snapshot_frame = None
+            return
+        previous = self.last_id
+        built = self._build(previous)
+        if built is None:
+            return
+        event_id, frame, is_snapshot = built
+        with self._cond:
+            if self.last_id is not None and event_id <= self.last_id:
+                return
+            self._events.append((self.last_id, event_id, frame, is_snapshot))
+            if is_snapshot:
+                self._snapshot_frame = (event_id, frame)
+            self._cond.notify_all()
+
+    def _pending(self, seen: Optional[int]) -> Optional[List[Tuple[int, bytes]]]:
+        """Shared frames taking a client from ``seen`` to the newest event (caller holds the lock).
+
+        ``[]`` means up to date, ``None`` that the client needs a snapshot or catch-up.
+        """
+        if not self._events or seen is None:
+            return None if self._events else []
+        if seen >= self._events[-1][1]:
+            return []
+        events = list(self._events)
+        for i, (prev_id, _, _, _) in enumerate(events):
+            if prev_id == seen:
+                chain = events[i:]
+                # A snapshot supersedes everything before it
+                last_snapshot = max((j for j, e in enumerate(chain) if e[3]), default=0)
+                return [(e[1], e[2]) for e in chain[last_snapshot:]]
+        return None
+
+    def _catch_up(self, seen: Optional[int]) -> Optional[Tuple[int, bytes]]:
+        if seen is None:
+            cached = self._snapshot_frame
+            if cached is not None and cached[0] == self.last_id:
+                return cached
+        built = self._build(seen)
+        if built is None:
+            return None
+        event_id, frame, is_snapshot = built
+        if is_snapshot:
+            with self._cond:
+                if event_id == self.last_id or not self._events:
+                    self._snapshot_frame = (event_id, frame)
+        return event_id, frame
+
+    def stream(self, last_id: Optional[int] = None, heartbeat: float = SSE_HEARTBEAT) -> Iterator[bytes]:
+        """Frames for one client: a snapshot (or the events after ``last_id``), then every update."""
+        return self.hub.stream([self], {self.name: last_id}, heartbeat)
+
+
+class BroadcastHub:
+    def __init__(self, max_clients: int = SSE_MAX_CLIENTS):
+        self.max_clients = max_clients
+        self.channels: Dict[str, Channel] = {}
+        # topic -> [(keys or None for all, channel)], served by one refresh thread per topic
+        self._routes: Dict[str, List[Tuple[Optional[frozenset], Channel]]] = {}
+        self.clients = 0
+        self._lock = threading.Lock()
+        # Shared by every channel, so one client can wait on several at once
+        self._cond = threading.Condition()
+
+    def channel(self, name: str, snapshot: Callable[[], Tuple[int, Any]], topic: Optional[str] = None, keys=None,
+                delta: Optional[Callable[[int], Optional[Tuple[int, Any]]]] = None,
+                event: Optional[str] = None, ids: bool = True) -> Channel:
+        """Register a channel, refreshed whenever ``topic`` (optionally only ``keys``) is published."""
+        channel = Channel(self, name, snapshot, delta, event, ids=ids)
+        new_topic = False
+        with self._lock:
+            self.channels[name] = channel
+            if topic is not None:
+                new_topic = topic not in self._routes
+                self._routes.setdefault(topic, []).append((None if keys is None else frozenset(keys), channel))
+        if new_topic:
+            sub = bus.subscribe(topic, maxsize=REFRESH_QUEUE_SIZE, policy="coalesce")
+            threading.Thread(target=self._refresh_loop, args=(topic, sub), daemon=True, name=f"SSE-{topic}").start()
+        return channel
+
+    def _refresh_loop(self, topic: str, sub):
+        """Refresh the channels routed from ``topic``, once per batch of queued messages."""
+        while True:
+            message = sub.get()
+            if message is None:
+                return
+            keys = {m["key"] for m in [message, *sub.drain()]}
+            with self._lock:
+                routes = list(self._routes.get(topic, ()))
+            for channel_keys, channel in routes:
+                if channel_keys is None or not keys.isdisjoint(channel_keys):
+                    channel.refresh()
+
+    def ticker(self, channel: Channel, interval: float):
+        """Refresh ``channel`` every ``interval`` seconds while it has clients."""
+        def _tick():
+            while True:
+                time.sleep(interval)
+                if channel.clients:
+                    channel.refresh()
+
+        threading.Thread(target=_tick, daemon=True, name=f"SSE-{channel.name}").start()
+
+    def acquire(self) -> bool:
+        """Reserve a stream slot; ``False`` when this worker is at ``max_clients``."""
+        with self._lock:
+            if self.clients >= self.max_clients:
+                return False
+            self.clients += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.clients -= 1
+
+    def stream(self, channels: List[Channel], last_ids: Optional[Dict[str, Optional[int]]] = None,
+               heartbeat: float = SSE_HEARTBEAT, preamble: Iterable[bytes] = ()) -> Iterator[bytes]:
+        """One client's frames for ``channels``: each channel's catch-up first, then every update.
+
+        ``preamble`` frames (per-client data) are sent once, before any channel event.
+        """
+        seen = {ch.name: (last_ids or {}).get(ch.name) for ch in channels}
+        with self._cond:
+            for ch in channels:
+                ch.clients += 1
+        try:
+            for ch in channels:
+                if not ch._events:
+                    ch.refresh()
+            yield f"retry: {RETRY_MS}\n\n".encode()
+            yield from preamble
+            while True:
+                with self._cond:
+                    pending = [(ch, ch._pending(seen[ch.name])) for ch in channels]
+                    if all(frames == [] for _, frames in pending):
+                        self._cond.wait(heartbeat)
+                        pending = [(ch, ch._pending(seen[ch.name])) for ch in channels]
+                sent = failed = False
+                for ch, frames in pending:
+                    if frames is None:
+                        caught_up = ch._catch_up(seen[ch.name])
+                        failed = failed or caught_up is None
+                        frames = [caught_up] if caught_up is not None else []
+                    for event_id, frame in frames:
+                        seen[ch.name] = event_id
+                        sent = True
+                        yield frame
+                if not sent:
+                    if failed:
+                        # Catch-up could not be built; retry after the next update or heartbeat
+                        with self._cond:
+                            self._cond.wait(heartbeat)
+                    yield HEARTBEAT_FRAME
+        finally:
+            with self._cond:
+                for ch in channels:
+                    ch.clients -= 1
+
+
+hub = BroadcastHub()
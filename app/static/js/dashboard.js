@@ -0,0 +1,1553 @@
+let autoScrollLogs = true;
+let validSamplesCount = 0;
+let pingHistory = [];
+let pingHistoryQuery = null;
+let lastFailedAction = null;
+let chartMouseX = null;
+let chartMouseY = null;
+
+const ALL_TARGET_KEYS = ["ping_cu", "ping_cm", "ping_ct", "ping_cloudflare", "ping_google"];
+let selectedTargets = new Set(ALL_TARGET_KEYS);
+let currentChartMode = 'line';
+let currentPingRange = '1h';
+
+const TARGET_CONFIG = {
+    "ping_cu": { name: "Zhejiang Unicom", color: "#FF6B6B", glow: "rgba(255,107,107,0.8)", fillStart: "rgba(255,107,107,0.22)" },
+    "ping_cm": { name: "Zhejiang Mobile", color: "#BD93F9", glow: "rgba(189,147,249,0.8)", fillStart: "rgba(189,147,249,0.22)" },
+    "ping_ct": { name: "Zhejiang Telecom", color: "#50FA7B", glow: "rgba(80,250,123,0.8)", fillStart: "rgba(80,250,123,0.22)" },
+    "ping_cloudflare": { name: "Cloudflare", color: "#8BE9FD", glow: "rgba(139,233,253,0.8)", fillStart: "rgba(139,233,253,0.22)" },
+    "ping_google": { name: "Google", color: "#FFB86C", glow: "rgba(255,184,108,0.8)", fillStart: "rgba(255,184,108,0.22)" }
+};
+
+/* ── Universal State Feedback & Error Recovery Engine ── */
+function showStateFeedback(type, title, message, onRetry = null) {
+    const banner = document.getElementById('global_state_feedback');
+    const iconEl = document.getElementById('state_feedback_icon');
+    const titleEl = document.getElementById('state_feedback_title');
+    const msgEl = document.getElementById('state_feedback_msg');
+    const retryBtn = document.getElementById('state_feedback_retry_btn');
+
+    if (!banner) return;
+    lastFailedAction = onRetry;
+
+    let icon = 'ℹ️';
+    let titleColor = 'var(--text-primary)';
+    if (type === 'loading') { icon = '⏳'; titleColor = 'var(--status-cyan)'; }
+    else if (type === 'success') { icon = '✅'; titleColor = 'var(--status-success)'; }
+    else if (type === 'warning') { icon = '⚠️'; titleColor = 'var(--status-warning)'; }
+    else if (type === 'error') { icon = '❌'; titleColor = 'var(--status-critical)'; }
+
+    if (iconEl) iconEl.textContent = icon;
+    if (titleEl) { titleEl.textContent = title; titleEl.style.color = titleColor; }
+    if (msgEl) msgEl.textContent = message;
+
+    if (retryBtn) {
+        if (onRetry) {
+            retryBtn.style.display = 'inline-flex';
+        } else {
+            retryBtn.style.display = 'none';
+        }
+    }
+
+    banner.style.display = 'block';
+}
+
+function hideStateFeedback() {
+    const banner = document.getElementById('global_state_feedback');
+    if (banner) banner.style.display = 'none';
+    lastFailedAction = null;
+}
+
+function retryLastAction() {
+    if (typeof lastFailedAction === 'function') {
+        const action = lastFailedAction;
+        hideStateFeedback();
+        action();
+    }
+}
+
+/* ── Inline Field Validation Helpers ── */
+function validateTargetName() {
+    const input = document.getElementById('target_name_input');
+    const err = document.getElementById('target_name_error');
+    if (!input || !err) return true;
+    if (!input.value.trim()) {
+        err.textContent = '❌ Target Name is required.';
+        err.style.display = 'block';
+        return false;
+    } else {
+        err.style.display = 'none';
+        return true;
+    }
+}
+
+function validateTargetHost() {
+    const input = document.getElementById('target_host_input');
+    const err = document.getElementById('target_host_error');
+    if (!input || !err) return true;
+    const val = input.value.trim();
+    if (!val) {
+        err.textContent = '❌ Host & Port is required.';
+        err.style.display = 'block';
+        return false;
+    } else if (!val.includes(':') && !val.includes('.')) {
+        err.textContent = '⚠️ Valid format example: 1.1.1.1:53 or example.com:80';
+        err.style.display = 'block';
+        return true;
+    } else {
+        err.style.display = 'none';
+        return true;
+    }
+}
+
+/* ── VT100 Command Palette (Ctrl+K) Controller ── */
+function openCommandPalette() {
+    const modal = document.getElementById('command_palette_modal');
+    const input = document.getElementById('cmd_palette_input');
+    if (modal) {
+        modal.style.display = 'flex';
+        if (input) { input.value = ''; input.focus(); }
+        filterCommandPalette();
+    }
+}
+
+function closeCommandPalette() {
+    const modal = document.getElementById('command_palette_modal');
+    if (modal) modal.style.display = 'none';
+}
+
+function closeCommandPaletteOnOverlay(e) {
+    if (e.target.id === 'command_palette_modal') closeCommandPalette();
+}
+
+function filterCommandPalette() {
+    const input = document.getElementById('cmd_palette_input');
+    const filter = (input ? input.value : '').toLowerCase().trim();
+    const items = document.querySelectorAll('#cmd_palette_list .cmd-palette-item');
+    items.forEach(item => {
+        const text = item.textContent.toLowerCase();
+        if (!filter || text.includes(filter)) {
+            item.style.display = 'flex';
+        } else {
+            item.style.display = 'none';
+        }
+    });
+}
+
+function runPaletteCmd(cmd) {
+    closeCommandPalette();
+    if (cmd === 'theme') {
+        const themes = ['green', 'cyan', 'magenta', 'amber'];
+        const current = document.documentElement.getAttribute('data-theme') || 'green';
+        const next = themes[(themes.indexOf(current) + 1) % themes.length];
+        setCyberTheme(next);
+        showToast('info', `Theme switched to ${next.toUpperCase()}`);
+    } else if (cmd === 'sound') {
+        toggleCyberSound();
+    } else {
+        execQuickCmd(cmd);
+    }
+}
+
+document.addEventListener('keydown', function(e) {
+    if ((e.ctrlKey || e.metaKey) && (e.key === 'k' || e.key === 'K')) {
+        e.preventDefault();
+        openCommandPalette();
+    }
+});
+
+function copyAllIdentities() {
+    const listen = (document.getElementById('hero_ip_listen').textContent || '').trim();
+    const egress = (document.getElementById('hero_ip_egress').textContent || '').trim();
+    const visitor = (document.getElementById('hero_ip_visitor').textContent || '').trim();
+    const local = (document.getElementById('hero_ip_local').textContent || '').trim();
+
+    const text = [
+        "=== NETWATCH NETWORK IDENTITIES ===",
+        `Server Listen  : ${listen}`,
+        `Server Egress  : ${egress}`,
+        `Visitor Client : ${visitor}`,
+        `Local Interface: ${local}`
+    ].join("\n");
+
+    copyText(text, "Network Identities");
+}
+
+function copyText(text, label) {
+    if (!text) return;
+    const cleanText = text.trim();
+    if (navigator.clipboard && window.isSecureContext) {
+        navigator.clipboard.writeText(cleanText).then(() => {
+            showToast(`✓ ${label || 'Content'} copied to clipboard`);
+        }).catch(() => fallbackCopyText(cleanText, label));
+    } else {
+        fallbackCopyText(cleanText, label);
+    }
+}
+
+function fallbackCopyText(text, label) {
+    const ta = document.createElement('textarea');
+    ta.value = text;
+    ta.style.position = 'fixed';
+    ta.style.opacity = '0';
+    document.body.appendChild(ta);
+    ta.select();
+    try {
+        document.execCommand('copy');
+        showToast(`✓ ${label || 'Content'} copied to clipboard`);
+    } catch(e) {}
+    document.body.removeChild(ta);
+}
+
+function showToast(msg) {
+    let container = document.getElementById('toast_container');
+    if (!container) {
+        container = document.createElement('div');
+        container.id = 'toast_container';
+        document.body.appendChild(container);
+    }
+    const t = document.createElement('div');
+    t.className = 'toast-notification';
+    t.innerHTML = `<span>${msg}</span>`;
+    container.appendChild(t);
+    setTimeout(() => {
+        t.style.opacity = '0';
+        t.style.transform = 'translateY(-10px)';
+        t.style.transition = 'all 0.25s ease';
+        setTimeout(() => t.remove(), 250);
+    }, 1500);
+}
+
+function toggleMobileIdentity() {
+    const extra = document.getElementById('mobile_identity_extra');
+    const btn = document.getElementById('btn_toggle_identity');
+    if (!extra || !btn) return;
+    if (extra.style.display === 'none' || !extra.style.display) {
+        extra.style.display = 'flex';
+        btn.textContent = '[ ▲ HIDE METADATA SOURCES ]';
+    } else {
+        extra.style.display = 'none';
+        btn.textContent = '[ ▼ VIEW METADATA SOURCES ]';
+    }
+}
+
+function switchNavTab(tabId, btn) {
+    if (!tabId) return;
+    const targetView = document.getElementById('tab_' + tabId);
+    if (!targetView) return;
+
+    document.querySelectorAll('.tab-view').forEach(v => {
+        v.classList.remove('active-view');
+        v.style.display = 'none';
+    });
+    targetView.classList.add('active-view');
+    targetView.style.display = 'flex';
+
+    document.querySelectorAll('.nav-tab-btn, .mobile-nav-item').forEach(b => b.classList.remove('active'));
+    document.querySelectorAll('.nav-tab-btn, .mobile-nav-item').forEach(b => {
+        const onclickAttr = b.getAttribute('onclick');
+        if (onclickAttr && onclickAttr.includes(`'${tabId}'`)) {
+            b.classList.add('active');
+        }
+    });
+
+    localStorage.setItem('console_active_tab', tabId);
+    window.location.hash = tabId;
+
+    if (tabId === 'targets') {
+        fetchTargets();
+    } else if (tabId === 'overview') {
+        setTimeout(fetchPings, 50);
+    }
+}
+
+function showKeyboardHelp() { document.getElementById('keyboard_modal').style.display = 'flex'; }
+function closeKeyboardHelp(e) { if (!e || e.target.id === 'keyboard_modal') document.getElementById('keyboard_modal').style.display = 'none'; }
+
+async function fetchSummary() {
+    try {
+        const res = await fetch('/api/status/summary');
+        applySummary(await res.json());
+    } catch(e) {}
+}
+
+function applySummary(data) {
+    try {
+        validSamplesCount = data.validSamples || 0;
+        const statusEl = document.getElementById('hero_status_badge');
+        const reasonEl = document.getElementById('hero_status_reason');
+        const checksRatio = document.getElementById('hero_checks_ratio');
+        const syncTime = document.getElementById('nav_last_sync');
+
+        if (syncTime) syncTime.textContent = data.lastSuccessfulSync || '--:--:--';
+        if (checksRatio) checksRatio.textContent = `${data.completedChecks} / ${data.totalChecks}`;
+        if (reasonEl) reasonEl.textContent = data.summaryDetail || data.statusReason || '';
+        const nodeEl = document.getElementById('hero_node_id');
+        if (nodeEl && data.nodeId) nodeEl.textContent = `NODE_ID: ${data.nodeId}`;
+
+        if (statusEl) {
+            const st = data.overallStatus;
+            let badgeClass = 'status-initializing';
+            if (st === 'HEALTHY') badgeClass = 'status-healthy';
+            else if (st === 'DEGRADED') badgeClass = 'status-degraded';
+            else if (st === 'CRITICAL') badgeClass = 'status-critical';
+            statusEl.innerHTML = `<span class="badge-bracket ${badgeClass}">[ ${st} ]</span>`;
+        }
+
+        // Update Active Incidents KPI Card
+        const metricEv = document.getElementById('metric_events');
+        if (metricEv) metricEv.innerHTML = `${data.activeIncidents || 0} <span class="unit">open</span>`;
+        const metricEvSub = document.getElementById('metric_events_sub');
+        if (metricEvSub) metricEvSub.textContent = `${data.activeIncidents || 0} active, ${data.recoveredIncidents || 0} recovered`;
+
+        const ip = data.ipInfo || {};
+        document.getElementById('hero_ip_listen').textContent = ip.serverListen || '';
+        document.getElementById('hero_src_listen').textContent = `LISTEN SOURCE: ${ip.serverListenSource || ''}`;
+        document.getElementById('hero_ip_egress').textContent = ip.serverEgress || '';
+        document.getElementById('hero_src_egress').textContent = `EGRESS SOURCE: ${ip.serverEgressSource || ''}`;
+        if (ip.visitorIp !== undefined) applyClientInfo(ip);
+        document.getElementById('hero_ip_local').textContent = ip.localInterface || '';
+        document.getElementById('hero_src_local').textContent = `LOCAL SOURCE: ${ip.localInterfaceSource || ''}`;
+    } catch(e) {}
+}
+
+
+
+function applyClientInfo(ip) {
+    document.getElementById('hero_ip_visitor').textContent = ip.visitorIp || '';
+    document.getElementById('hero_src_visitor').textContent = `VISITOR SOURCE: ${ip.visitorIpSource || ''}`;
+}
+
+function toggleTargetFilter(targetId) {
+    if (targetId === 'all') {
+        if (selectedTargets.size === ALL_TARGET_KEYS.length) {
+            selectedTargets = new Set([ALL_TARGET_KEYS[0]]);
+        } else {
+            selectedTargets = new Set(ALL_TARGET_KEYS);
+        }
+    } else {
+        if (selectedTargets.has(targetId)) {
+            if (selectedTargets.size > 1) {
+                selectedTargets.delete(targetId);
+            }
+        } else {
+            selectedTargets.add(targetId);
+        }
+    }
+    updateTargetButtonUI();
+    renderCanvasChart(pingHistory);
+}
+
+function updateTargetButtonUI() {
+    const isAll = selectedTargets.size === ALL_TARGET_KEYS.length;
+    const btnAll = document.getElementById('target_btn_all');
+    if (btnAll) {
+        if (isAll) btnAll.classList.add('active');
+        else btnAll.classList.remove('active');
+    }
+
+    ALL_TARGET_KEYS.forEach(key => {
+        const btn = document.getElementById(`target_btn_${key}`);
+        if (!btn) return;
+        const isSelected = selectedTargets.has(key);
+        const color = TARGET_CONFIG[key]?.color || '#78E08F';
+
+        if (isSelected) {
+            btn.classList.add('active');
+            btn.style.opacity = '1.0';
+            btn.style.background = `${color}22`;
+            btn.style.borderColor = color;
+            btn.style.color = color;
+            btn.style.boxShadow = `0 0 8px ${color}44`;
+        } else {
+            btn.classList.remove('active');
+            btn.style.opacity = '0.4';
+            btn.style.background = 'transparent';
+            btn.style.borderColor = 'var(--border-tier3)';
+            btn.style.color = 'var(--text-muted)';
+            btn.style.boxShadow = 'none';
+        }
+    });
+}
+
+function toggleNavMoreMenu(e) {
+    if (e) e.stopPropagation();
+    const menu = document.getElementById('nav_more_menu');
+    if (menu) {
+        menu.style.display = (menu.style.display === 'none' || !menu.style.display) ? 'flex' : 'none';
+    }
+}
+
+document.addEventListener('click', (e) => {
+    const menu = document.getElementById('nav_more_menu');
+    if (menu && !menu.contains(e.target)) {
+        menu.style.display = 'none';
+    }
+});
+
+// Global State & Configuration initialized at top of script
+
+function getSampleLat(s, key) {
+    if (!s) return null;
+    if (s.targets_detail && typeof s.targets_detail[key] === 'number') {
+        return s.targets_detail[key];
+    }
+    if (s.meta && s.meta.details && typeof s.meta.details[key] === 'number') {
+        return s.meta.details[key];
+    }
+    if ((key === 'all' || !s.targets_detail || Object.keys(s.targets_detail).length === 0) && typeof s.latency === 'number') {
+        return s.latency;
+    }
+    return null;
+}
+
+function setChartMode(mode) {
+    currentChartMode = mode;
+    const btnHist = document.getElementById('btn_chart_mode_hist');
+    const btnLine = document.getElementById('btn_chart_mode_line');
+    if (btnHist && btnLine) {
+        if (mode === 'line') {
+            btnLine.classList.add('active');
+            btnHist.classList.remove('active');
+        } else {
+            btnHist.classList.add('active');
+            btnLine.classList.remove('active');
+        }
+    }
+    renderCanvasChart(pingHistory);
+}
+
+// Fold a delta (points at or after the newest one we hold) into the history window
+function mergePingHistory(history, fresh, windowSize) {
+    if (!fresh.length) return history;
+    const from = fresh[0].timestamp;
+    const merged = history.filter(p => p.timestamp < from).concat(fresh);
+    return windowSize ? merged.slice(-windowSize) : merged;
+}
+
+function pingQuery() {
+    const granSel = document.getElementById('ping_granularity');
+    return `?granularity=${encodeURIComponent(granSel ? granSel.value : '1m')}&range=${encodeURIComponent(currentPingRange)}`;
+}
+
+async function fetchPings() {
+    try {
+        const query = pingQuery();
+        const last = pingHistoryQuery === query && pingHistory.length ? pingHistory[pingHistory.length - 1] : null;
+        const since = last ? `&since=${last.timestamp}` : '';
+        let res = await fetch('/api/pings' + query + since);
+        if (!res.ok) {
+            res = await fetch('/pings' + query + since);
+        }
+        applyPings(await res.json(), query);
+    } catch(e) {
+        console.error('Error fetching pings or rendering chart:', e);
+    }
+}
+
+function applyPings(data, query) {
+    try {
+        const stats = data.stats || {};
+
+        pingHistory = data.delta
+            ? mergePingHistory(pingHistory, stats.history || [], stats.window)
+            : (stats.history || []);
+        pingHistoryQuery = query;
+        validSamplesCount = (stats.samples_count !== undefined && stats.samples_count !== null) 
+            ? stats.samples_count 
+            : (pingHistory ? pingHistory.filter(s => s && (s.latency !== null || s.targets_detail)).length : 0);
+
+        const emptyBox = document.getElementById('chart_empty_box');
+        const emptyProg = document.getElementById('chart_empty_progress');
+
+        const hasRealtimeData = ALL_TARGET_KEYS.some(k => typeof data[k] === 'number');
+        const hasHistoryData = Boolean(pingHistory && pingHistory.length > 0 && pingHistory.some(s => s && (s.latency !== null || (s.targets_detail && Object.keys(s.targets_detail).length > 0))));
+        const hasValidData = hasRealtimeData || hasHistoryData || validSamplesCount > 0;
+
+        if (!hasValidData) {
+            if (emptyBox) emptyBox.style.display = 'flex';
+            if (emptyProg) emptyProg.textContent = `> waiting for valid samples... (${validSamplesCount} / 3 collected)`;
+        } else {
+            if (emptyBox) emptyBox.style.display = 'none';
+        }
+
+        const setElText = (id, text) => {
+            const el = document.getElementById(id);
+            if (el) el.textContent = text;
+        };
+        const setElHtml = (id, html) => {
+            const el = document.getElementById(id);
+            if (el) el.innerHTML = html;
+        };
+
+        setElText('ping_stat_cur', stats.cur !== null && stats.cur !== undefined ? `${stats.cur} ms` : '- ms');
+        setElText('ping_stat_avg', stats.avg !== null && stats.avg !== undefined ? `${stats.avg} ms` : '- ms');
+        setElText('ping_stat_min', stats.min !== null && stats.min !== undefined ? `${stats.min} ms` : '- ms');
+        setElText('ping_stat_max', stats.max !== null && stats.max !== undefined ? `${stats.max} ms` : '- ms');
+        setElText('ping_stat_p95', stats.p95 !== null && stats.p95 !== undefined ? `${stats.p95} ms` : '- ms');
+        setElText('ping_stat_p99', stats.p99 !== null && stats.p99 !== undefined ? `${stats.p99} ms` : '- ms');
+        // Direct real-time updates for legend items
+        ALL_TARGET_KEYS.forEach(key => {
+            let val = data[key];
+            if (val === undefined || val === null) {
+                const latest = pingHistory[pingHistory.length - 1];
+                val = getSampleLat(latest, key);
+            }
+            const shortKey = key.replace('ping_', '');
+            const legEl = document.getElementById(`leg_val_${shortKey}`);
+            if (legEl) {
+                legEl.textContent = (val !== null && val !== undefined) ? `${Math.round(val)}ms` : '-ms';
+            }
+        });
+
+        // Calculate aggregate display latency
+        let curLatencyDisplay = stats.cur;
+        if ((curLatencyDisplay === null || curLatencyDisplay === undefined) && data) {
+            const validVals = ALL_TARGET_KEYS.map(k => data[k]).filter(v => typeof v === 'number');
+            if (validVals.length > 0) curLatencyDisplay = Math.min(...validVals);
+        }
+
+        setElHtml('metric_latency', curLatencyDisplay !== null && curLatencyDisplay !== undefined ? `${curLatencyDisplay} <span class="unit">ms</span>` : `- <span class="unit">ms</span>`);
+        setElText('metric_latency_sub', stats.avg !== null && stats.avg !== undefined ? `1h avg: ${stats.avg}ms` : '1h avg: -');
+        setElText('metric_samples_sub', `${stats.total_samples || 0} samples`);
+        setElHtml('metric_jitter', `${stats.jitter || 0} <span class="unit">ms</span>`);
+
+        renderCanvasChart(pingHistory, stats.avg);
+    } catch(e) {
+        console.error('Error fetching pings or rendering chart:', e);
+    }
+}
+
+function updateTargetFilterUI() {
+    updateTargetButtonUI();
+}
+
+function renderCanvasChart(samples, avgValue) {
+    const canvas = document.getElementById('tcpingCanvas');
+    if (!canvas) return;
+    const ctx = canvas.getContext('2d');
+    const w = canvas.offsetWidth || (canvas.parentElement ? canvas.parentElement.offsetWidth : 800);
+    const h = canvas.offsetHeight || 320;
+    canvas.width = w; canvas.height = h;
+
+    ctx.clearRect(0, 0, w, h);
+    if (!samples || samples.length === 0) return;
+
+    // 1. Collect all latency values among SELECTED targets to calculate max Y scale
+    let activeKeys = Array.from(selectedTargets);
+    if (activeKeys.length === 0) activeKeys = ALL_TARGET_KEYS;
+
+    let selectedLats = [];
+    samples.forEach(s => {
+        activeKeys.forEach(k => {
+            const val = getSampleLat(s, k);
+            if (val !== null && typeof val === 'number') {
+                selectedLats.push(val);
+            }
+        });
+    });
+
+    const maxSample = selectedLats.length > 0 ? Math.max(...selectedLats) : 100;
+    const maxLat = Math.max(160, Math.ceil(maxSample * 1.25));
+
+    const paddingLeft = 55;
+    const paddingRight = 20;
+    const paddingTop = 25;
+    const paddingBottom = 30;
+
+    const chartW = w - paddingLeft - paddingRight;
+    const chartH = h - paddingTop - paddingBottom;
+
+    // 2. Y-Axis Grid Lines & Labels
+    ctx.font = '11px "JetBrains Mono", monospace';
+    ctx.fillStyle = '#5D6A60';
+    ctx.textAlign = 'right';
+
+    const ySteps = 5;
+    for (let i = 0; i <= ySteps; i++) {
+        const latVal = Math.round((maxLat / ySteps) * i);
+        const y = h - paddingBottom - (latVal / maxLat) * chartH;
+
+        ctx.strokeStyle = 'rgba(146, 173, 151, 0.08)';
+        ctx.lineWidth = 1;
+        ctx.beginPath();
+        ctx.moveTo(paddingLeft, y);
+        ctx.lineTo(w - paddingRight, y);
+        ctx.stroke();
+
+        ctx.fillText(`${latVal} ms`, paddingLeft - 8, y + 4);
+    }
+
+    // 3. X-Axis Time Labels
+    ctx.textAlign = 'center';
+    const xStepCount = Math.min(8, samples.length);
+    const timeInterval = Math.max(1, Math.floor(samples.length / xStepCount));
+
+    for (let idx = 0; idx < samples.length; idx += timeInterval) {
+        const s = samples[idx];
+        const x = paddingLeft + (idx / Math.max(1, samples.length - 1)) * chartW;
+        if (s && s.time) {
+            ctx.fillText(s.time, x, h - 8);
+        }
+    }
+
+    // 4. Threshold Lines (100ms Warning)
+    const y100 = h - paddingBottom - (100 / maxLat) * chartH;
+    if (y100 >= paddingTop && y100 <= h - paddingBottom) {
+        ctx.strokeStyle = 'rgba(231, 198, 107, 0.25)';
+        ctx.setLineDash([4, 4]);
+        ctx.beginPath(); ctx.moveTo(paddingLeft, y100); ctx.lineTo(w - paddingRight, y100); ctx.stroke();
+        ctx.setLineDash([]);
+    }
+
+    // 5. Update Legend Realtime Values
+    const latestSample = samples[samples.length - 1];
+    if (latestSample) {
+        ALL_TARGET_KEYS.forEach(key => {
+            const val = getSampleLat(latestSample, key);
+            const legEl = document.getElementById(`leg_val_${key.replace('ping_','')}`);
+            if (legEl) {
+                legEl.textContent = (val !== null && val !== undefined) ? `${Math.round(val)}ms` : '-ms';
+            }
+        });
+    }
+
+    // 6. Draw Chart Data based on currentChartMode
+    const numColumns = samples.length;
+    const colGap = 4;
+    const totalGap = (numColumns - 1) * colGap;
+    const colWidth = Math.max(4, Math.floor((chartW - totalGap) / numColumns));
+
+    if (currentChartMode === 'line') {
+        // --- 📈 PREMIUM NEON MULTI-TARGET GLOWING TREND CURVES ---
+        activeKeys.forEach(key => {
+            const config = TARGET_CONFIG[key] || { color: '#78E08F', glow: 'rgba(120,224,143,0.8)', fillStart: 'rgba(120,224,143,0.22)' };
+            const points = [];
+
+            samples.forEach((s, idx) => {
+                let lat = getSampleLat(s, key);
+                const x = paddingLeft + (idx / Math.max(1, samples.length - 1)) * chartW;
+                if (lat !== null && lat !== undefined) {
+                    const y = h - paddingBottom - (lat / maxLat) * chartH;
+                    points.push({ x, y, lat });
+                }
+            });
+
+            if (points.length === 0) return;
+
+            // Step A: Draw Soft Ambient Fill Gradient Under Curve
+            const areaGrad = ctx.createLinearGradient(0, paddingTop, 0, h - paddingBottom);
+            areaGrad.addColorStop(0, config.fillStart);
+            areaGrad.addColorStop(1, "rgba(0, 0, 0, 0)");
+
+            ctx.fillStyle = areaGrad;
+            ctx.beginPath();
+            ctx.moveTo(points[0].x, h - paddingBottom);
+            points.forEach((pt, i) => {
+                if (i === 0) ctx.lineTo(pt.x, pt.y);
+                else {
+                    const prev = points[i - 1];
+                    const cx = (prev.x + pt.x) / 2;
+                    ctx.bezierCurveTo(cx, prev.y, cx, pt.y, pt.x, pt.y);
+                }
+            });
+            ctx.lineTo(points[points.length - 1].x, h - paddingBottom);
+            ctx.closePath();
+            ctx.fill();
+
+            // Step B: Draw Neon Glow Pass
+            ctx.shadowColor = config.glow;
+            ctx.shadowBlur = 12;
+            ctx.strokeStyle = config.color;
+            ctx.lineWidth = 3.0;
+            ctx.beginPath();
+            points.forEach((pt, i) => {
+                if (i === 0) ctx.moveTo(pt.x, pt.y);
+                else {
+                    const prev = points[i - 1];
+                    const cx = (prev.x + pt.x) / 2;
+                    ctx.bezierCurveTo(cx, prev.y, cx, pt.y, pt.x, pt.y);
+                }
+            });
+            ctx.stroke();
+            ctx.shadowBlur = 0;
+
+            // Step C: Draw Crisp Inner Core Line
+            ctx.strokeStyle = '#FFFFFF';
+            ctx.globalAlpha = 0.35;
+            ctx.lineWidth = 1.0;
+            ctx.stroke();
+            ctx.globalAlpha = 1.0;
+
+            // Step D: Draw Halo Data Points
+            points.forEach(pt => {
+                // Outer glow ring
+                ctx.fillStyle = config.glow;
+                ctx.beginPath();
+                ctx.arc(pt.x, pt.y, 4.5, 0, Math.PI * 2);
+                ctx.fill();
+
+                // Solid inner dot
+                ctx.fillStyle = '#FFFFFF';
+                ctx.beginPath();
+                ctx.arc(pt.x, pt.y, 2.0, 0, Math.PI * 2);
+                ctx.fill();
+            });
+        });
+
+    } else {
+        // --- 📊 SCIENTIFIC MULTI-TARGET GROUPED PIXEL HISTOGRAM ---
+        const numTargets = activeKeys.length;
+        const subWidth = Math.max(2, Math.floor(colWidth / numTargets));
+        const subGap = numTargets > 1 ? 1 : 0;
+        const drawWidth = Math.max(1, subWidth - subGap);
+        const blockHeight = 4;
+        const blockGap = 2;
+        const totalBlockUnit = blockHeight + blockGap;
+
+        samples.forEach((s, idx) => {
+            const colX = paddingLeft + idx * (colWidth + colGap);
+
+            activeKeys.forEach((key, tIdx) => {
+                const subX = colX + tIdx * subWidth;
+                let lat = getSampleLat(s, key);
+                const config = TARGET_CONFIG[key] || { color: '#78E08F' };
+
+                if (lat === null || lat === undefined) {
+                    ctx.fillStyle = 'rgba(240, 120, 120, 0.4)';
+                    ctx.fillRect(subX, h - paddingBottom - 3, drawWidth, 3);
+                    return;
+                }
+
+                let barColor = config.color;
+                if (lat > 200) barColor = '#F07878';
+                else if (lat > 100) barColor = '#E7C66B';
+
+                const barHeightPx = (lat / maxLat) * chartH;
+                const blockCount = Math.max(1, Math.floor(barHeightPx / totalBlockUnit));
+
+                for (let b = 0; b < blockCount; b++) {
+                    const blockY = h - paddingBottom - (b + 1) * totalBlockUnit;
+                    const isTopCap = (b === blockCount - 1);
+
+                    ctx.fillStyle = isTopCap ? '#FFFFFF' : barColor;
+                    ctx.globalAlpha = isTopCap ? 1.0 : 0.85;
+                    ctx.fillRect(subX, blockY, drawWidth, blockHeight);
+                }
+                ctx.globalAlpha = 1.0;
+            });
+        });
+    }
+
+    // 7. Interactive Crosshair & Floating Tooltip Overlay
+    const tooltipEl = document.getElementById('chart_hover_tooltip');
+    if (chartMouseX !== null && chartMouseX >= paddingLeft && chartMouseX <= w - paddingRight) {
+        const sampleIdx = Math.min(samples.length - 1, Math.max(0, Math.round(((chartMouseX - paddingLeft) / chartW) * (samples.length - 1))));
+        const closestSample = samples[sampleIdx];
+        if (closestSample) {
+            const closestX = paddingLeft + (sampleIdx / Math.max(1, samples.length - 1)) * chartW;
+
+            // Hairline Crosshair
+            ctx.strokeStyle = 'rgba(120, 224, 143, 0.55)';
+            ctx.lineWidth = 1;
+            ctx.setLineDash([3, 3]);
+            ctx.beginPath();
+            ctx.moveTo(closestX, paddingTop);
+            ctx.lineTo(closestX, h - paddingBottom);
+            ctx.stroke();
+            ctx.setLineDash([]);
+
+            let ttHtml = `<div style="font-weight:700; color:var(--status-success); border-bottom:1px solid var(--border-tier3); padding-bottom:4px; margin-bottom:4px;">⏱ TIME: ${closestSample.time || '--:--:--'}</div>`;
+
+            activeKeys.forEach(k => {
+                const val = closestSample.targets_detail ? closestSample.targets_detail[k] : closestSample.latency;
+                const cfg = TARGET_CONFIG[k] || { name: k, color: '#78E08F' };
+                const latStr = (val !== null && val !== undefined) ? `${Math.round(val)} ms` : '<span style="color:#F07878">TIMEOUT</span>';
+
+                ttHtml += `
+                    <div style="display:flex; justify-content:space-between; align-items:center; gap:12px;">
+                        <span style="color:${cfg.color}; font-weight:600;">● ${cfg.name}</span>
+                        <span class="mono" style="font-weight:700;">${latStr}</span>
+                    </div>
+                `;
+
+                // Draw focus ring on curve point
+                if (val !== null && val !== undefined) {
+                    const pointY = h - paddingBottom - (val / maxLat) * chartH;
+                    ctx.fillStyle = cfg.color;
+                    ctx.beginPath();
+                    ctx.arc(closestX, pointY, 5.5, 0, Math.PI * 2);
+                    ctx.fill();
+
+                    ctx.fillStyle = '#FFFFFF';
+                    ctx.beginPath();
+                    ctx.arc(closestX, pointY, 2.5, 0, Math.PI * 2);
+                    ctx.fill();
+                }
+            });
+
+            if (tooltipEl) {
+                tooltipEl.innerHTML = ttHtml;
+                tooltipEl.style.display = 'flex';
+
+                let ttLeft = closestX + 15;
+                if (ttLeft + 210 > w) ttLeft = closestX - 215;
+                tooltipEl.style.left = `${Math.max(10, ttLeft)}px`;
+            }
+        }
+    } else if (tooltipEl) {
+        tooltipEl.style.display = 'none';
+    }
+}
+
+/* ── Time Range & Granularity Auto-Linkage Engine ── */
+const RANGE_GRANULARITY_MAP = {
+    '1h': '1m',
+    '6h': '5m',
+    '24h': '15m',
+    '7d': '1h',
+    '30d': '1h'
+};
+
+function setPingRange(range, btn) {
+    currentPingRange = range;
+    if (btn) {
+        const btns = btn.parentElement ? btn.parentElement.querySelectorAll('button') : [];
+        btns.forEach(b => b.classList.remove('active'));
+        btn.classList.add('active');
+    }
+
+    const sel = document.getElementById('ping_granularity');
+    if (sel && RANGE_GRANULARITY_MAP[range]) {
+        sel.value = RANGE_GRANULARITY_MAP[range];
+    }
+
+    showToast('info', `Time range set to ${range.toUpperCase()} (Auto granularity: ${sel ? sel.value : '1m'})`);
+    refreshPingView();
+}
+
+function exportPingCSV() {
+    if (!pingHistory || pingHistory.length === 0) {
+        showToast('warning', 'No telemetry ping data available to export.');
+        return;
+    }
+
+    let csv = 'timestamp,time,target,latency_ms\n';
+    pingHistory.forEach(pt => {
+        const t = pt.time || '';
+        const ts = pt.timestamp || '';
+        if (pt.targets_detail) {
+            Object.keys(pt.targets_detail).forEach(k => {
+                csv += `${ts},${t},${k},${pt.targets_detail[k] ?? ''}\n`;
+            });
+        } else {
+            csv += `${ts},${t},global,${pt.latency ?? ''}\n`;
+        }
+    });
+
+    const blob = new Blob([csv], { type: 'text/csv;charset=utf-8;' });
+    const url = URL.createObjectURL(blob);
+    const a = document.createElement('a');
+    a.href = url;
+    a.download = `netwatch_ping_telemetry_${new Date().toISOString().slice(0,10)}.csv`;
+    a.click();
+    URL.revokeObjectURL(url);
+    showToast('success', 'Ping telemetry exported as CSV.');
+}
+
+function filterLogs(level, btn) {
+    if (btn) {
+        const btns = btn.parentElement ? btn.parentElement.querySelectorAll('button') : [];
+        btns.forEach(b => b.classList.remove('active'));
+        btn.classList.add('active');
+    }
+
+    const rows = document.querySelectorAll('#log_stream_box .log-row');
+    rows.forEach(row => {
+        if (level === 'all') {
+            row.style.display = 'flex';
+        } else {
+            const text = row.textContent.toLowerCase();
+            if (text.includes(`[${level.toLowerCase()}]`)) {
+                row.style.display = 'flex';
+            } else {
+                row.style.display = 'none';
+            }
+        }
+    });
+}
+
+function clearLogView() {
+    const box = document.getElementById('log_stream_box');
+    if (box) {
+        box.innerHTML = '<div class="log-row"><span class="log-time">SYS</span> <span class="log-level level-info">[INFO]</span> <span class="log-msg">Local view cleared. Server events & telemetry persist.</span></div>';
+    }
+    showToast('info', 'Local log view cleared (Stored events remain intact).');
+}
+
+// chartMouseX & chartMouseY initialized at top of script
+
+// Attach canvas hover listener
+window.addEventListener('DOMContentLoaded', () => {
+    const canvasEl = document.getElementById('tcpingCanvas');
+    if (canvasEl) {
+        canvasEl.addEventListener('mousemove', (e) => {
+            const rect = canvasEl.getBoundingClientRect();
+            chartMouseX = e.clientX - rect.left;
+            chartMouseY = e.clientY - rect.top;
+            renderCanvasChart(pingHistory);
+        });
+        canvasEl.addEventListener('mouseleave', () => {
+            chartMouseX = null;
+            chartMouseY = null;
+            const tt = document.getElementById('chart_hover_tooltip');
+            if (tt) tt.style.display = 'none';
+            renderCanvasChart(pingHistory);
+        });
+    }
+});
+
+let cpuHist = [], memHist = [], diskHist = [], netHist = [];
+
+function drawMiniSparkline(canvasId, data, color) {
+    const cv = document.getElementById(canvasId);
+    if (!cv) return;
+    const ctx = cv.getContext('2d');
+    const w = cv.width = 100;
+    const h = cv.height = 18;
+    ctx.clearRect(0, 0, w, h);
+    if (!data || data.length < 2) return;
+
+    const maxV = Math.max(10, ...data);
+
+    ctx.beginPath();
+    ctx.strokeStyle = color;
+    ctx.lineWidth = 1.5;
+
+    data.forEach((val, i) => {
+        const x = (i / (data.length - 1)) * w;
+        const y = h - 2 - (val / maxV) * (h - 4);
+        if (i === 0) ctx.moveTo(x, y);
+        else ctx.lineTo(x, y);
+    });
+    ctx.stroke();
+
+    ctx.lineTo(w, h);
+    ctx.lineTo(0, h);
+    ctx.closePath();
+    ctx.fillStyle = `${color}22`;
+    ctx.fill();
+}
+
+function toggleFullscreenChart() {
+    const card = document.getElementById('card_tcping_watch');
+    if (!card) return;
+    card.classList.toggle('fullscreen-chart-active');
+    setTimeout(() => {
+        renderCanvasChart(pingHistory);
+    }, 100);
+}
+
+async function fetchStats() {
+    try {
+        const res = await fetch('/stats');
+        applyStats(await res.json());
+    } catch(e) {}
+}
+
+function applyStats(data) {
+    try {
+        const cpu = data.cpu || 0;
+        const mem = data.memory || 0;
+        const disk = data.disk || 0;
+        const rx = data.net_rx_kbps || 0;
+        const tx = data.net_tx_kbps || 0;
+
+        cpuHist.push(cpu); if (cpuHist.length > 20) cpuHist.shift();
+        memHist.push(mem); if (memHist.length > 20) memHist.shift();
+        diskHist.push(disk); if (diskHist.length > 20) diskHist.shift();
+        netHist.push(rx + tx); if (netHist.length > 20) netHist.shift();
+
+        drawMiniSparkline('sparkline_cpu', cpuHist, '#50FA7B');
+        drawMiniSparkline('sparkline_mem', memHist, '#8BE9FD');
+        drawMiniSparkline('sparkline_disk', diskHist, '#BD93F9');
+        drawMiniSparkline('sparkline_net', netHist, '#FF6B6B');
+
+        updateAsciiRow('cpu', cpu, 'cpu_val', 'ascii_cpu_bar');
+        updateAsciiRow('mem', mem, 'mem_val', 'ascii_mem_bar');
+        updateAsciiRow('disk', disk, 'disk_val', 'ascii_disk_bar');
+
+        const netRate = document.getElementById('net_rate_val');
+        if (netRate) netRate.textContent = `↓ ${rx.toFixed(1)}K/s ↑ ${tx.toFixed(1)}K/s`;
+
+        if (data.mem_used_gb !== undefined) {
+            const memBytes = document.getElementById('mem_bytes_val');
+            if (memBytes) memBytes.textContent = `${data.mem_used_gb} GB / ${data.mem_total_gb} GB`;
+        }
+        if (data.disk_used_gb !== undefined) {
+            const diskBytes = document.getElementById('disk_bytes_val');
+            if (diskBytes) diskBytes.textContent = `${data.disk_used_gb} GB / ${data.disk_total_gb} GB`;
+        }
+        if (data.load) {
+            const loadEl = document.getElementById('cpu_load_val');
+            if (loadEl) loadEl.textContent = `load: ${data.load}`;
+        }
+    } catch(e) {}
+}
+
+function updateAsciiRow(type, pct, valId, barId) {
+    const valEl = document.getElementById(valId);
+    const barEl = document.getElementById(barId);
+    if (valEl) valEl.textContent = `${pct.toFixed(0)}%`;
+    if (barEl) {
+        const total = 16;
+        const filled = Math.min(total, Math.max(0, Math.round((pct / 100) * total)));
+        barEl.textContent = '[' + '█'.repeat(filled) + '░'.repeat(total - filled) + ']';
+        if (pct >= 85) barEl.className = 'ascii-bar bar-red';
+        else if (pct >= 70) barEl.className = 'ascii-bar bar-yellow';
+        else barEl.className = 'ascii-bar bar-green';
+    }
+}
+
+async function fetchTargets() {
+    try {
+        const res = await fetch('/api/targets');
+        const targets = await res.json();
+        const tbody = document.getElementById('targets_tbody');
+        if (tbody && Array.isArray(targets)) {
+            tbody.innerHTML = targets.map(t => `
+                <tr>
+                    <td><span class="badge-bracket ${t.enabled ? 'status-healthy' : 'status-warning'}">[ ${t.enabled ? 'ACTIVE' : 'DISABLED'} ]</span></td>
+                    <td class="font-bold">${t.name}</td>
+                    <td class="text-cyan">${t.target}</td>
+                    <td><span class="badge-bracket status-cyan">${(t.type || 'tcp').toUpperCase()}</span></td>
+                    <td>${t.freq || 30}s</td>
+                    <td><span class="text-warning">Warn: ${t.threshold_warn || 160}ms</span> / <span class="text-critical">Crit: ${t.threshold_crit || 250}ms</span></td>
+                    <td style="display:flex; gap:6px;">
+                        <button class="btn-cli" onclick="toggleTarget('${t.id}')">[ ${t.enabled ? 'DISABLE' : 'ENABLE'} ]</button>
+                        <button class="btn-cli" onclick="editTargetModal('${t.id}')">[ EDIT ]</button>
+                        <button class="btn-cli" onclick="deleteTarget('${t.id}')">[ DELETE ]</button>
+                    </td>
+                </tr>
+            `).join('');
+        }
+    } catch(e) {}
+}
+
+function openAddTargetModal() {
+    document.getElementById('target_id_input').value = '';
+    document.getElementById('target_name_input').value = '';
+    document.getElementById('target_host_input').value = '';
+    document.getElementById('target_modal_title').textContent = '$ nano /etc/netwatch/targets.conf [NEW]';
+    document.getElementById('target_modal').style.display = 'flex';
+}
+
+function closeTargetModal(e) {
+    if (!e || e.target.id === 'target_modal') {
+        document.getElementById('target_modal').style.display = 'none';
+    }
+}
+
+async function editTargetModal(tid) {
+    try {
+        const res = await fetch('/api/targets');
+        const targets = await res.json();
+        const t = targets.find(item => item.id === tid);
+        if (t) {
+            document.getElementById('target_id_input').value = t.id;
+            document.getElementById('target_name_input').value = t.name || '';
+            document.getElementById('target_host_input').value = t.target || '';
+            document.getElementById('target_type_input').value = t.type || 'tcp';
+            document.getElementById('target_freq_input').value = t.freq || 30;
+            document.getElementById('target_warn_input').value = t.threshold_warn || 160;
+            document.getElementById('target_crit_input').value = t.threshold_crit || 250;
+            document.getElementById('target_modal_title').textContent = `$ nano /etc/netwatch/targets.conf [${t.name}]`;
+            document.getElementById('target_modal').style.display = 'flex';
+        }
+    } catch(e) {}
+}
+
+async function saveTargetSubmit() {
+    const id = document.getElementById('target_id_input').value;
+    const name = document.getElementById('target_name_input').value.trim();
+    const target = document.getElementById('target_host_input').value.trim();
+    const type = document.getElementById('target_type_input').value;
+    const freq = parseInt(document.getElementById('target_freq_input').value) || 30;
+    const warn = parseInt(document.getElementById('target_warn_input').value) || 160;
+    const crit = parseInt(document.getElementById('target_crit_input').value) || 250;
+
+    if (!name || !target) {
+        alert('请填写目标名称与 Host:Port');
+        return;
+    }
+
+    const payload = {
+        name, target, type, freq,
+        threshold_warn: warn,
+        threshold_crit: crit,
+        enabled: true
+    };
+    if (id) payload.id = id;
+
+    try {
+        await fetch('/api/targets', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify(payload)
+        });
+        closeTargetModal();
+        fetchTargets();
+    } catch(e) {
+        alert('保存配置失败: ' + e.message);
+    }
+}
+
+async function deleteTarget(tid) {
+    if (!confirm('确定要删除该监测目标吗？')) return;
+    try {
+        await fetch(`/api/targets?id=${tid}`, { method: 'DELETE' });
+        fetchTargets();
+    } catch(e) {}
+}
+
+async function toggleTarget(tid) {
+    try {
+        const res = await fetch('/api/targets');
+        const targets = await res.json();
+        const target = targets.find(t => t.id === tid);
+        if (target) {
+            target.enabled = !target.enabled;
+            await fetch('/api/targets', {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify(target)
+            });
+            fetchTargets();
+        }
+    } catch(e) {}
+}
+
+async function renderUptimeHeatmap() {
+    const container = document.getElementById('heatmap_container');
+    if (!container) return;
+    container.innerHTML = '';
+    try {
+        const res = await fetch('/api/uptime/history');
+        const data = await res.json();
+        const slaVal = document.getElementById('uptime_sla_val');
+        if (slaVal) {
+            slaVal.textContent = `${data.sla30d || 100.0}% (${data.recorded_days || 1}d recorded)`;
+        }
+
+        (data.days || []).forEach(day => {
+            const sq = document.createElement('div');
+            if (day.status === 'nodata' || !day.has_data) {
+                sq.className = 'heatmap-sq sq-nodata';
+                sq.title = `${day.date} | 未记录数据 (No Telemetry Data)`;
+            } else {
+                sq.className = `heatmap-sq sq-${day.status}`;
+                sq.title = `${day.date} | SLA: ${day.sla}% | Incidents: ${day.incidents} | Max Latency: ${day.maxLatency}ms\nRoot cause: ${day.rootCause}`;
+            }
+            container.appendChild(sq);
+        });
+    } catch(e) {}
+}
+
+async function startFullDiagnostics() {
+    const btn = document.getElementById('diag_run_btn');
+    if (btn) { btn.disabled = true; btn.textContent = '[~ RUNNING DIAGNOSTIC...]'; }
+
+    const container = document.getElementById('diag_stages_grid');
+    if (container) {
+        container.innerHTML = `
+            <div class="diag-cli-item"><span>[~] Stage 1/12: Local Interfaces check...</span><span class="text-cyan">RUNNING</span></div>
+            <div class="diag-cli-item"><span>[ ] Stage 2/12: Gateway Routing...</span><span class="text-muted">WAITING</span></div>
+            <div class="diag-cli-item"><span>[ ] Stage 3/12: TCP Handshake...</span><span class="text-muted">WAITING</span></div>
+        `;
+    }
+
+    try {
+        const targetInput = document.getElementById('diag_target_input');
+        const target = (targetInput && targetInput.value) ? targetInput.value : 'github.com';
+        const res = await fetch(`/api/diagnose/full?target=${target}`);
+        const data = await res.json();
+
+        if (container) {
+            container.innerHTML = (data.stages || []).map(s => `
+                <div class="diag-cli-item">
+                    <span>[✓] Stage ${s.stage}: ${s.name} - ${s.raw}</span>
+                    <span class="badge-bracket status-${s.status}">[ ${s.status.toUpperCase()} ] (${s.duration}ms)</span>
+                </div>
+            `).join('');
+        }
+    } catch(e) {} finally {
+        if (btn) { btn.disabled = false; btn.textContent = '[✓ DIAGNOSTIC COMPLETED]'; }
+    }
+}
+
+function exportDiagnosticReport() { window.location.href = '/api/report/export?format=markdown'; }
+function exportReportFmt(fmt) { window.location.href = `/api/report/export?format=${fmt}`; }
+function applyLogGrep() {}
+function toggleAutoScroll() {}
+
+// Keyboard Shortcuts Listener
+window.addEventListener('keydown', (e) => {
+    if (e.target.tagName === 'INPUT' || e.target.tagName === 'TEXTAREA') return;
+    const key = e.key.toUpperCase();
+    if (key === 'R') { fetchSummary(); fetchPings(); fetchStats(); }
+    else if (key === 'D') { switchNavTab('diagnostics'); }
+    else if (key === 'L') { switchNavTab('events'); }
+    else if (key === 'T') { switchNavTab('targets'); }
+    else if (key === '?') { showKeyboardHelp(); }
+    else if (key === 'ESCAPE') { closeKeyboardHelp(); }
+});
+
+let versionPollTimer = null;
+
+async function manualCheckVersion() {
+    showToast("🔍 正在主动检测 GitHub 最新版本...");
+    await checkVersionStatus(true);
+}
+
+async function checkVersionStatus(isManual = false) {
+    try {
+        const res = await fetch('/api/version/check');
+        const data = await res.json();
+
+        const badgeEl = document.getElementById('version_badge_ui');
+        if (badgeEl && data.current_version) {
+            badgeEl.textContent = `v${data.current_version}`;
+        }
+
+        const updateWrap = document.getElementById('update_notification_badge');
+        const updateBtn = document.getElementById('btn_do_auto_update');
+        const dockerBuild = data.docker_build || { ready: true };
+
+        if (data.has_update) {
+            if (updateWrap) updateWrap.style.display = 'inline-block';
+
+            if (!dockerBuild.ready) {
+                if (updateBtn) {
+                    updateBtn.disabled = true;
+                    updateBtn.style.opacity = '0.7';
+                    updateBtn.style.animation = 'pulse 1.5s infinite';
+                    updateBtn.textContent = `[ ⏳ GH ACTIONS BUILD IN PROGRESS (${(dockerBuild.status || 'BUILDING').toUpperCase()})... ]`;
+                }
+                if (!versionPollTimer) {
+                    versionPollTimer = setInterval(checkVersionStatus, 8000);
+                }
+            } else {
+                if (updateBtn) {
+                    updateBtn.disabled = false;
+                    updateBtn.style.opacity = '1.0';
+                    updateBtn.style.animation = 'none';
+                    updateBtn.textContent = `[ 🚀 NEW IMAGE READY: v${data.latest_version} - UPDATE NOW ]`;
+                }
+                if (versionPollTimer) {
+                    clearInterval(versionPollTimer);
+                    versionPollTimer = null;
+                }
+            }
+
+            if (isManual) {
+                showCyberModal(
+                    '🚀 发现 GitHub 新版本 (NEW VERSION DISCOVERED)', 
+                    `当前版本: v${data.current_version}\n最新版本: v${data.latest_version}\n\n更新说明: ${data.release_notes || '点击下方 [ CONFIRM ] 按钮完成一键平滑热更新。'}`, 
+                    'info',
+                    () => triggerAutoUpdate()
+                );
+            }
+        } else {
+            if (updateWrap) updateWrap.style.display = 'inline-block';
+            if (updateBtn) {
+                updateBtn.disabled = false;
+                updateBtn.style.opacity = '1.0';
+                updateBtn.textContent = `[ 🚀 AUTO UPDATE ]`;
+            }
+            if (versionPollTimer) {
+                clearInterval(versionPollTimer);
+                versionPollTimer = null;
+            }
+
+            if (isManual) {
+                showCyberModal(
+                    '✅ 版本检测与一键更新 (SYSTEM VERSION & UPDATE)', 
+                    `当前运行版本: v${data.current_version}\nGitHub main 分支: v${data.latest_version}\n\n当前系统运行正常。若需强制重新拉取 GitHub main 最新代码覆盖更新，请点击下方 [ CONFIRM ] 按钮。`, 
+                    'success',
+                    () => triggerAutoUpdate()
+                );
+            }
+        }
+    } catch(e) {
+        if (isManual) {
+            showCyberModal('❌ 版本检查失败 (NETWORK ERROR)', `无法连接至 GitHub 版本检测接口: ${e.message}`, 'error');
+        }
+    }
+}
+
+function showCyberModal(title, message, type = 'info', onConfirm = null) {
+    const overlay = document.getElementById('cyber_modal_overlay');
+    const titleEl = document.getElementById('cyber_modal_title');
+    const statusEl = document.getElementById('cyber_modal_status');
+    const bodyEl = document.getElementById('cyber_modal_body');
+    const actionsEl = document.getElementById('cyber_modal_actions');
+
+    if (!overlay) {
+        window.alert(message);
+        return;
+    }
+
+    if (titleEl) titleEl.textContent = title || '$ system --notification';
+    if (bodyEl) bodyEl.textContent = message || '';
+
+    let badgeClass = 'status-healthy';
+    let statusText = '[ NOTICE ]';
+    if (type === 'error' || type === 'critical') {
+        badgeClass = 'status-critical';
+        statusText = '[ CRITICAL ERROR ]';
+    } else if (type === 'warn' || type === 'warning') {
+        badgeClass = 'status-degraded';
+        statusText = '[ WARNING ]';
+    } else if (type === 'success') {
+        badgeClass = 'status-healthy';
+        statusText = '[ SUCCESS ]';
+    }
+    if (statusEl) {
+        statusEl.className = `badge-bracket ${badgeClass}`;
+        statusEl.textContent = statusText;
+    }
+
+    if (onConfirm) {
+        actionsEl.innerHTML = `
+            <button class="btn-cli" onclick="closeCyberModal()">[ CANCEL ]</button>
+            <button class="btn-cli-primary" id="cyber_modal_confirm_btn">[ CONFIRM ]</button>
+        `;
+        document.getElementById('cyber_modal_confirm_btn').onclick = () => {
+            closeCyberModal();
+            onConfirm();
+        };
+    } else {
+        actionsEl.innerHTML = `
+            <button class="btn-cli-primary" onclick="closeCyberModal()">[ ACKNOWLEDGE ]</button>
+        `;
+    }
+
+    overlay.style.display = 'flex';
+}
+
+function closeCyberModal() {
+    const overlay = document.getElementById('cyber_modal_overlay');
+    if (overlay) overlay.style.display = 'none';
+}
+
+function closeCyberModalOnOverlay(e) {
+    if (e && e.target.id === 'cyber_modal_overlay') {
+        closeCyberModal();
+    }
+}
+
+// Override native window.alert with Cyberpunk Modal
+window.alert = function(msg) {
+    showCyberModal('$ alert --system-notification', msg, 'warning');
+};
+
+async function triggerAutoUpdate() {
+    const btn = document.getElementById('btn_do_auto_update');
+    if (btn) {
+        btn.disabled = true;
+        btn.textContent = '[ ⏳ DOWNLOADING & UPDATING... ]';
+    }
+    showCyberModal('$ update --initiate', '⚙️ 正在拉取 GitHub main 分支最新发布包，解压后容器将自动平滑重启 (1.5s)...', 'info');
+    try {
+        const res = await fetch('/api/version/update', { method: 'POST' });
+        const data = await res.json();
+        if (res.ok && data.status === 'success') {
+            showCyberModal('🚀 自动更新成功 (UPDATE SUCCESSFUL)', `✅ ${data.message}\n\n系统代码已更新，后台服务正在平滑重启 (1.5s)，页面 3 秒后自动加载新版...`, 'success');
+            setTimeout(() => window.location.reload(), 3200);
+        } else if (data.status === 'waiting') {
+            showCyberModal('⏳ 镜像构建中 (DOCKER BUILD IN PROGRESS)', `GitHub Actions 正在编译新镜像:\n${data.message || '请稍候...'}\n\n提示: 待 GitHub Actions 编译完成后即可一键点选解锁。`, 'warn');
+            if (btn) {
+                btn.disabled = true;
+                btn.textContent = '[ ⏳ GH ACTIONS DOCKER BUILD IN PROGRESS... ]';
+            }
+        } else {
+            showCyberModal('⚠️ 自动更新提示 (UPDATE RESPONSE)', `状态: ${data.status || 'warning'}\n消息: ${data.message}\n\n执行排查日志:\n${data.logs || '无详细日志'}`, 'warn');
+            if (btn) {
+                btn.disabled = false;
+                btn.textContent = '[ 🚀 RETRY AUTO UPDATE ]';
+            }
+        }
+    } catch(e) {
+        showCyberModal('❌ 更新请求异常 (NETWORK ERROR)', `无法连接到更新接口: ${e.message}`, 'error');
+        if (btn) {
+            btn.disabled = false;
+            btn.textContent = '[ 🚀 RETRY AUTO UPDATE ]';
+        }
+    }
+}
+
+/* ── 🎨 CYBER THEME SWITCHER ── */
+const CYBER_THEMES = {
+    green: { primary: '#78E08F', rgb: '120, 224, 143', name: 'Matrix Green' },
+    cyan: { primary: '#8BE9FD', rgb: '139, 233, 253', name: 'Neon Cyan' },
+    magenta: { primary: '#FF79C6', rgb: '255, 121, 198', name: 'Synthwave Magenta' },
+    amber: { primary: '#FFB86C', rgb: '255, 184, 108', name: 'Solarized Amber' }
+};
+
+function setCyberTheme(themeName) {
+    const t = CYBER_THEMES[themeName] || CYBER_THEMES.green;
+    const root = document.documentElement;
+
+    root.style.setProperty('--status-success', t.primary);
+    root.style.setProperty('--border-active', t.primary);
+
+    document.querySelectorAll('.theme-btn').forEach(b => b.classList.remove('active'));
+    const btn = document.getElementById(`theme_btn_${themeName}`);
+    if (btn) btn.classList.add('active');
+
+    localStorage.setItem('netwatch_cyber_theme', themeName);
+    showToast(`🎨 Theme switched to ${t.name}`);
+    playCyberSound('click');
+}
+
+function initSavedTheme() {
+    const savedTheme = localStorage.getItem('netwatch_cyber_theme') || 'green';
+    setCyberTheme(savedTheme);
+}
+
+/* ── 🔊 WEB AUDIO SYNTHESIZER SOUND FX ── */
+let audioCtx = null;
+let soundEnabled = localStorage.getItem('netwatch_sound_enabled') !== 'false';
+
+function toggleCyberSound() {
+    soundEnabled = !soundEnabled;
+    localStorage.setItem('netwatch_sound_enabled', soundEnabled);
+    const btn = document.getElementById('sound_toggle_btn');
+    if (btn) {
+        btn.textContent = soundEnabled ? '[ 🔊 SOUND: ON ]' : '[ 🔇 SOUND: OFF ]';
+    }
+    showToast(soundEnabled ? '🔊 Cyber audio feedback enabled' : '🔇 Audio feedback muted');
+    if (soundEnabled) playCyberSound('click');
+}
+
+function initSoundBtn() {
+    const btn = document.getElementById('sound_toggle_btn');
+    if (btn) {
+        btn.textContent = soundEnabled ? '[ 🔊 SOUND: ON ]' : '[ 🔇 SOUND: OFF ]';
+    }
+}
+
+function playCyberSound(type = 'click') {
+    if (!soundEnabled) return;
+    try {
+        if (!audioCtx) {
+            audioCtx = new (window.AudioContext || window.webkitAudioContext)();
+        }
+        if (audioCtx.state === 'suspended') {
+            audioCtx.resume();
+        }
+
+        const now = audioCtx.currentTime;
+        const osc = audioCtx.createOscillator();
+        const gain = audioCtx.createGain();
+
+        osc.connect(gain);
+        gain.connect(audioCtx.destination);
+
+        if (type === 'click') {
+            osc.type = 'sine';
+            osc.frequency.setValueAtTime(800, now);
+            osc.frequency.exponentialRampToValueAtTime(400, now + 0.04);
+            gain.gain.setValueAtTime(0.12, now);
+            gain.gain.exponentialRampToValueAtTime(0.001, now + 0.04);
+            osc.start(now);
+            osc.stop(now + 0.04);
+        } else if (type === 'success') {
+            osc.type = 'triangle';
+            osc.frequency.setValueAtTime(520, now);
+            osc.frequency.setValueAtTime(780, now + 0.06);
+            gain.gain.setValueAtTime(0.15, now);
+            gain.gain.exponentialRampToValueAtTime(0.001, now + 0.12);
+            osc.start(now);
+            osc.stop(now + 0.12);
+        } else if (type === 'alert') {
+            osc.type = 'square';
+            osc.frequency.setValueAtTime(320, now);
+            osc.frequency.setValueAtTime(220, now + 0.08);
+            gain.gain.setValueAtTime(0.12, now);
+            gain.gain.exponentialRampToValueAtTime(0.001, now + 0.16);
+            osc.start(now);
+            osc.stop(now + 0.16);
+        }
+    } catch(e) {}
+}
+
+/* ── 💻 QUICK COMMAND EXECUTION ── */
+function execQuickCmd(action) {
+    playCyberSound('click');
+    if (action === 'ping_all') {
+        showToast('⚡ Executing $ ping --all ...');
+        fetchSummary(); fetchPings(); fetchStats();
+    } else if (action === 'diagnose') {
+        switchNavTab('diagnostics');
+        showToast('🔍 Navigated to Diagnostics pipeline');
+        startFullDiagnostics();
+    } else if (action === 'export_report') {
+        exportReportFmt('markdown');
+    } else if (action === 'check_update') {
+        manualCheckVersion();
+    }
+}
+
+// Realtime: one SSE connection pushes summary / pings / stats; polling only runs while it is down
+let realtimeSource = null;
+let realtimeLive = false;
+let realtimeRetry = null;
+
+function startRealtime() {
+    if (!window.EventSource) return false;
+    if (realtimeSource) realtimeSource.close();
+    clearTimeout(realtimeRetry);
+    const query = pingQuery();
+    const es = new EventSource('/api/realtime' + query);
+    es.addEventListener('client', e => applyClientInfo(JSON.parse(e.data)));
+    es.addEventListener('summary', e => applySummary(JSON.parse(e.data)));
+    es.addEventListener('pings', e => applyPings(JSON.parse(e.data), query));
+    es.addEventListener('stats', e => applyStats(JSON.parse(e.data)));
+    es.onopen = () => { realtimeLive = true; };
+    es.onerror = () => {
+        realtimeLive = false;
+        // The browser retries dropped streams itself; a refused one (e.g. 503) stays closed
+        if (es.readyState === EventSource.CLOSED) realtimeRetry = setTimeout(startRealtime, 30000);
+    };
+    realtimeSource = es;
+    return true;
+}
+
+function refreshPingView() {
+    if (!startRealtime()) fetchPings();
+}
+
+function pollUnlessLive(fn) {
+    return () => { if (!realtimeLive) fn(); };
+}
+
+// Init loops
+initSavedTheme();
+initSoundBtn();
+if (!startRealtime()) {
+    fetchSummary();
+    fetchPings();
+    fetchStats();
+}
+renderUptimeHeatmap();
+checkVersionStatus();
+
+// Restore active tab
+const initialTab = window.location.hash.replace('#','') || localStorage.getItem('console_active_tab') || 'overview';
+switchNavTab(initialTab);
+
+setInterval(pollUnlessLive(fetchSummary), 10000);
+setInterval(pollUnlessLive(fetchPings), 15000);
+setInterval(pollUnlessLive(fetchStats), 5000);
+setInterval(checkVersionStatus, 300000);
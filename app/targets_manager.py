@@ -1,19 +1,255 @@
-import json
+"""
+Monitoring target policies (``targets.json``).
+
+``TargetRegistry`` keeps the parsed list in memory, so reads never touch the
+disk. A background watcher re-stats the file and reloads it only when its
+inode/mtime/size changed (another worker or a manual edit). Writes are a
+read-modify-write under an exclusive ``fcntl`` lock on a sidecar lock file and
+land via temp file + ``fsync`` + ``os.replace``, so concurrent gunicorn workers
+cannot interleave or leave a torn file. ``version`` increases on every change
+this process observes, letting the sampler re-sync only when needed.
+
+``normalize_target`` validates incoming policies and ``upsert_targets`` merges
+a batch of them in one locked write (see ``/api/targets/bulk``).
+"""
+
+import copy
 import logging
-from app.config import MONITOR_TARGETS_FILE, DEFAULT_TARGETS
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app import fast_json
+from app.config import MONITOR_TARGETS_FILE, DEFAULT_TARGETS, PING_TARGETS
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
 
 logger = logging.getLogger(__name__)
 
-def load_targets():
-    if MONITOR_TARGETS_FILE.exists():
+Targets = List[Dict[str, Any]]
+
+TARGET_TYPES = ("tcp", "dns", "http", "tls", "icmp")
+TARGET_FIELDS = ("id", "name", "target", "type", "freq", "threshold_warn", "threshold_crit", "enabled", "burst")
+# TSDB series written by the sampler itself; a target with one of these ids would share its history
+RESERVED_IDS = frozenset({"global", *PING_TARGETS})
+
+
+def new_target_id(taken) -> str:
+    while True:
+        target_id = f"t{uuid.uuid4().hex[:12]}"
+        if target_id not in taken:
+            return target_id
+
+
+def _number(value, field: str, lo: float, hi: float, integer: bool = False):
+    if value in (None, ""):
+        return None
+    try:
+        number = int(value) if integer else float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a number")
+    if not lo <= number <= hi:
+        raise ValueError(f"{field} must be between {lo:g} and {hi:g}")
+    return number
+
+
+def normalize_target(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate one target policy (from JSON or CSV strings) into its stored shape.
+
+    Raises ``ValueError`` describing the first invalid field.
+    """
+    if not isinstance(raw, dict):
+        raise ValueError("target must be an object")
+    target = str(raw.get("target") or "").strip()
+    if not target:
+        raise ValueError("target is required")
+    kind = str(raw.get("type") or "tcp").strip().lower()
+    if kind not in TARGET_TYPES:
+        raise ValueError(f"type must be one of {', '.join(TARGET_TYPES)}")
+    enabled = raw.get("enabled", True)
+    if isinstance(enabled, str):
+        enabled = enabled.strip().lower() not in ("0", "false", "no", "off", "")
+    out = {
+        "name": str(raw.get("name") or target).strip(),
+        "target": target,
+        "type": kind,
+        "freq": _number(raw.get("freq"), "freq", 1, 86400) or 30,
+        "enabled": bool(enabled),
+    }
+    for field in ("threshold_warn", "threshold_crit"):
+        value = _number(raw.get(field), field, 0, 600000)
+        if value is not None:
+            out[field] = value
+    burst = _number(raw.get("burst"), "burst", 1, 50, integer=True)
+    if burst is not None:
+        out["burst"] = burst
+    if raw.get("id") not in (None, ""):
+        out["id"] = str(raw["id"]).strip()
+        if out["id"] in RESERVED_IDS:
+            raise ValueError(f"id {out['id']!r} is reserved for a built-in series")
+    return out
+
+
+def upsert_targets(targets: Targets, incoming: Targets, replace: bool = False) -> Tuple[Targets, int, int]:
+    """Merge normalized ``incoming`` into ``targets``; returns ``(targets, created, updated)``.
+
+    Entries match an existing target by ``id``, or else by ``(target, type)``,
+    so re-importing the same list is idempotent. ``replace`` drops every
+    existing target that is not in ``incoming``.
+    """
+    merged = [] if replace else list(targets)
+    pos_id = {t.get("id"): i for i, t in enumerate(merged)}
+    pos_addr = {(t.get("target"), t.get("type", "tcp")): i for i, t in enumerate(merged)}
+    old_id = {t.get("id"): t for t in targets}
+    old_addr = {(t.get("target"), t.get("type", "tcp")): t for t in targets}
+    taken = set(old_id) | {t["id"] for t in incoming if "id" in t}
+    created = updated = 0
+    for item in incoming:
+        addr = (item["target"], item["type"])
+        pos = pos_id.get(item["id"]) if "id" in item else pos_addr.get(addr)
+        if pos is not None:
+            merged[pos] = {**merged[pos], **item}
+            updated += 1
+            continue
+        previous = old_id.get(item["id"]) if "id" in item else old_addr.get(addr)
+        if previous is not None:
+            item = {**previous, **item}
+            updated += 1
+        else:
+            item = {**item, "id": item.get("id") or new_target_id(taken)}
+            taken.add(item["id"])
+            created += 1
+        pos_id[item["id"]] = pos_addr[addr] = len(merged)
+        merged.append(item)
+    return merged, created, updated
+
+
+class TargetRegistry:
+    def __init__(self, path: Path, defaults: Targets):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self.defaults = defaults
+        self.version = 0
+        self._targets: Targets = copy.deepcopy(defaults)
+        self._stamp = None
+        self._lock = threading.RLock()
+        self._watcher: Optional[threading.Thread] = None
+        self.reload(force=True)
+
+    def _stat(self):
         try:
-            return json.loads(MONITOR_TARGETS_FILE.read_text(encoding="utf-8"))
-        except Exception:
-            pass
-    return DEFAULT_TARGETS
+            st = self.path.stat()
+            return (st.st_ino, st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            return None
+
+    def _read(self) -> Targets:
+        if not self.path.exists():
+            return copy.deepcopy(self.defaults)
+        data = fast_json.loads(self.path.read_bytes())
+        if not isinstance(data, list):
+            raise ValueError("targets.json must hold a list")
+        return data
+
+    def reload(self, force: bool = False) -> bool:
+        """Re-read the file if it changed on disk; returns whether the targets changed."""
+        with self._lock:
+            stamp = self._stat()
+            if stamp == self._stamp and not force:
+                return False
+            try:
+                targets = self._read()
+            except Exception as e:
+                # Keep serving the last good copy; retry once the file changes again
+                logger.warning("Failed to load %s: %s", self.path.name, e)
+                self._stamp = stamp
+                return False
+            self._stamp = stamp
+            if targets == self._targets and not force:
+                return False
+            self._targets = targets
+            self.version += 1
+            return True
+
+    def all(self) -> Targets:
+        with self._lock:
+            return copy.deepcopy(self._targets)
+
+    def get(self, target_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for t in self._targets:
+                if t.get("id") == target_id:
+                    return copy.deepcopy(t)
+        return None
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as fh:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+    def _write(self, targets: Targets):
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as fh:
+            fh.write(fast_json.dumpb(targets, pretty=True))
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, self.path)
+
+    def update(self, mutate: Callable[[Targets], Targets]) -> Targets:
+        """Atomically apply ``mutate`` to the current on-disk list and persist the result.
+
+        The file is re-read under the lock first, so a change another worker
+        just wrote is never overwritten with a stale copy.
+        """
+        with self._lock, self._file_lock():
+            self.reload()
+            targets = mutate(copy.deepcopy(self._targets))
+            self._write(targets)
+            self._targets = targets
+            self._stamp = self._stat()
+            self.version += 1
+            return copy.deepcopy(targets)
+
+    def start_watcher(self, interval: float = 1.0):
+        """Poll the file's stat in the background so readers never hit the disk."""
+        if self._watcher is not None:
+            return
+
+        def _watch():
+            while True:
+                time.sleep(interval)
+                try:
+                    if self.reload():
+                        logger.info("Reloaded %s (version %d)", self.path.name, self.version)
+                except Exception as e:
+                    logger.warning("Target registry watcher error: %s", e)
+
+        self._watcher = threading.Thread(target=_watch, daemon=True, name="Targets-Watcher")
+        self._watcher.start()
+
+
+registry = TargetRegistry(MONITOR_TARGETS_FILE, DEFAULT_TARGETS)
+
+
+def load_targets():
+    return registry.all()
 
 def save_targets(targets):
     try:
-        MONITOR_TARGETS_FILE.write_text(json.dumps(targets, ensure_ascii=False, indent=2), encoding="utf-8")
+        registry.update(lambda _: targets)
     except Exception as e:
         logger.warning("Failed to save targets.json: %s", e)
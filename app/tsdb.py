@@ -1,96 +1,866 @@
-import json
+import os
+import math
+import struct
 import logging
 import threading
+import time
+from array import array
+from collections import deque
 from datetime import datetime
+from pathlib import Path
 from typing import Dict, List, Any, Optional
-from app.config import TSDB_DATA_FILE
+from urllib.parse import quote, unquote
+from app import fast_json
+from app.bus import bus, TOPIC_SAMPLES
+from app.config import TSDB_DATA_FILE, TSDB_SEGMENT_DIR, TSDB_RAW_POINTS, TSDB_ROLLUP_TIERS
+from app.segment_log import SegmentLog
+from app.sketch import LatencySketch
 
 logger = logging.getLogger(__name__)
 
+RECORD_SAMPLE = 1
+RECORD_ROLLUP = 2
+RECORD_BURST = 3
+_SAMPLE = struct.Struct("<Bd?d")
+_ROLLUP = struct.Struct("<BdIIdfffff")
+# kind, timestamp, sent, received, min, avg, max, intra-burst jitter (+ optional JSON meta)
+_BURST = struct.Struct("<BdHHffff")
+
+# A segment is compacted back down to the ring contents once it holds this many
+# times the ring capacity, which keeps appends amortised O(1).
+COMPACT_FACTOR = 2
+
+def encode_sample(timestamp: float, value: Optional[float], metadata: Optional[Dict[str, Any]]) -> bytes:
+    head = _SAMPLE.pack(RECORD_SAMPLE, timestamp, value is not None, value or 0.0)
+    if not metadata:
+        return head
+    return head + fast_json.dumpb(metadata)
+
+def decode_sample(payload: bytes):
+    kind, ts, has_value, value = _SAMPLE.unpack_from(payload)
+    if kind != RECORD_SAMPLE:
+        return None
+    meta = fast_json.loads(payload[_SAMPLE.size:]) if len(payload) > _SAMPLE.size else None
+    return ts, (value if has_value else None), meta
+
+def encode_burst(timestamp: float, value: Optional[float], burst: tuple, metadata: Optional[Dict[str, Any]]) -> bytes:
+    sent, received, mn, mx, jitter = burst
+    nan = math.nan
+    head = _BURST.pack(RECORD_BURST, timestamp, sent, received,
+                       mn if received else nan, value if received else nan, mx if received else nan, jitter)
+    if not metadata:
+        return head
+    return head + fast_json.dumpb(metadata)
+
+def decode_record(payload: bytes):
+    """Decode a raw-series record into ``(timestamp, value, meta, burst)``; ``burst`` is ``None`` for plain samples."""
+    if payload[0] == RECORD_BURST:
+        _, ts, sent, received, mn, avg, mx, jitter = _BURST.unpack_from(payload)
+        meta = fast_json.loads(payload[_BURST.size:]) if len(payload) > _BURST.size else None
+        return ts, (avg if received else None), meta, (sent, received, mn, mx, jitter)
+    sample = decode_sample(payload)
+    return None if sample is None else (*sample, None)
+
+def summarize_burst(rtts: List[Optional[float]]) -> Dict[str, Any]:
+    """Per-tick figures for one burst of probes (``None`` = lost), in send order."""
+    ok = [r for r in rtts if r is not None]
+    diffs = [abs(b - a) for a, b in zip(ok, ok[1:])]
+    return {
+        "sent": len(rtts),
+        "received": len(ok),
+        "min": min(ok) if ok else None,
+        "avg": sum(ok) / len(ok) if ok else None,
+        "max": max(ok) if ok else None,
+        "jitter": sum(diffs) / len(diffs) if diffs else 0.0,
+        "loss": round((len(rtts) - len(ok)) / len(rtts) * 100, 1) if rtts else 0.0,
+    }
+
+def burst_tuple(summary: Dict[str, Any]) -> tuple:
+    return (summary["sent"], summary["received"], summary["min"], summary["max"], summary["jitter"])
+
+def encode_rollup(bucket: tuple) -> bytes:
+    return _ROLLUP.pack(RECORD_ROLLUP, *bucket)
+
+def decode_rollup(payload: bytes):
+    record = _ROLLUP.unpack_from(payload)
+    return record[1:] if record[0] == RECORD_ROLLUP else None
+
+RANGE_AGGREGATES = ("avg", "min", "max", "p50", "p95", "p99", "loss", "samples")
+
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+def parse_duration(text: str) -> Optional[int]:
+    """Parse ``"90"``, ``"15m"``, ``"6h"`` or ``"30d"`` into seconds."""
+    text = str(text or "").strip().lower()
+    try:
+        if text and text[-1] in _DURATION_UNITS:
+            return int(float(text[:-1]) * _DURATION_UNITS[text[-1]])
+        return int(float(text))
+    except (ValueError, OverflowError):
+        return None
+
+def search_sorted(column, head: int, size: int, capacity: int, value: float, right: bool = False) -> int:
+    """Binary search a non-decreasing ring column; returns a logical index like ``bisect``."""
+    lo, hi = 0, size
+    while lo < hi:
+        mid = (lo + hi) // 2
+        probe = column[(head + mid) % capacity]
+        if probe < value or (right and probe == value):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+def _bucket_label(timestamp: float, step: int) -> str:
+    fmt = "%H:%M" if step < 3600 else ("%m-%d %H:%M" if step < 86400 else "%m-%d")
+    return datetime.fromtimestamp(timestamp).strftime(fmt)
+
+class SeriesRing:
+    """Fixed-capacity columnar ring buffer holding the samples of a single series.
+
+    Timestamps and latencies live in ``array('d')`` columns with a ``bytearray``
+    validity mask, so appends are O(1) and evict the oldest slot in place instead
+    of shifting a Python list. Point dicts are only materialised at the API edge.
+
+    The ring also maintains window statistics incrementally as points are
+    appended and evicted: running sum, monotonic deques for exact min/max, the
+    summed gap to the next valid value for jitter and a ``LatencySketch`` for
+    percentiles, so ``stats()`` costs the same regardless of window size.
+
+    A point may be a burst (several paced probes in one tick): its latency is
+    the burst average and the burst's probe counts, extrema and intra-burst
+    jitter sit in side columns. Window loss is counted per probe, so a plain
+    sample counts as one probe.
+    """
+    __slots__ = ("capacity", "timestamps", "latencies", "valid", "meta", "head", "size",
+                 "seq", "valid_count", "value_sum", "jitter_sum", "gaps", "last_valid_seq",
+                 "min_window", "max_window", "sketch", "sent", "received", "burst_min", "burst_max",
+                 "burst_jitter", "probes_sent", "probes_lost", "burst_count", "burst_jitter_sum")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamps = array("d", bytes(8 * capacity))
+        self.latencies = array("d", bytes(8 * capacity))
+        self.valid = bytearray(capacity)
+        self.meta: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self.head = 0
+        self.size = 0
+        self.seq = 0
+        self.valid_count = 0
+        self.value_sum = 0.0
+        self.jitter_sum = 0.0
+        self.gaps = array("d", [math.nan]) * capacity
+        self.last_valid_seq = -1
+        self.min_window: deque = deque()
+        self.max_window: deque = deque()
+        self.sketch = LatencySketch()
+        self.sent = array("H", bytes(2 * capacity))
+        self.received = array("H", bytes(2 * capacity))
+        self.burst_min = array("f", bytes(4 * capacity))
+        self.burst_max = array("f", bytes(4 * capacity))
+        self.burst_jitter = array("f", bytes(4 * capacity))
+        self.probes_sent = 0
+        self.probes_lost = 0
+        self.burst_count = 0
+        self.burst_jitter_sum = 0.0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def slot(self, i: int) -> int:
+        """Map logical index ``i`` (0 = oldest) to its physical slot."""
+        return (self.head + i) % self.capacity
+
+    def _expire(self, idx: int):
+        """Remove the oldest point (physical slot ``idx``) from the window statistics."""
+        oldest_seq = self.seq - self.size
+        if self.min_window and self.min_window[0][0] == oldest_seq:
+            self.min_window.popleft()
+        if self.max_window and self.max_window[0][0] == oldest_seq:
+            self.max_window.popleft()
+        sent, received = self._probes(idx)
+        self.probes_sent -= sent
+        self.probes_lost -= sent - received
+        if self.sent[idx]:
+            self.burst_count -= 1
+            self.burst_jitter_sum -= self.burst_jitter[idx]
+        if not self.valid[idx]:
+            return
+        value = self.latencies[idx]
+        self.valid_count -= 1
+        self.value_sum -= value
+        self.sketch.remove(value)
+        if not math.isnan(self.gaps[idx]):
+            self.jitter_sum -= self.gaps[idx]
+
+    def _probes(self, idx: int) -> tuple:
+        """``(sent, received)`` probe counts of the point in slot ``idx``."""
+        if self.sent[idx]:
+            return self.sent[idx], self.received[idx]
+        return 1, self.valid[idx]
+
+    def append(self, timestamp: float, value: Optional[float], metadata: Optional[Dict[str, Any]] = None,
+               burst: Optional[tuple] = None):
+        if self.size < self.capacity:
+            idx = (self.head + self.size) % self.capacity
+            self.size += 1
+        else:
+            idx = self.head
+            self._expire(idx)
+            self.head = (self.head + 1) % self.capacity
+        seq = self.seq
+        self.seq += 1
+        self.timestamps[idx] = timestamp
+        self.meta[idx] = metadata or None
+        self.gaps[idx] = math.nan
+        if burst is not None:
+            sent, received, mn, mx, jitter = burst
+            self.sent[idx], self.received[idx] = sent, received
+            self.burst_min[idx] = mn if received else math.nan
+            self.burst_max[idx] = mx if received else math.nan
+            self.burst_jitter[idx] = jitter
+            self.burst_count += 1
+            self.burst_jitter_sum += jitter
+            self.probes_sent += sent
+            self.probes_lost += sent - received
+        else:
+            self.sent[idx] = self.received[idx] = 0
+            self.probes_sent += 1
+            self.probes_lost += value is None
+        if value is None:
+            self.latencies[idx] = 0.0
+            self.valid[idx] = 0
+            return
+
+        self.latencies[idx] = value
+        self.valid[idx] = 1
+        if self.valid_count and self.last_valid_seq >= self.seq - self.size:
+            prev = (idx - (seq - self.last_valid_seq)) % self.capacity
+            gap = abs(value - self.latencies[prev])
+            self.gaps[prev] = gap
+            self.jitter_sum += gap
+        self.valid_count += 1
+        self.value_sum += value
+        self.last_valid_seq = seq
+        self.sketch.add(value)
+        while self.min_window and self.min_window[-1][1] >= value:
+            self.min_window.pop()
+        self.min_window.append((seq, value))
+        while self.max_window and self.max_window[-1][1] <= value:
+            self.max_window.pop()
+        self.max_window.append((seq, value))
+        if self.seq % self.capacity == 0:
+            self._resync_sums()
+
+    def _resync_sums(self):
+        """Recompute the running float sums exactly to shed accumulated rounding drift (amortised O(1))."""
+        values = [self.latencies[self.slot(i)] for i in range(self.size) if self.valid[self.slot(i)]]
+        gaps = [self.gaps[self.slot(i)] for i in range(self.size)]
+        self.value_sum = math.fsum(values)
+        self.jitter_sum = math.fsum(g for g in gaps if not math.isnan(g))
+        self.burst_jitter_sum = math.fsum(self.burst_jitter[self.slot(i)] for i in range(self.size) if self.sent[self.slot(i)])
+
+    def stats(self) -> Dict[str, Any]:
+        """Window summary over every point currently held by the ring."""
+        total = self.size
+        n = self.valid_count
+        if not n:
+            return {
+                "cur": None, "avg": None, "min": None, "max": None,
+                "p50": None, "p95": None, "p99": None, "jitter": 0.0, "burst_jitter": None,
+                "loss": self._loss(), "samples_count": 0, "total_samples": total
+            }
+        cur = self.latencies[(self.head + self.last_valid_seq - (self.seq - self.size)) % self.capacity]
+        mn = self.min_window[0][1]
+        mx = self.max_window[0][1]
+        p50, p95, p99 = (min(max(q, mn), mx) for q in self.sketch.quantiles((0.50, 0.95, 0.99)))
+        jitter = self.jitter_sum / (n - 1) if n > 1 else 0.0
+        return {
+            "cur": round(cur, 1), "avg": round(self.value_sum / n, 1), "min": round(mn, 1),
+            "max": round(mx, 1), "p50": round(p50, 1), "p95": round(p95, 1),
+            "p99": round(p99, 1), "jitter": round(jitter, 1),
+            "burst_jitter": round(self.burst_jitter_sum / self.burst_count, 1) if self.burst_count else None,
+            "loss": self._loss(), "samples_count": n, "total_samples": total
+        }
+
+    def _loss(self) -> float:
+        return round(self.probes_lost / self.probes_sent * 100, 1) if self.probes_sent else 0.0
+
+    def value_at(self, idx: int) -> Optional[float]:
+        return self.latencies[idx] if self.valid[idx] else None
+
+    def burst_at(self, idx: int) -> Optional[tuple]:
+        if not self.sent[idx]:
+            return None
+        received = self.received[idx]
+        return (self.sent[idx], received, self.burst_min[idx] if received else None,
+                self.burst_max[idx] if received else None, self.burst_jitter[idx])
+
+    def point_at(self, idx: int) -> Dict[str, Any]:
+        ts = self.timestamps[idx]
+        point = {
+            "time": datetime.fromtimestamp(ts).strftime("%H:%M:%S"),
+            "timestamp": ts,
+            "latency": self.value_at(idx),
+            "meta": self.meta[idx] or {}
+        }
+        burst = self.burst_at(idx)
+        if burst is not None:
+            sent, received, mn, mx, jitter = burst
+            point["burst"] = {
+                "sent": sent, "received": received,
+                "min": round(mn, 1) if received else None, "max": round(mx, 1) if received else None,
+                "jitter": round(jitter, 1), "loss": round((sent - received) / sent * 100, 1),
+            }
+        return point
+
+    def tail(self, limit: int) -> List[Dict[str, Any]]:
+        """Materialise the newest ``limit`` points, oldest first, in O(limit)."""
+        count = min(max(limit, 0), self.size)
+        return [self.point_at(self.slot(i)) for i in range(self.size - count, self.size)]
+
+    @property
+    def last_timestamp(self) -> Optional[float]:
+        return self.timestamps[self.slot(self.size - 1)] if self.size else None
+
+    def search(self, timestamp: float, right: bool = False) -> int:
+        return search_sorted(self.timestamps, self.head, self.size, self.capacity, timestamp, right)
+
+    def points(self, lo: int, hi: int) -> List[Dict[str, Any]]:
+        return [self.point_at(self.slot(i)) for i in range(lo, hi)]
+
+    def aggregate(self, lo: int, hi: int, step: int) -> List[tuple]:
+        """Fold logical points ``[lo, hi)`` into ``step``-second rollup tuples."""
+        tier = RollupTier("adhoc", step, max(1, hi - lo))
+        for i in range(lo, hi):
+            idx = self.slot(i)
+            tier.add(self.timestamps[idx], self.value_at(idx), self.burst_at(idx))
+        return tier.tail(tier.size + 1)
+
+    def encode_all(self) -> List[bytes]:
+        out = []
+        for i in range(self.size):
+            idx = self.slot(i)
+            burst = self.burst_at(idx)
+            if burst is None:
+                out.append(encode_sample(self.timestamps[idx], self.value_at(idx), self.meta[idx]))
+            else:
+                out.append(encode_burst(self.timestamps[idx], self.value_at(idx), burst, self.meta[idx]))
+        return out
+
+
+class RollupTier:
+    """Downsampled buckets for one series at one resolution.
+
+    Samples are folded into the currently open bucket as they arrive
+    (count/valid/sum/min/max plus a ``LatencySketch`` for percentiles). When a
+    sample lands in a later bucket the open one is closed into fixed-capacity
+    columns and returned encoded so the caller can persist it.
+
+    Counts are per probe: a burst adds ``sent`` to the bucket count and its
+    average weighted by ``received`` to the sum, and its own extrema to
+    min/max, so bucket loss and averages stay per-probe figures.
+    """
+    __slots__ = ("name", "step", "capacity", "starts", "counts", "valids", "sums", "mins", "maxs",
+                 "p50s", "p95s", "p99s", "head", "size", "last_closed",
+                 "open_start", "open_count", "open_valid", "open_sum", "open_min", "open_max", "open_sketch")
+
+    def __init__(self, name: str, step: int, capacity: int):
+        self.name = name
+        self.step = step
+        self.capacity = capacity
+        self.starts = array("d")
+        self.counts = array("I")
+        self.valids = array("I")
+        self.sums = array("d")
+        self.mins = array("f")
+        self.maxs = array("f")
+        self.p50s = array("f")
+        self.p95s = array("f")
+        self.p99s = array("f")
+        self.head = 0
+        self.size = 0
+        self.last_closed = -math.inf
+        self.open_start: Optional[float] = None
+
+    def _open(self, start: float):
+        self.open_start = start
+        self.open_count = 0
+        self.open_valid = 0
+        self.open_sum = 0.0
+        self.open_min = math.inf
+        self.open_max = -math.inf
+        self.open_sketch = LatencySketch()
+
+    def _push(self, bucket: tuple):
+        columns = (self.starts, self.counts, self.valids, self.sums, self.mins, self.maxs, self.p50s, self.p95s, self.p99s)
+        if self.size < self.capacity:
+            for column, value in zip(columns, bucket):
+                column.append(value)
+            self.size += 1
+        else:
+            for column, value in zip(columns, bucket):
+                column[self.head] = value
+            self.head = (self.head + 1) % self.capacity
+        self.last_closed = bucket[0]
+
+    def load_closed(self, bucket: tuple):
+        """Adopt a bucket closed elsewhere (segment replay or the writer process)."""
+        if bucket[0] > self.last_closed:
+            self._push(bucket)
+            if self.open_start is not None and self.open_start <= bucket[0]:
+                self.open_start = None
+
+    def add(self, timestamp: float, value: Optional[float], burst: Optional[tuple] = None) -> Optional[bytes]:
+        start = timestamp - timestamp % self.step
+        if start <= self.last_closed:
+            return None
+        closed = None
+        if self.open_start is None:
+            self._open(start)
+        elif start < self.open_start:
+            return None
+        elif start > self.open_start:
+            closed = self._close()
+            self._open(start)
+        if burst is not None:
+            sent, received, mn, mx, _ = burst
+            self.open_count += sent
+            if value is not None and received:
+                self.open_valid += received
+                self.open_sum += value * received
+                self.open_min = min(self.open_min, mn)
+                self.open_max = max(self.open_max, mx)
+                self.open_sketch.add(value, received)
+            return closed
+        self.open_count += 1
+        if value is not None:
+            self.open_valid += 1
+            self.open_sum += value
+            self.open_min = min(self.open_min, value)
+            self.open_max = max(self.open_max, value)
+            self.open_sketch.add(value)
+        return closed
+
+    def _open_bucket(self) -> tuple:
+        if self.open_valid:
+            mn, mx = self.open_min, self.open_max
+            p50, p95, p99 = (min(max(q, mn), mx) for q in self.open_sketch.quantiles((0.50, 0.95, 0.99)))
+            return (self.open_start, self.open_count, self.open_valid, self.open_sum, mn, mx, p50, p95, p99)
+        nan = math.nan
+        return (self.open_start, self.open_count, 0, 0.0, nan, nan, nan, nan, nan)
+
+    def _close(self) -> bytes:
+        bucket = self._open_bucket()
+        self._push(bucket)
+        self.open_start = None
+        return encode_rollup(bucket)
+
+    def bucket_at(self, i: int) -> tuple:
+        idx = (self.head + i) % self.capacity
+        return (self.starts[idx], self.counts[idx], self.valids[idx], self.sums[idx], self.mins[idx],
+                self.maxs[idx], self.p50s[idx], self.p95s[idx], self.p99s[idx])
+
+    def tail(self, limit: int, include_open: bool = True) -> List[tuple]:
+        buckets = [self.bucket_at(i) for i in range(max(0, self.size - limit), self.size)]
+        if include_open and self.open_start is not None:
+            buckets.append(self._open_bucket())
+        return buckets[-limit:] if limit > 0 else []
+
+    def range(self, start: float, end: float) -> List[tuple]:
+        """Buckets whose start lies in ``[start, end]``, including the open bucket."""
+        lo = search_sorted(self.starts, self.head, self.size, self.capacity, start)
+        hi = search_sorted(self.starts, self.head, self.size, self.capacity, end, right=True)
+        buckets = [self.bucket_at(i) for i in range(lo, hi)]
+        if self.open_start is not None and start <= self.open_start <= end:
+            buckets.append(self._open_bucket())
+        return buckets
+
+    def encode_all(self) -> List[bytes]:
+        return [encode_rollup(self.bucket_at(i)) for i in range(self.size)]
+
+
+def merge_buckets(buckets: List[tuple], step: int) -> List[tuple]:
+    """Re-bucket rollup tuples into a coarser ``step``.
+
+    Counts, sums and extrema merge exactly; merged percentiles take the maximum
+    of the source percentiles, which is an upper bound on the true value.
+    """
+    merged: List[list] = []
+    for b in buckets:
+        start = b[0] - b[0] % step
+        if not merged or merged[-1][0] != start:
+            merged.append([start, *b[1:]])
+            continue
+        m = merged[-1]
+        m[1] += b[1]
+        m[2] += b[2]
+        m[3] += b[3]
+        if b[2]:
+            for i, pick in ((4, min), (5, max), (6, max), (7, max), (8, max)):
+                m[i] = b[i] if math.isnan(m[i]) else pick(m[i], b[i])
+    return [tuple(m) for m in merged]
+
+
+def bucket_to_point(bucket: tuple, step: int) -> Dict[str, Any]:
+    start, count, valid, total, mn, mx, p50, p95, p99 = bucket
+    avg = round(total / valid, 1) if valid else None
+    return {
+        "time": _bucket_label(start, step),
+        "timestamp": start,
+        "latency": avg,
+        "avg": avg,
+        "min": round(mn, 1) if valid else None,
+        "max": round(mx, 1) if valid else None,
+        "p50": round(p50, 1) if valid else None,
+        "p95": round(p95, 1) if valid else None,
+        "p99": round(p99, 1) if valid else None,
+        "loss": round((count - valid) / count * 100, 1) if count else 0.0,
+        "samples": count,
+    }
+
+
 class TimeSeriesDB:
-    """High-performance, thread-safe in-memory time-series telemetry engine with bounded retention & disk persistence."""
-    def __init__(self, max_points_per_series: int = 1440):
+    """High-performance, thread-safe in-memory time-series telemetry engine with bounded retention & disk persistence.
+
+    Each series is mirrored to an append-only segment under ``segment_dir``; an
+    insert costs one small sequential append and segments are periodically
+    compacted back to the ring contents. Every series also maintains the
+    downsampling tiers from ``TSDB_ROLLUP_TIERS``, whose closed buckets are
+    persisted to their own segments under ``segment_dir/rollup``.
+
+    Exactly one process per host is the writer. Other processes (extra
+    gunicorn workers) open the database read-only and follow the writer's
+    segments with ``sync_from_disk``, so every worker answers from the same
+    sample stream; ``promote`` turns a follower into the writer.
+
+    Newly applied samples are published on the bus under ``TOPIC_SAMPLES``
+    (keyed by series id), from local inserts and from follower syncs alike.
+    """
+    def __init__(self, max_points_per_series: int = TSDB_RAW_POINTS, segment_dir: Path = TSDB_SEGMENT_DIR,
+                 rollup_tiers: Dict[str, tuple] = TSDB_ROLLUP_TIERS, writable: bool = True):
+        self.writable = writable
         self.max_points = max_points_per_series
-        self._series: Dict[str, List[Dict[str, Any]]] = {}
+        self.segment_dir = Path(segment_dir)
+        self.rollup_dir = self.segment_dir / "rollup"
+        self.rollup_tiers = dict(sorted(rollup_tiers.items(), key=lambda kv: kv[1][0]))
+        self._series: Dict[str, SeriesRing] = {}
+        self._rollups: Dict[str, Dict[str, RollupTier]] = {}
+        self._logs: Dict[str, SegmentLog] = {}
         self._lock = threading.Lock()
         self.load_from_disk()
 
+    def _ring(self, series_id: str) -> SeriesRing:
+        ring = self._series.get(series_id)
+        if ring is None:
+            ring = self._series[series_id] = SeriesRing(self.max_points)
+        return ring
+
+    def _tiers(self, series_id: str) -> Dict[str, RollupTier]:
+        tiers = self._rollups.get(series_id)
+        if tiers is None:
+            tiers = self._rollups[series_id] = {
+                name: RollupTier(name, step, capacity) for name, (step, capacity) in self.rollup_tiers.items()
+            }
+        return tiers
+
+    def _log(self, series_id: str, tier: Optional[str] = None) -> SegmentLog:
+        key = series_id if tier is None else f"{series_id}\0{tier}"
+        log = self._logs.get(key)
+        if log is None:
+            if tier is None:
+                path = self.segment_dir / f"{quote(series_id, safe='')}.seg"
+            else:
+                path = self.rollup_dir / f"{quote(series_id, safe='')}.{tier}.seg"
+            log = self._logs[key] = SegmentLog(path)
+        return log
+
     def load_from_disk(self):
-        """Restore historical telemetry points from persistent disk storage."""
-        if TSDB_DATA_FILE.exists():
-            try:
-                content = TSDB_DATA_FILE.read_text(encoding="utf-8")
-                data = json.loads(content)
-                if isinstance(data, dict):
-                    with self._lock:
-                        self._series = data
-                    logger.info("Loaded TSDB telemetry history (%d series) from %s", len(self._series), TSDB_DATA_FILE)
-            except Exception as e:
-                logger.warning("Failed to load TSDB history from disk: %s", e)
+        """Replay rollup and series segments, migrating the legacy JSON snapshot on first start."""
+        try:
+            self.rollup_dir.mkdir(parents=True, exist_ok=True)
+            if self.writable:
+                for stale in list(self.segment_dir.glob("*.tmp")) + list(self.rollup_dir.glob("*.tmp")):
+                    stale.unlink()
+            segments = sorted(self.segment_dir.glob("*.seg"))
+            rollup_segments = sorted(self.rollup_dir.glob("*.seg"))
+        except Exception as e:
+            logger.warning("Failed to open TSDB segment directory %s: %s", self.segment_dir, e)
+            return
+
+        if not segments and TSDB_DATA_FILE.exists():
+            if self.writable:
+                self._migrate_legacy_snapshot()
+            return
+
+        with self._lock:
+            self._series = {}
+            self._rollups = {}
+            self._logs = {}
+            # Closed buckets first, so replaying raw samples only rebuilds the open ones
+            for path in rollup_segments:
+                series_id, _, tier_name = unquote(path.stem).rpartition(".")
+                tier = self._tiers(series_id).get(tier_name)
+                if tier is None:
+                    continue
+                for payload in self._replay(self._log(series_id, tier_name)):
+                    bucket = decode_rollup(payload)
+                    if bucket is not None:
+                        tier.load_closed(bucket)
+            for path in segments:
+                series_id = unquote(path.stem)
+                for payload in self._replay(self._log(series_id)):
+                    try:
+                        record = decode_record(payload)
+                    except Exception:
+                        record = None
+                    if record is not None:
+                        self._apply(series_id, *record)
+        if segments:
+            logger.info("Replayed TSDB telemetry history (%d series) from %s", len(self._series), self.segment_dir)
+
+    def _replay(self, log: SegmentLog) -> List[bytes]:
+        try:
+            return log.replay(repair=self.writable)
+        except Exception as e:
+            logger.warning("Failed to replay TSDB segment %s: %s", log.path.name, e)
+            return []
+
+    def sync_from_disk(self, repair: bool = False) -> int:
+        """Apply records the writer process appended since the last sync; returns how many were applied.
+
+        A segment swapped by compaction triggers a full replay instead.
+        """
+        try:
+            segments = sorted(self.segment_dir.glob("*.seg"))
+            rollup_segments = sorted(self.rollup_dir.glob("*.seg"))
+        except Exception as e:
+            logger.warning("Failed to list TSDB segments in %s: %s", self.segment_dir, e)
+            return 0
+
+        applied = 0
+        reload_needed = False
+        publish = bus.has_subscribers(TOPIC_SAMPLES)
+        fresh = []
+        with self._lock:
+            for path in rollup_segments:
+                series_id, _, tier_name = unquote(path.stem).rpartition(".")
+                tier = self._tiers(series_id).get(tier_name)
+                if tier is None:
+                    continue
+                payloads = self._log(series_id, tier_name).read_new(repair)
+                if payloads is None:
+                    reload_needed = True
+                    break
+                for payload in payloads:
+                    bucket = decode_rollup(payload)
+                    if bucket is not None:
+                        tier.load_closed(bucket)
+            for path in ([] if reload_needed else segments):
+                series_id = unquote(path.stem)
+                payloads = self._log(series_id).read_new(repair)
+                if payloads is None:
+                    reload_needed = True
+                    break
+                for payload in payloads:
+                    record = decode_record(payload)
+                    if record is not None:
+                        self._apply(series_id, *record)
+                        applied += 1
+                        if publish:
+                            fresh.append((series_id, self._latest_point(series_id)))
+        if reload_needed:
+            self.load_from_disk()
+        else:
+            self._publish(fresh)
+        return applied
+
+    def promote(self):
+        """Become the single writer: catch up with (and repair) the previous writer's segments."""
+        with self._lock:
+            self.writable = True
+        if not any(self.segment_dir.glob("*.seg")) and TSDB_DATA_FILE.exists():
+            self._migrate_legacy_snapshot()
+        else:
+            self.sync_from_disk(repair=True)
+        logger.info("TSDB promoted to writer (pid=%s)", os.getpid())
+
+    def detach(self):
+        """Drop every series and all writer state; for processes that only encode records (probe shards)."""
+        with self._lock:
+            self.writable = False
+            self._series = {}
+            self._rollups = {}
+            self._logs = {}
+
+    def start_follower(self, interval: float = 1.0):
+        """Tail the writer's segments in the background until this process is promoted."""
+        def _follow():
+            while not self.writable:
+                try:
+                    self.sync_from_disk()
+                except Exception as e:
+                    logger.warning("TSDB follower sync error: %s", e)
+                time.sleep(interval)
+
+        threading.Thread(target=_follow, daemon=True, name="TSDB-Follower").start()
+
+    def _migrate_legacy_snapshot(self):
+        try:
+            data = fast_json.loads(TSDB_DATA_FILE.read_bytes())
+            if isinstance(data, dict):
+                with self._lock:
+                    self._series = {}
+                    for series_id, points in data.items():
+                        for p in points[-self.max_points:]:
+                            ts = p.get("timestamp")
+                            if isinstance(ts, (int, float)):
+                                self._apply(series_id, float(ts), p.get("latency"), p.get("meta"))
+                self.save_to_disk()
+                logger.info("Migrated legacy TSDB snapshot (%d series) from %s", len(self._series), TSDB_DATA_FILE)
+            TSDB_DATA_FILE.rename(TSDB_DATA_FILE.with_name(TSDB_DATA_FILE.name + ".migrated"))
+        except Exception as e:
+            logger.warning("Failed to migrate legacy TSDB history: %s", e)
 
     def save_to_disk(self):
-        """Persist current telemetry series buffer to disk file."""
+        """Checkpoint: compact every series segment down to its current ring contents."""
+        with self._lock:
+            for series_id, ring in self._series.items():
+                self._compact(self._log(series_id), ring)
+
+    def _compact(self, log: SegmentLog, source):
+        try:
+            log.rewrite(source.encode_all())
+        except Exception as e:
+            logger.warning("Failed to compact TSDB segment %s: %s", log.path.name, e)
+
+    def _append(self, log: SegmentLog, payload: bytes, source):
         try:
-            with self._lock:
-                snapshot = {k: v[-self.max_points:] for k, v in self._series.items()}
-            TSDB_DATA_FILE.parent.mkdir(parents=True, exist_ok=True)
-            TSDB_DATA_FILE.write_text(json.dumps(snapshot), encoding="utf-8")
+            log.append(payload)
         except Exception as e:
-            logger.warning("Failed to persist TSDB snapshot to disk: %s", e)
+            logger.warning("Failed to append TSDB record to %s: %s", log.path.name, e)
+        if log.records > source.capacity * COMPACT_FACTOR:
+            self._compact(log, source)
+
+    def _apply(self, series_id: str, timestamp: float, value: Optional[float], metadata: Optional[Dict[str, Any]],
+               burst: Optional[tuple] = None):
+        """Fold one sample into the raw ring and every rollup tier (caller holds the lock)."""
+        self._ring(series_id).append(timestamp, value, metadata, burst)
+        for tier in self._tiers(series_id).values():
+            closed = tier.add(timestamp, value, burst)
+            if closed is not None and self.writable:
+                self._append(self._log(series_id, tier.name), closed, tier)
+
+    def _latest_point(self, series_id: str) -> Dict[str, Any]:
+        ring = self._series[series_id]
+        return ring.point_at(ring.slot(ring.size - 1))
+
+    def _publish(self, fresh: List[tuple]):
+        for series_id, point in fresh:
+            bus.publish(TOPIC_SAMPLES, point, key=series_id)
 
-    def insert(self, series_id: str, timestamp: float, value: Optional[float], metadata: Optional[Dict[str, Any]] = None):
+    def insert(self, series_id: str, timestamp: float, value: Optional[float], metadata: Optional[Dict[str, Any]] = None,
+               burst: Optional[tuple] = None):
+        """Record one tick; ``burst`` is ``(sent, received, min, max, jitter)`` when ``value`` is a burst average."""
+        timestamp = float(timestamp)
+        if not self.writable:
+            logger.debug("Dropping TSDB insert for %s: this process is a read-only follower", series_id)
+            return
         with self._lock:
-            if series_id not in self._series:
-                self._series[series_id] = []
-            buf = self._series[series_id]
-            buf.append({
-                "time": datetime.fromtimestamp(timestamp).strftime("%H:%M:%S") if isinstance(timestamp, (int, float)) else str(timestamp),
-                "timestamp": timestamp,
-                "latency": value,
-                "meta": metadata or {}
-            })
-            if len(buf) > self.max_points:
-                buf.pop(0)
-
-        # Trigger disk snapshot every 5 samples for global series
-        if series_id == "global" and len(buf) % 5 == 0:
-            self.save_to_disk()
+            # Range queries binary-search the timestamp column, so keep it monotonic
+            ring = self._series.get(series_id)
+            if ring is not None and ring.size and timestamp < ring.last_timestamp:
+                timestamp = ring.last_timestamp
+            self._apply(series_id, timestamp, value, metadata, burst)
+            if burst is None:
+                payload = encode_sample(timestamp, value, metadata)
+            else:
+                payload = encode_burst(timestamp, value, burst, metadata)
+            self._append(self._log(series_id), payload, self._series[series_id])
+            point = self._latest_point(series_id) if bus.has_subscribers(TOPIC_SAMPLES) else None
+        if point is not None:
+            self._publish([(series_id, point)])
 
     def query(self, series_id: str = "global", limit: int = 60) -> List[Dict[str, Any]]:
         with self._lock:
-            buf = self._series.get(series_id, [])
-            return list(buf[-limit:])
+            ring = self._series.get(series_id)
+            return ring.tail(limit) if ring else []
 
-    def get_stats(self, series_id: str = "global") -> Dict[str, Any]:
+    def last_timestamp(self, series_id: str) -> Optional[float]:
+        with self._lock:
+            ring = self._series.get(series_id)
+            return ring.last_timestamp if ring else None
+
+    def tier_for(self, step: int) -> Optional[str]:
+        """Coarsest rollup tier whose bucket size evenly divides ``step`` seconds."""
+        best = None
+        for name, (tier_step, _) in self.rollup_tiers.items():
+            if tier_step <= step and step % tier_step == 0:
+                best = name
+        return best
+
+    def query_rollup(self, series_id: str, step: int, limit: int = 60) -> List[Dict[str, Any]]:
+        """Return the newest ``limit`` buckets of ``step`` seconds, served from the best rollup tier.
+
+        Steps finer than the smallest tier fall back to raw points.
+        """
+        name = self.tier_for(step)
+        if name is None:
+            return self.query(series_id, limit)
+        with self._lock:
+            tiers = self._rollups.get(series_id)
+            if not tiers:
+                return []
+            tier = tiers[name]
+            ratio = step // tier.step
+            buckets = tier.tail(limit * ratio + ratio)
+        if ratio > 1:
+            buckets = merge_buckets(buckets, step)
+        return [bucket_to_point(b, step) for b in buckets[-limit:]]
+
+    def query_range(self, series_id: str, start: float, end: float, step: Optional[int] = None,
+                    agg: str = "avg") -> Dict[str, Any]:
+        """Points of ``series_id`` with timestamps in ``[start, end]``.
+
+        The window is located by binary search on the timestamp column, so only
+        points inside it are touched. With ``step`` the points are aggregated
+        into ``step``-second buckets and each bucket's ``value`` is its ``agg``
+        field (``avg``/``min``/``max``/``p50``/``p95``/``p99``/``loss``/``samples``).
+        Windows reaching past raw retention are answered from the rollup tier
+        matching ``step``.
+        """
+        if agg not in RANGE_AGGREGATES:
+            raise ValueError(f"unsupported aggregate: {agg}")
+        if step is not None and step <= 0:
+            raise ValueError(f"step must be positive: {step}")
         with self._lock:
-            buf = self._series.get(series_id, [])
-            valid = [p["latency"] for p in buf if p.get("latency") is not None]
-            if not valid:
-                return {
-                    "cur": None, "avg": None, "min": None, "max": None,
-                    "p50": None, "p95": None, "p99": None, "jitter": 0.0,
-                    "loss": 0.0, "samples_count": 0, "total_samples": len(buf)
-                }
-            sorted_v = sorted(valid)
-            cur = valid[-1]
-            avg = sum(valid) / len(valid)
-            mn = sorted_v[0]
-            mx = sorted_v[-1]
-            p50 = sorted_v[int(len(sorted_v) * 0.50)]
-            p95 = sorted_v[int(len(sorted_v) * 0.95)]
-            p99 = sorted_v[min(len(sorted_v) - 1, int(len(sorted_v) * 0.99))]
-            if len(valid) > 1:
-                diffs = [abs(valid[i] - valid[i-1]) for i in range(1, len(valid))]
-                jitter = sum(diffs) / len(diffs)
+            ring = self._series.get(series_id)
+            if ring is None:
+                return {"source": None, "points": []}
+            in_raw = ring.size and start >= ring.timestamps[ring.head]
+            name = self.tier_for(step) if step else None
+            if not step:
+                lo, hi = ring.search(start), ring.search(end, right=True)
+                return {"source": "raw", "points": ring.points(lo, hi)}
+            if in_raw or name is None:
+                lo, hi = ring.search(start - start % step), ring.search(end, right=True)
+                source, buckets = "raw", ring.aggregate(lo, hi, step)
             else:
-                jitter = 0.0
-            loss_pct = round(((len(buf) - len(valid)) / len(buf)) * 100, 1) if buf else 0.0
-            return {
-                "cur": round(cur, 1), "avg": round(avg, 1), "min": round(mn, 1),
-                "max": round(mx, 1), "p50": round(p50, 1), "p95": round(p95, 1),
-                "p99": round(p99, 1), "jitter": round(jitter, 1), "loss": loss_pct,
-                "samples_count": len(valid), "total_samples": len(buf)
-            }
+                tier = self._rollups[series_id][name]
+                source, buckets = name, tier.range(start - start % step, end)
+                if step != tier.step:
+                    buckets = merge_buckets(buckets, step)
+        points = [bucket_to_point(b, step) for b in buckets]
+        for point in points:
+            point["value"] = point[agg]
+        return {"source": source, "points": points}
+
+    def get_stats(self, series_id: str = "global") -> Dict[str, Any]:
+        with self._lock:
+            ring = self._series.get(series_id)
+            if ring is None:
+                return SeriesRing(1).stats()
+            return ring.stats()
 
-# Singleton instance
-tsdb = TimeSeriesDB()
+# Singleton instance; opened read-only until this process wins the writer election
+tsdb = TimeSeriesDB(writable=False)
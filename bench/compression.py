@@ -0,0 +1,54 @@
+"""
+Response compression trade-off: bytes and CPU per coding for an
+/api/pings-shaped history (60 points x 8 targets), and a 200-event stream
+flushed per event vs once.
+
+Run from the repository root: ``python -m bench.compression [rounds]``.
+"""
+
+import json
+import random
+import sys
+import time
+
+from app.compression import ENCODERS, LEVELS, compress, compress_stream
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rng = random.Random(1)
+    names = [f"ping_{n}" for n in ("cu", "cm", "ct", "hk", "jp", "sg", "us", "de")]
+    now = time.time()
+
+    def point(ts):
+        detail = {name: round(rng.uniform(5, 180), 1) for name in names}
+        return {"timestamp": round(ts, 3), "value": round(sum(detail.values()) / len(detail), 1),
+                "min": min(detail.values()), "max": max(detail.values()), "loss": 0.0,
+                "targets_detail": detail}
+
+    history = [point(now - (60 - i) * 15) for i in range(60)]
+    body = json.dumps({"stats": {"count": 60, "history": history, "window": 60}}).encode()
+    events = [f"id: {int(p['timestamp'] * 1000)}\nevent: pings\ndata: {json.dumps({'delta': True, 'history': [p]})}\n\n".encode()
+              for p in (point(now + i * 15) for i in range(200))]
+    raw_events = sum(len(e) for e in events)
+
+    def timed(fn):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            out = fn()
+        return out, (time.perf_counter() - started) / rounds * 1000
+
+    print(f"/api/pings history: {len(body)}B identity; event stream: {len(events)} events, {raw_events}B identity")
+    print(f"{'coding':<8}{'level':>6}{'pings B':>10}{'ratio':>7}{'ms/resp':>9}{'MB/s':>8}"
+          f"{'stream B (flush/event)':>24}{'stream B (one flush)':>22}")
+    for encoding in ENCODERS:
+        for level in sorted({1, LEVELS[encoding], 9} if encoding == "gzip" else {LEVELS[encoding]}):
+            out, ms = timed(lambda: compress(body, encoding, level))
+            flushed = sum(len(c) for c in compress_stream(events, encoding, True, level))
+            whole = sum(len(c) for c in compress_stream(events, encoding, False, level))
+            print(f"{encoding:<8}{level:>6}{len(out):>10}{len(body) / len(out):>7.1f}{ms:>9.3f}"
+                  f"{len(body) / ms / 1000:>8.1f}{flushed:>24}{whole:>22}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+JSON backend micro-benchmark: serialize/parse an /api/pings-shaped payload
+(60 points x 8 targets, with per-point meta) with the stdlib, orjson (when
+installed) and both Flask providers.
+
+Run from the repository root: ``python -m bench.fast_json [rounds]``.
+"""
+
+import json
+import random
+import sys
+import time
+
+from flask import Flask
+
+from app.fast_json import BACKEND, FastJSONProvider, dumpb, orjson
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = random.Random(1)
+    names = [f"ping_{n}" for n in ("cu", "cm", "ct", "hk", "jp", "sg", "us", "de")]
+    now = time.time()
+
+    def point(ts):
+        detail = {name: round(rng.uniform(5, 180), 2) for name in names}
+        return {"timestamp": ts, "value": sum(detail.values()) / len(detail),
+                "meta": {"details": detail, "loss": 0.0}, "targets_detail": detail}
+
+    payload = {
+        **{name: rng.uniform(5, 180) for name in names},
+        "client_ping": None, "source": "snapshot", "sampled_at": now, "delta": False,
+        "stats": {"avg": 42.1, "min": 5.3, "max": 179.9, "count": 60,
+                  "history": [point(now - (60 - i) * 15.0) for i in range(60)]},
+    }
+
+    def timed(fn):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            out = fn()
+        return out, (time.perf_counter() - started) / rounds * 1e6
+
+    def flask_app(provider):
+        app = Flask(__name__)
+        if provider is not None:
+            app.json = provider(app)
+        return app
+
+    default_app, fast_app = flask_app(None), flask_app(FastJSONProvider)
+    cases = [
+        ("json.dumps (Flask default: sorted, ASCII)", lambda: json.dumps(payload, sort_keys=True)),
+        ("json.dumps compact", lambda: json.dumps(payload, ensure_ascii=False, separators=(",", ":"))),
+    ]
+    if orjson is not None:
+        cases.append(("orjson.dumps", lambda: orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)))
+    body = dumpb(payload)
+    cases.append(("json.loads", lambda: json.loads(body)))
+    if orjson is not None:
+        cases.append(("orjson.loads", lambda: orjson.loads(body)))
+    for label, app in (("jsonify, default provider", default_app), ("jsonify, FastJSONProvider", fast_app)):
+        cases.append((label, lambda app=app: app.json.response(payload).get_data()))
+
+    print(f"backend={BACKEND}, payload {len(body)}B, {rounds} rounds")
+    for label, fn in cases:
+        _, us = timed(fn)
+        print(f"{label:<44}{us:>9.1f} us/op")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Probe shard throughput: N shards probing T targets (freq 1s, burst 1) against a
+local TCP listener; reports recorded probes/sec for each shard count.
+
+Run from the repository root: ``python -m bench.probe_shards [seconds] [targets]``.
+"""
+
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+
+from app.probe_shards import ShardPool
+
+
+def _accept_forever(listener: socket.socket):
+    while True:
+        conn, _ = listener.accept()
+        conn.close()
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 6.0
+    n_targets = int(sys.argv[2]) if len(sys.argv) > 2 else 4000
+    cores = os.cpu_count() or 1
+    shard_counts = sorted({1, 2, max(1, cores // 2), cores})
+
+    listener = socket.socket()
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(4096)
+    port = listener.getsockname()[1]
+
+    acceptors = [multiprocessing.get_context("fork").Process(target=_accept_forever, args=(listener,), daemon=True)
+                 for _ in range(max(1, cores // 2))]
+    for proc in acceptors:
+        proc.start()
+
+    targets = [{"id": f"bench{i}", "target": f"127.0.0.1:{port}", "type": "tcp", "freq": 1, "burst": 1}
+               for i in range(n_targets)]
+    print(f"{cores} CPU(s), {n_targets} targets at 1 probe/s each (offered {n_targets} probes/s), {duration:g}s per run")
+    for shards in shard_counts:
+        counter = {"n": 0}
+        counter_lock = threading.Lock()
+
+        def count(records):
+            with counter_lock:
+                counter["n"] += len(records)
+
+        pool = ShardPool(shards, sink=count, budget_per_sec=n_targets * 10)
+        pool.start()
+        pool.assign(targets)
+        time.sleep(2.0)  # warm-up: let every job fire once
+        with counter_lock:
+            counter["n"] = 0
+        started = time.perf_counter()
+        time.sleep(duration)
+        with counter_lock:
+            done = counter["n"]
+        elapsed = time.perf_counter() - started
+        pool.stop()
+        print(f"shards={shards}: {done / elapsed:,.0f} probes/s")
+
+
+if __name__ == "__main__":
+    main()
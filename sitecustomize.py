@@ -7,30 +7,55 @@ Gunicorn. That string is not a valid module path, which leads to
 gets a chance to start. Python automatically imports ``sitecustomize`` on
 startup if it is importable from ``sys.path``; we use that hook to register an
 alias so the invalid module name resolves to the real Flask module.
+
+The alias is resolved lazily, on the first import of the bad name: importing
+``app.main`` builds the app and starts its background services, which every
+other Python process on the host (tools, benchmarks) must not do.
 """
 from __future__ import annotations
 
 import importlib
+import importlib.abc
+import importlib.util
 import sys
 
 
-def _ensure_alias(bad_name: str, target: str) -> None:
-    """Alias *target* module under *bad_name* if it is importable.
+class _AliasLoader(importlib.abc.Loader):
+    def __init__(self, target: str) -> None:
+        self.target = target
+
+    def create_module(self, spec):
+        return importlib.import_module(self.target)
+
+    def exec_module(self, module) -> None:
+        pass
+
+
+class _AliasFinder(importlib.abc.MetaPathFinder):
+    """Resolve *bad_name* imports to the *target* module, importing it only then.
 
     Gunicorn performs ``importlib.import_module`` with the provided app string;
-    populating ``sys.modules`` ahead of time lets that import succeed even when
-    the string contains path separators.
+    answering that lookup lets the import succeed even when the string contains
+    path separators.
     """
 
-    if bad_name in sys.modules:
-        return
+    def __init__(self) -> None:
+        self.aliases: dict[str, str] = {}
+
+    def find_spec(self, fullname, path=None, target=None):
+        alias = self.aliases.get(fullname)
+        if alias is None or importlib.util.find_spec(alias) is None:
+            return None
+        return importlib.util.spec_from_loader(fullname, _AliasLoader(alias))
+
 
-    try:
-        module = importlib.import_module(target)
-    except ModuleNotFoundError:
-        return
+_finder = _AliasFinder()
+sys.meta_path.append(_finder)
 
-    sys.modules[bad_name] = module
+
+def _ensure_alias(bad_name: str, target: str) -> None:
+    """Alias *target* module under *bad_name* once something imports *bad_name*."""
+    _finder.aliases[bad_name] = target
 
 
 # Support panels that pass ``app/main`` instead of the dotted ``app.main``
@@ -0,0 +1,12 @@
+import importlib
+
+import pytest
+
+# ``app.tsdb`` as an attribute is the database singleton, not the module
+tsdb_module = importlib.import_module("app.tsdb")
+
+
+@pytest.fixture(autouse=True)
+def isolated_legacy_snapshot(tmp_path, monkeypatch):
+    """Keep test databases from migrating (and renaming) the real legacy JSON snapshot."""
+    monkeypatch.setattr(tsdb_module, "TSDB_DATA_FILE", tmp_path / "tsdb_history.json")
@@ -0,0 +1,145 @@
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask, jsonify, request
+
+from app import compression, http_cache
+from app.http_cache import ResponseCache, conditional
+
+
+@pytest.fixture
+def setup():
+    app = Flask(__name__)
+    cache = ResponseCache(max_entries=3)
+    state = {"version": 1, "calls": 0}
+
+    @app.route("/item/<name>", methods=["GET", "POST"])
+    @cache.cached(lambda: state["version"], ttl=60)
+    def item(name):
+        state["calls"] += 1
+        if name == "missing":
+            return jsonify(error="not found"), 404
+        return jsonify(name=name, version=state["version"], call=state["calls"])
+
+    @app.route("/visitor")
+    @cache.cached(lambda: state["version"], vary=lambda: request.headers.get("X-Client"))
+    def visitor():
+        state["calls"] += 1
+        return jsonify(client=request.headers.get("X-Client"))
+
+    @app.route("/big")
+    @cache.cached(lambda: state["version"])
+    def big():
+        return jsonify(rows=[{"n": i, "label": "row"} for i in range(500)])
+
+    @app.route("/fresh")
+    def fresh():
+        return conditional(jsonify(value=request.args.get("v", "")))
+
+    compression.init_app(app)
+    return app.test_client(), cache, state
+
+
+def test_repeat_request_is_served_from_cache(setup):
+    client, cache, state = setup
+    first = client.get("/item/a")
+    second = client.get("/item/a")
+    assert state["calls"] == 1
+    assert second.data == first.data
+    assert first.headers["ETag"] == second.headers["ETag"]
+    assert first.headers["Cache-Control"] == http_cache.CACHE_CONTROL
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_matching_etag_gets_empty_304(setup):
+    client, _, _ = setup
+    etag = client.get("/item/a").headers["ETag"]
+    resp = client.get("/item/a", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.data == b""
+    assert client.get("/item/a", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_version_change_rebuilds_entry(setup):
+    client, _, state = setup
+    etag = client.get("/item/a").headers["ETag"]
+    state["version"] = 2
+    resp = client.get("/item/a", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.get_json()["version"] == 2
+    assert resp.headers["ETag"] != etag
+    assert state["calls"] == 2
+
+
+def test_entries_expire_after_ttl(setup, monkeypatch):
+    client, _, state = setup
+    now = [1000.0]
+    monkeypatch.setattr(http_cache, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    client.get("/item/a")
+    now[0] += 59
+    client.get("/item/a")
+    assert state["calls"] == 1
+    now[0] += 2
+    client.get("/item/a")
+    assert state["calls"] == 2
+
+
+def test_least_recently_used_entry_is_evicted(setup):
+    client, cache, state = setup
+    for name in ("a", "b", "c"):
+        client.get(f"/item/{name}")
+    client.get("/item/a")  # "b" is now the least recently used
+    client.get("/item/d")
+    assert len(cache._entries) == 3
+    assert state["calls"] == 4
+
+    client.get("/item/a")
+    client.get("/item/c")
+    assert state["calls"] == 4
+    client.get("/item/b")
+    assert state["calls"] == 5
+
+
+def test_errors_and_writes_bypass_cache(setup):
+    client, cache, state = setup
+    assert client.get("/item/missing").status_code == 404
+    assert client.get("/item/missing").status_code == 404
+    client.post("/item/a")
+    client.post("/item/a")
+    assert state["calls"] == 4
+    assert len(cache._entries) == 0
+
+
+def test_vary_keeps_clients_apart(setup):
+    client, _, state = setup
+    one = client.get("/visitor", headers={"X-Client": "1"}).get_json()
+    two = client.get("/visitor", headers={"X-Client": "2"}).get_json()
+    client.get("/visitor", headers={"X-Client": "1"})
+    assert (one["client"], two["client"]) == ("1", "2")
+    assert state["calls"] == 2
+
+
+def test_invalidate_drops_endpoint_entries(setup):
+    client, cache, state = setup
+    client.get("/item/a")
+    client.get("/visitor")
+    cache.invalidate("item")
+    client.get("/item/a")
+    client.get("/visitor")
+    assert state["calls"] == 3
+
+
+def test_compressed_response_keeps_weak_etag_and_304(setup):
+    client, _, _ = setup
+    resp = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert resp.headers["ETag"].startswith('W/"')
+    again = client.get("/big", headers={"Accept-Encoding": "gzip", "If-None-Match": resp.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_conditional_tags_uncached_responses(setup):
+    client, _, _ = setup
+    etag = client.get("/fresh?v=1").headers["ETag"]
+    assert client.get("/fresh?v=1", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/fresh?v=2", headers={"If-None-Match": etag}).status_code == 200
@@ -0,0 +1,100 @@
+import importlib
+
+import pytest
+
+from app import create_app
+from app.tsdb import TimeSeriesDB
+
+TIERS = {"1m": (60, 1000), "5m": (300, 1000)}
+T0 = 1_700_000_000 - 1_700_000_000 % 3600
+RAW_POINTS = 40
+
+api_module = importlib.import_module("app.routes.api")
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Two hours at one sample every 15s; the raw ring only keeps the last 10 minutes."""
+    db = TimeSeriesDB(max_points_per_series=RAW_POINTS, segment_dir=tmp_path, rollup_tiers=TIERS)
+    for i in range(2 * 3600 // 15):
+        db.insert("s", T0 + i * 15, None if i % 10 == 9 else float(i % 50))
+    return db
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    monkeypatch.setattr(api_module, "tsdb", db)
+    return create_app(start_services=False).test_client()
+
+
+def raw_start(db):
+    return db.query("s", limit=RAW_POINTS)[0]["timestamp"]
+
+
+def test_raw_points_without_step(db):
+    start = raw_start(db) + 60
+    end = start + 120
+    result = db.query_range("s", start, end)
+    assert result["source"] == "raw"
+    assert [p["timestamp"] for p in result["points"]] == [start + i * 15 for i in range(9)]
+
+
+def test_step_inside_raw_retention_aggregates_raw_points(db):
+    start = raw_start(db)
+    result = db.query_range("s", start, start + 299, step=60)
+    assert result["source"] == "raw"
+    assert [p["timestamp"] for p in result["points"]] == [start - start % 60 + i * 60 for i in range(5)]
+    assert all(p["samples"] == 4 for p in result["points"])
+
+
+@pytest.mark.parametrize("step, tier", [(60, "1m"), (120, "1m"), (300, "5m"), (900, "5m")])
+def test_step_past_raw_retention_uses_matching_tier(db, step, tier):
+    result = db.query_range("s", T0, T0 + 3600 - 1, step=step)
+    assert result["source"] == tier
+    points = result["points"]
+    assert [p["timestamp"] for p in points] == [T0 + i * step for i in range(3600 // step)]
+    assert all(p["samples"] == step // 15 for p in points)
+
+
+def test_step_matching_no_tier_falls_back_to_raw(db):
+    result = db.query_range("s", T0, T0 + 3600, step=90)
+    assert result["source"] == "raw"
+
+
+def test_value_follows_requested_aggregate(db):
+    points = db.query_range("s", T0, T0 + 3600 - 1, step=300, agg="max")["points"]
+    assert [p["value"] for p in points] == [p["max"] for p in points]
+
+
+def test_unknown_series_is_empty(db):
+    assert db.query_range("nope", T0, T0 + 60) == {"source": None, "points": []}
+
+
+@pytest.mark.parametrize("kwargs", [{"step": 0}, {"step": -60}, {"agg": "median"}])
+def test_invalid_arguments_raise(db, kwargs):
+    with pytest.raises(ValueError):
+        db.query_range("s", T0, T0 + 60, **kwargs)
+
+
+def test_api_series_returns_range(client):
+    resp = client.get(f"/api/series?id=s&from={T0}&to={T0 + 3599}&step=5m&agg=p95")
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert (body["id"], body["step"], body["agg"], body["source"]) == ("s", 300, "p95", "5m")
+    assert len(body["points"]) == 12
+
+
+@pytest.mark.parametrize("query", [
+    "step=0",
+    "step=-5m",
+    "step=0.5",
+    "step=inf",
+    "step=soon",
+    "agg=median",
+    "from=yesterday",
+    f"from={T0 + 60}&to={T0}",
+])
+def test_api_series_rejects_bad_arguments(client, query):
+    resp = client.get(f"/api/series?id=s&{query}")
+    assert resp.status_code == 400
+    assert "error" in resp.get_json()
@@ -0,0 +1,114 @@
+import math
+
+import pytest
+
+from app.tsdb import RollupTier, TimeSeriesDB, decode_rollup
+
+TIERS = {"1m": (60, 500), "5m": (300, 100)}
+T0 = 1_700_000_000 - 1_700_000_000 % 3600
+
+
+def open_db(path, raw_points=20):
+    return TimeSeriesDB(max_points_per_series=raw_points, segment_dir=path, rollup_tiers=TIERS)
+
+
+def fill(db, minutes, series_id="s"):
+    """Four samples a minute; every 8th one is lost."""
+    values = []
+    for i in range(minutes * 4):
+        value = None if i % 8 == 7 else float(10 + i % 13)
+        db.insert(series_id, T0 + i * 15, value)
+        values.append((T0 + i * 15, value))
+    return values
+
+
+def expected_bucket(values, start, step):
+    inside = [v for ts, v in values if start <= ts < start + step]
+    valid = [v for v in inside if v is not None]
+    return {
+        "samples": len(inside),
+        "avg": round(sum(valid) / len(valid), 1),
+        "min": min(valid),
+        "max": max(valid),
+        "loss": round((len(inside) - len(valid)) / len(inside) * 100, 1),
+    }
+
+
+def test_tier_closes_bucket_when_next_one_starts():
+    tier = RollupTier("1m", 60, 10)
+    assert tier.add(T0, 10.0) is None
+    assert tier.add(T0 + 20, None) is None
+    assert tier.add(T0 + 40, 30.0) is None
+    closed = tier.add(T0 + 61, 5.0)
+
+    start, count, valid, total, mn, mx, p50, p95, p99 = decode_rollup(closed)
+    assert (start, count, valid, total, mn, mx) == (T0, 3, 2, 40.0, 10.0, 30.0)
+    assert mn <= p50 <= p95 <= p99 <= mx
+    assert tier.size == 1 and tier.open_start == T0 + 60
+
+
+def test_tier_counts_bursts_per_probe():
+    tier = RollupTier("1m", 60, 10)
+    tier.add(T0, 20.0, (5, 4, 12.0, 31.0, 2.0))
+    tier.add(T0 + 15, None, (5, 0, None, None, 0.0))
+    start, count, valid, total, mn, mx, *_ = decode_rollup(tier.add(T0 + 60, 1.0))
+    assert (count, valid, total, mn, mx) == (10, 4, 80.0, 12.0, 31.0)
+
+
+def test_tier_ignores_samples_for_closed_buckets():
+    tier = RollupTier("1m", 60, 10)
+    tier.add(T0, 10.0)
+    tier.add(T0 + 60, 20.0)
+    assert tier.add(T0 + 5, 99.0) is None
+    assert tier.bucket_at(0)[1:4] == (1, 1, 10.0)
+
+
+def test_tier_keeps_newest_buckets_when_full():
+    tier = RollupTier("1m", 60, 5)
+    for i in range(12):
+        tier.add(T0 + i * 60, float(i))
+    assert tier.size == 5
+    assert [b[0] for b in tier.tail(10, include_open=False)] == [T0 + i * 60 for i in range(6, 11)]
+    assert tier.tail(10)[-1][0] == T0 + 11 * 60
+
+
+@pytest.mark.parametrize("step", [60, 120, 300, 900])
+def test_query_rollup_matches_raw_samples(tmp_path, step):
+    db = open_db(tmp_path)
+    values = fill(db, 60)
+    points = db.query_rollup("s", step, limit=8)
+
+    assert len(points) == min(8, 3600 // step)
+    assert points[-1]["timestamp"] == T0 + 3600 - step
+    for point in points:
+        expected = expected_bucket(values, point["timestamp"], step)
+        assert {k: point[k] for k in expected} == pytest.approx(expected, abs=0.051)
+
+
+def test_query_rollup_below_smallest_tier_returns_raw_points(tmp_path):
+    db = open_db(tmp_path)
+    fill(db, 10)
+    assert db.query_rollup("s", 30, limit=5) == db.query("s", limit=5)
+
+
+def test_rollups_reload_from_segments(tmp_path):
+    db = open_db(tmp_path)
+    fill(db, 60)
+    for step in (60, 300, 900):
+        before = db.query_rollup("s", step, limit=100)
+        after = open_db(tmp_path).query_rollup("s", step, limit=100)
+        assert after == before
+
+    # Closed buckets outlive the raw ring (20 points = 5 minutes here)
+    assert len(open_db(tmp_path).query_rollup("s", 60, limit=100)) == 60
+
+
+def test_reload_does_not_duplicate_closed_buckets(tmp_path):
+    db = open_db(tmp_path)
+    fill(db, 30)
+    reopened = open_db(tmp_path)
+    reopened.insert("s", T0 + 30 * 60 + 5, 50.0)
+    points = open_db(tmp_path).query_rollup("s", 60, limit=100)
+    starts = [p["timestamp"] for p in points]
+    assert starts == sorted(set(starts))
+    assert points[-1]["samples"] == 1 and math.isclose(points[-1]["avg"], 50.0)
@@ -0,0 +1,181 @@
+import os
+
+from app.segment_log import SegmentLog, frame
+from app.tsdb import COMPACT_FACTOR, TimeSeriesDB
+
+TIERS = {"1m": (60, 100)}
+T0 = 1_700_000_000
+
+
+def payloads(n, start=0):
+    return [f"record-{i}".encode() for i in range(start, start + n)]
+
+
+def write(log, records):
+    for payload in records:
+        log.append(payload)
+
+
+def test_replay_returns_every_appended_record(tmp_path):
+    log = SegmentLog(tmp_path / "s.seg")
+    write(log, payloads(50))
+
+    reader = SegmentLog(tmp_path / "s.seg")
+    assert reader.replay() == payloads(50)
+    assert reader.records == 50
+    assert reader.offset == os.path.getsize(tmp_path / "s.seg")
+
+
+def test_replay_of_missing_file_is_empty(tmp_path):
+    log = SegmentLog(tmp_path / "missing.seg")
+    assert log.replay() == []
+    assert (log.records, log.offset, log.inode) == (0, 0, None)
+
+
+def test_replay_repairs_torn_tail(tmp_path):
+    path = tmp_path / "s.seg"
+    write(SegmentLog(path), payloads(10))
+    good_size = path.stat().st_size
+    with open(path, "ab") as fh:
+        fh.write(frame(b"torn-record")[:-3])
+
+    log = SegmentLog(path)
+    assert log.replay(repair=True) == payloads(10)
+    assert path.stat().st_size == good_size
+
+    # Appends after the repair land on a clean frame boundary
+    log.append(b"after")
+    assert SegmentLog(path).replay() == payloads(10) + [b"after"]
+
+
+def test_replay_stops_at_corrupt_frame_without_repair(tmp_path):
+    path = tmp_path / "s.seg"
+    write(SegmentLog(path), payloads(3))
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF  # breaks the last frame's checksum
+    path.write_bytes(bytes(data))
+
+    assert SegmentLog(path).replay(repair=False) == payloads(2)
+    assert path.stat().st_size == len(data)
+
+
+def test_read_new_follows_appends(tmp_path):
+    path = tmp_path / "s.seg"
+    writer, reader = SegmentLog(path), SegmentLog(path)
+    write(writer, payloads(5))
+    assert reader.replay(repair=False) == payloads(5)
+
+    assert reader.read_new() == []
+    write(writer, payloads(3, start=5))
+    assert reader.read_new() == payloads(3, start=5)
+    assert reader.records == 8
+
+
+def test_read_new_leaves_partial_frame_for_next_call(tmp_path):
+    path = tmp_path / "s.seg"
+    reader = SegmentLog(path)
+    write(SegmentLog(path), payloads(2))
+    assert reader.read_new() == payloads(2)
+
+    whole = frame(b"split")
+    with open(path, "ab") as fh:
+        fh.write(whole[:5])
+    assert reader.read_new() == []
+    with open(path, "ab") as fh:
+        fh.write(whole[5:])
+    assert reader.read_new() == [b"split"]
+
+
+def test_read_new_repair_truncates_torn_tail(tmp_path):
+    path = tmp_path / "s.seg"
+    reader = SegmentLog(path)
+    write(SegmentLog(path), payloads(2))
+    good_size = path.stat().st_size
+    with open(path, "ab") as fh:
+        fh.write(frame(b"torn")[:6])
+
+    assert reader.read_new(repair=True) == payloads(2)
+    assert path.stat().st_size == good_size
+
+
+def test_read_new_reports_compaction_swap(tmp_path):
+    path = tmp_path / "s.seg"
+    writer, reader = SegmentLog(path), SegmentLog(path)
+    write(writer, payloads(10))
+    assert reader.replay(repair=False) == payloads(10)
+
+    writer.rewrite(payloads(4, start=6))
+    assert not (tmp_path / "s.seg.tmp").exists()
+    assert reader.read_new() is None
+    assert reader.replay(repair=False) == payloads(4, start=6)
+    assert reader.read_new() == []
+
+
+def test_read_new_reports_truncation(tmp_path):
+    path = tmp_path / "s.seg"
+    writer, reader = SegmentLog(path), SegmentLog(path)
+    write(writer, payloads(10))
+    assert reader.replay(repair=False) == payloads(10)
+
+    with open(path, "r+b") as fh:
+        fh.truncate(4)
+    assert reader.read_new() is None
+
+
+def open_db(path, **kwargs):
+    return TimeSeriesDB(max_points_per_series=20, segment_dir=path, rollup_tiers=TIERS, **kwargs)
+
+
+def latencies(db, series_id="s"):
+    return [(p["timestamp"], p["latency"]) for p in db.query(series_id, limit=100)]
+
+
+def test_tsdb_reopen_replays_segments(tmp_path):
+    db = open_db(tmp_path)
+    for i in range(15):
+        db.insert("s", T0 + i, None if i % 5 == 0 else float(i), {"n": i} if i == 3 else None)
+    db.insert("s", T0 + 15, 12.0, None, (5, 4, 10.0, 14.0, 1.5))
+
+    reopened = open_db(tmp_path)
+    assert latencies(reopened) == latencies(db)
+    assert reopened.query("s", limit=100)[3]["meta"] == {"n": 3}
+    assert reopened.get_stats("s") == db.get_stats("s")
+
+
+def test_tsdb_reopen_repairs_torn_tail(tmp_path):
+    db = open_db(tmp_path)
+    for i in range(5):
+        db.insert("s", T0 + i, float(i))
+    path = tmp_path / "s.seg"
+    with open(path, "ab") as fh:
+        fh.write(frame(b"torn")[:5])
+
+    reopened = open_db(tmp_path)
+    assert latencies(reopened) == latencies(db)
+    reopened.insert("s", T0 + 5, 5.0)
+    assert latencies(open_db(tmp_path))[-1] == (T0 + 5, 5.0)
+
+
+def test_tsdb_follower_tracks_writer_across_compaction(tmp_path):
+    writer = open_db(tmp_path)
+    writer.insert("s", T0, 1.0)
+    follower = open_db(tmp_path, writable=False)
+    assert latencies(follower) == latencies(writer)
+
+    # Enough appends to compact (and swap) the segment at least once
+    for i in range(1, 20 * COMPACT_FACTOR + 5):
+        writer.insert("s", T0 + i, float(i))
+        if i % 7 == 0:
+            follower.sync_from_disk()
+            assert latencies(follower) == latencies(writer)
+    follower.sync_from_disk()
+    assert latencies(follower) == latencies(writer)
+
+
+def test_tsdb_follower_never_writes(tmp_path):
+    writer = open_db(tmp_path)
+    writer.insert("s", T0, 1.0)
+    follower = open_db(tmp_path, writable=False)
+    follower.insert("s", T0 + 1, 2.0)
+    assert latencies(follower) == [(T0, 1.0)]
+    assert latencies(open_db(tmp_path)) == [(T0, 1.0)]
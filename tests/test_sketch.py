@@ -0,0 +1,71 @@
+import math
+import random
+from collections import deque
+
+import pytest
+
+from app.sketch import LatencySketch
+from app.tsdb import TimeSeriesDB
+
+QUANTILES = (0.50, 0.95, 0.99)
+
+
+def nearest_rank(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def test_sketch_quantiles_within_relative_error_over_sliding_window():
+    rng = random.Random(42)
+    window, sketch = deque(), LatencySketch()
+    for i in range(20_000):
+        value = rng.lognormvariate(3.5, 0.8)
+        window.append(value)
+        sketch.add(value)
+        if len(window) > 1440:
+            sketch.remove(window.popleft())
+        if i % 250 == 249:
+            assert sketch.count == len(window)
+            for q, estimate in zip(QUANTILES, sketch.quantiles(QUANTILES)):
+                exact = nearest_rank(window, q)
+                assert abs(estimate - exact) <= sketch.alpha * exact + 1e-9, (i, q, estimate, exact)
+
+
+def test_get_stats_matches_brute_force_after_ring_wraps(tmp_path):
+    capacity = 300
+    db = TimeSeriesDB(max_points_per_series=capacity, segment_dir=tmp_path)
+    rng = random.Random(7)
+    points = []  # (value, sent, received)
+    for i in range(4 * capacity + 17):
+        roll = rng.random()
+        if roll < 0.1:
+            value, burst = None, None
+            probes = (1, 0)
+        elif roll < 0.5:
+            sent = 5
+            received = rng.randint(1, sent)
+            value = rng.uniform(5, 250)
+            burst = (sent, received, value * 0.8, value * 1.2, rng.uniform(0, 10))
+            probes = (sent, received)
+        else:
+            value, burst = rng.uniform(5, 250), None
+            probes = (1, 1)
+        db.insert("s", 1_700_000_000 + i, value, None, burst)
+        points.append((value, *probes))
+
+    window = points[-capacity:]
+    values = [v for v, _, _ in window if v is not None]
+    sent = sum(s for _, s, _ in window)
+    lost = sum(s - r for _, s, r in window)
+    stats = db.get_stats("s")
+
+    assert stats["total_samples"] == capacity
+    assert stats["samples_count"] == len(values)
+    assert stats["avg"] == pytest.approx(sum(values) / len(values), abs=0.051)
+    assert stats["min"] == pytest.approx(min(values), abs=0.051)
+    assert stats["max"] == pytest.approx(max(values), abs=0.051)
+    jitter = sum(abs(b - a) for a, b in zip(values, values[1:])) / (len(values) - 1)
+    assert stats["jitter"] == pytest.approx(jitter, abs=0.051)
+    assert stats["loss"] == pytest.approx(round(lost / sent * 100, 1))
+    exact_p95 = nearest_rank(values, 0.95)
+    assert math.isclose(stats["p95"], exact_p95, rel_tol=LatencySketch().alpha, abs_tol=0.051)
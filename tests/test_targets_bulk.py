@@ -0,0 +1,143 @@
+import importlib
+import json
+
+import pytest
+
+from app import create_app
+from app.targets_manager import TargetRegistry, normalize_target, upsert_targets
+
+targets_routes = importlib.import_module("app.routes.targets")
+
+EXISTING = [
+    {"id": "t1", "name": "One", "target": "one.example:80", "type": "tcp", "freq": 30, "enabled": True},
+    {"id": "t2", "name": "Two", "target": "1.1.1.1:53", "type": "dns", "freq": 60, "enabled": True},
+]
+CSV = (
+    "id,name,target,type,freq,threshold_warn,threshold_crit,enabled,burst\n"
+    ",Three,three.example:443,tls,15,100,200,true,3\n"
+    "t1,One renamed,one.example:80,tcp,30,,,yes,\n"
+    ",Four,four.example:80,tcp,,,,0,\n"
+)
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    registry = TargetRegistry(tmp_path / "targets.json", EXISTING)
+    monkeypatch.setattr(targets_routes, "registry", registry)
+    return registry
+
+
+@pytest.fixture
+def client(registry):
+    return create_app(start_services=False).test_client()
+
+
+def test_normalize_target_parses_csv_strings():
+    target = normalize_target({"target": " a.example:80 ", "freq": "15", "burst": "3", "enabled": "no",
+                               "threshold_warn": "", "id": " x1 "})
+    assert target == {"name": "a.example:80", "target": "a.example:80", "type": "tcp", "freq": 15.0,
+                      "enabled": False, "burst": 3, "id": "x1"}
+
+
+@pytest.mark.parametrize("raw, message", [
+    ({}, "target is required"),
+    ({"target": "a:1", "type": "udp"}, "type must be one of"),
+    ({"target": "a:1", "freq": "fast"}, "freq must be a number"),
+    ({"target": "a:1", "burst": 99}, "burst must be between"),
+    ({"target": "a:1", "id": "global"}, "reserved"),
+    ({"target": "a:1", "id": "ping_cloudflare"}, "reserved"),
+])
+def test_normalize_target_rejects(raw, message):
+    with pytest.raises(ValueError, match=message):
+        normalize_target(raw)
+
+
+def test_upsert_matches_by_id_then_address():
+    incoming = [
+        normalize_target({"id": "t2", "target": "1.1.1.1:53", "type": "dns", "freq": 120}),
+        normalize_target({"target": "one.example:80", "name": "Renamed"}),
+        normalize_target({"target": "new.example:80"}),
+    ]
+    merged, created, updated = upsert_targets(EXISTING, incoming)
+    assert (created, updated) == (1, 2)
+    assert [t["id"] for t in merged[:2]] == ["t1", "t2"]
+    assert merged[0]["name"] == "Renamed" and merged[1]["freq"] == 120
+    assert merged[2]["target"] == "new.example:80" and merged[2]["id"] not in ("t1", "t2")
+
+
+def test_upsert_is_idempotent():
+    incoming = [normalize_target(raw) for raw in (
+        {"target": "new.example:80"},
+        {"target": "8.8.8.8:53", "type": "dns"},
+        {"id": "t1", "target": "one.example:80", "freq": 10},
+    )]
+    once, created, _ = upsert_targets(EXISTING, incoming)
+    twice, created_again, updated_again = upsert_targets(once, incoming)
+    assert created == 2
+    assert (created_again, updated_again) == (0, 3)
+    assert twice == once
+
+
+def test_upsert_replace_drops_targets_not_in_batch():
+    incoming = [normalize_target({"target": "1.1.1.1:53", "type": "dns"})]
+    merged, created, updated = upsert_targets(EXISTING, incoming, replace=True)
+    assert (created, updated) == (0, 1)
+    assert [t["id"] for t in merged] == ["t2"]
+    assert merged[0]["name"] == "1.1.1.1:53"
+
+
+def test_bulk_csv_import(client, registry):
+    resp = client.post("/api/targets/bulk", data=CSV, content_type="text/csv")
+    assert resp.status_code == 200
+    assert resp.get_json() == {"success": True, "total": 4, "created": 2, "updated": 1}
+    targets = {t["name"]: t for t in registry.all()}
+    assert targets["Three"]["burst"] == 3 and targets["Four"]["enabled"] is False
+    assert targets["One renamed"]["id"] == "t1"
+
+    again = client.post("/api/targets/bulk", data=CSV, content_type="text/csv").get_json()
+    assert (again["created"], again["updated"], again["total"]) == (0, 3, 4)
+
+
+def test_bulk_is_all_or_nothing(client, registry):
+    payload = "\n".join([
+        json.dumps({"target": "ok.example:80"}),
+        json.dumps({"target": "bad.example:80", "type": "udp"}),
+        json.dumps({"target": "ok2.example:80", "id": "ping_cu"}),
+    ])
+    resp = client.post("/api/targets/bulk?format=ndjson", data=payload)
+    assert resp.status_code == 400
+    body = resp.get_json()
+    assert body["invalid"] == 2
+    assert [e["row"] for e in body["errors"]] == [2, 3]
+    assert registry.all() == EXISTING
+    assert not registry.path.exists()
+
+
+@pytest.mark.parametrize("data, content_type", [
+    ("{not json", "application/json"),
+    (json.dumps({"rows": []}), "application/json"),
+    ("[]", "application/json"),
+])
+def test_bulk_rejects_bad_payloads(client, registry, data, content_type):
+    assert client.post("/api/targets/bulk", data=data, content_type=content_type).status_code == 400
+    assert not registry.path.exists()
+
+
+def test_bulk_rejects_oversized_batch(client, registry, monkeypatch):
+    monkeypatch.setattr(targets_routes, "MAX_BULK_TARGETS", 3)
+    payload = json.dumps([{"target": f"h{i}.example:80"} for i in range(5)])
+    assert client.post("/api/targets/bulk", data=payload, content_type="application/json").status_code == 413
+    assert not registry.path.exists()
+
+
+@pytest.mark.parametrize("fmt", ["json", "ndjson", "csv"])
+def test_export_round_trips(client, registry, fmt):
+    client.post("/api/targets/bulk", data=CSV, content_type="text/csv")
+    before = registry.all()
+    exported = client.get(f"/api/targets/export?format={fmt}")
+    assert exported.status_code == 200
+
+    resp = client.post(f"/api/targets/bulk?format={fmt}&mode=replace", data=exported.data)
+    assert resp.status_code == 200
+    assert resp.get_json()["created"] == 0
+    assert [t["id"] for t in registry.all()] == [t["id"] for t in before]
@@ -0,0 +1,94 @@
+import json
+import threading
+
+from app.targets_manager import TargetRegistry
+
+DEFAULTS = [{"id": "d1", "name": "Default", "target": "1.1.1.1:53", "type": "dns", "freq": 60, "enabled": True}]
+
+
+def open_registry(tmp_path):
+    return TargetRegistry(tmp_path / "targets.json", DEFAULTS)
+
+
+def add(target_id):
+    def mutate(targets):
+        return targets + [{"id": target_id, "target": f"{target_id}.example:80", "type": "tcp"}]
+    return mutate
+
+
+def ids(targets):
+    return [t["id"] for t in targets]
+
+
+def test_defaults_until_first_write(tmp_path):
+    registry = open_registry(tmp_path)
+    assert registry.all() == DEFAULTS
+    assert not registry.path.exists()
+
+
+def test_update_persists_atomically(tmp_path):
+    registry = open_registry(tmp_path)
+    version = registry.version
+    assert ids(registry.update(add("a"))) == ["d1", "a"]
+    assert registry.version == version + 1
+    assert ids(json.loads(registry.path.read_text())) == ["d1", "a"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["targets.json", "targets.json.lock"]
+
+
+def test_all_returns_copies(tmp_path):
+    registry = open_registry(tmp_path)
+    registry.all()[0]["name"] = "changed"
+    assert registry.get("d1")["name"] == "Default"
+
+
+def test_update_rereads_changes_from_another_worker(tmp_path):
+    first, second = open_registry(tmp_path), open_registry(tmp_path)
+    first.update(add("a"))
+    # ``second`` still caches the defaults; its write must not drop "a"
+    assert ids(second.update(add("b"))) == ["d1", "a", "b"]
+    assert first.reload()
+    assert ids(first.all()) == ["d1", "a", "b"]
+
+
+def test_reload_only_when_file_changes(tmp_path):
+    registry = open_registry(tmp_path)
+    registry.update(add("a"))
+    version = registry.version
+    assert not registry.reload()
+
+    registry.path.write_text(json.dumps([{"id": "x", "target": "x.example:80", "type": "tcp"}]))
+    assert registry.reload()
+    assert ids(registry.all()) == ["x"]
+    assert registry.version == version + 1
+    assert not registry.reload()
+
+
+def test_reload_keeps_last_good_copy_on_corrupt_file(tmp_path):
+    registry = open_registry(tmp_path)
+    registry.update(add("a"))
+    version = registry.version
+    registry.path.write_text("[{not json")
+    assert not registry.reload()
+    assert ids(registry.all()) == ["d1", "a"]
+    assert registry.version == version
+
+
+def test_concurrent_updates_from_several_registries_lose_nothing(tmp_path):
+    registries = [open_registry(tmp_path) for _ in range(2)]
+
+    def writer(registry, prefix):
+        for i in range(10):
+            registry.update(add(f"{prefix}-{i}"))
+
+    threads = [threading.Thread(target=writer, args=(registries[n % 2], f"w{n}")) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    on_disk = ids(json.loads(registries[0].path.read_text()))
+    assert len(on_disk) == 1 + 4 * 10
+    assert len(set(on_disk)) == len(on_disk)
+    for registry in registries:
+        registry.reload()
+        assert sorted(ids(registry.all())) == sorted(on_disk)